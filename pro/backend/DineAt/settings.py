@@ -113,6 +113,27 @@ DATABASES = {
 #     }
 # }
 
+# Tests on SQLite use a file rather than Django's in-memory test database,
+# which one connection holds locked, so the threaded race tests can run
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {}).setdefault('NAME', BASE_DIR / 'test_db.sqlite3')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The kitchen board keeps two entries per open order; the default limit of
+# 300 entries would evict them on a busy evening. Use a shared backend
+# (Redis, Memcached) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
 
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.CustomUser'
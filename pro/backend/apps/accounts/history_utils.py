@@ -0,0 +1,44 @@
+"""
+Customer order history for DineAt
+
+History is read newest first in pages of HISTORY_PAGE_SIZE, keyed on
+(created_at, id) rather than an offset: the next page starts strictly
+after the last order shown, so every page is one indexed range read
+however far back a customer scrolls, and orders placed meanwhile do not
+shift the pages. Each order carries the line summary written at
+checkout, so a page needs no item or menu item queries.
+"""
+from django.db.models import Q
+
+from apps.orders.cursor_utils import decode_cursor, encode_cursor
+from apps.orders.models import Order
+
+HISTORY_PAGE_SIZE = 20
+
+
+def order_history(user, cursor='', limit=None):
+    """
+    One page of a customer's orders, newest first.
+
+    Args:
+        user (CustomUser): The customer
+        cursor (str): Cursor from the previous page, '' for the first page
+        limit (int): Page size, defaults to HISTORY_PAGE_SIZE
+
+    Returns:
+        tuple: (orders, cursor of the next page, whether more orders are left)
+
+    Raises:
+        InvalidCursor: if cursor is malformed
+    """
+    limit = limit or HISTORY_PAGE_SIZE
+    orders = Order.objects.filter(customer=user).order_by('-created_at', '-id')
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+
+    page = list(orders[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if page else cursor
+    return page, next_cursor, has_more
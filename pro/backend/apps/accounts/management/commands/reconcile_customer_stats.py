@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.accounts.models import CustomUser, CustomerProfile
+from apps.orders.models import Order
+
+
+def _placed_orders():
+    return Order.objects.filter(customer=OuterRef('user')).exclude(status=Order.OrderStatus.PENDING).values('customer')
+
+
+def computed_orders():
+    """Number of orders the customer placed, counted in SQL"""
+    return Coalesce(
+        Subquery(_placed_orders().annotate(count=Count('pk')).values('count')),
+        Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def computed_spent():
+    """Total of the orders the customer placed, summed in SQL"""
+    return Coalesce(
+        Subquery(_placed_orders().annotate(total=Sum('total_amount')).values('total')),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare customer profile order stats with their placed orders and optionally fix them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite stats that drifted and create missing profiles')
+        parser.add_argument('--batch-size', type=int, default=500, help='Profiles updated per statement')
+
+    def handle(self, *args, **options):
+        missing = list(
+            CustomUser.objects.filter(role=CustomUser.UserRole.CUSTOMER, customer_profile__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        drifted = list(
+            CustomerProfile.objects.alias(orders=computed_orders(), spent=computed_spent())
+            .filter(~Q(total_orders=F('orders')) | ~Q(total_spent=F('spent')))
+            .values_list('pk', flat=True)
+        )
+
+        if not missing and not drifted:
+            self.stdout.write(self.style.SUCCESS('All customer stats match their orders.'))
+            return
+
+        self.stdout.write(f'{len(missing)} customer(s) without a profile, {len(drifted)} profile(s) with drifted stats.')
+        if not options['fix']:
+            self.stdout.write('Run again with --fix to repair them.')
+            return
+
+        batch_size = options['batch_size']
+        CustomerProfile.objects.bulk_create(
+            [CustomerProfile(user_id=user_id) for user_id in missing], batch_size=batch_size,
+        )
+        # New profiles start at zero and get their stats below
+        drifted.extend(CustomerProfile.objects.filter(user_id__in=missing).values_list('pk', flat=True))
+
+        # Ids are materialised first: MySQL cannot update a table it selects from
+        for start in range(0, len(drifted), batch_size):
+            CustomerProfile.objects.filter(pk__in=drifted[start:start + batch_size]).update(
+                total_orders=computed_orders(), total_spent=computed_spent(),
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(missing)} profile(s) and repaired the stats of {len(drifted) - len(missing)} profile(s).'
+        ))
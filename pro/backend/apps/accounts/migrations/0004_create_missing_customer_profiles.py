@@ -0,0 +1,44 @@
+# Generated by Django 5.0 on 2026-10-17 22:10
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Customers who never opened their profile page get one, with stats from their placed orders"""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    CustomerProfile = apps.get_model('accounts', 'CustomerProfile')
+    Order = apps.get_model('orders', 'Order')
+
+    missing = list(
+        CustomUser.objects.filter(role='CUSTOMER', customer_profile__isnull=True).values_list('pk', flat=True)
+    )
+    for start in range(0, len(missing), 500):
+        user_ids = missing[start:start + 500]
+        stats = {
+            row['customer']: row
+            for row in Order.objects.filter(customer__in=user_ids).exclude(status='PENDING')
+            .values('customer').annotate(orders=Count('pk'), spent=Sum('total_amount'))
+        }
+        CustomerProfile.objects.bulk_create([
+            CustomerProfile(
+                user_id=user_id,
+                total_orders=stats.get(user_id, {}).get('orders', 0),
+                total_spent=stats.get(user_id, {}).get('spent', Decimal('0.00')),
+            )
+            for user_id in user_ids
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_role_index'),
+        ('orders', '0011_remove_order_updated_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
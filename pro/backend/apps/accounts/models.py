@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Value, When
 
 
 class CustomUser(AbstractUser):
@@ -27,6 +28,10 @@ class CustomUser(AbstractUser):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-created_at']
+        indexes = [
+            # Staff and customer lists and counts filter by role
+            models.Index(fields=['role'], name='user_role_idx'),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
@@ -86,6 +91,9 @@ class CustomerProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Maintained by update_order_stats, never written back from a loaded profile
+    STATS_FIELDS = ('loyalty_points', 'total_orders', 'total_spent')
+    
     class Meta:
         verbose_name = 'Customer Profile'
         verbose_name_plural = 'Customer Profiles'
@@ -135,11 +143,74 @@ class CustomerProfile(models.Model):
             return True
         return False
     
-    def update_order_stats(self, amount):
-        """Update order statistics"""
-        self.total_orders += 1
-        self.total_spent += amount
+    @classmethod
+    def update_order_stats(cls, user_id, amount, orders=1):
+        """
+        Move a customer's statistics with their placed orders.
+
+        Statistics cover the customer's placed (non-PENDING) orders that
+        still exist: orders=1 counts a newly placed order, orders=-1 takes
+        a deleted one out and orders=0 follows a change of total. Loyalty
+        points are earned when an order is placed and kept afterwards.
+        A single F() UPDATE, so concurrent checkouts never lose a count; a
+        customer without a profile yet gets one when an order is placed.
+
+        Args:
+            user_id (int): The ordering customer
+            amount (Decimal): Change of total spent
+            orders (int): Change of order count
+        """
         # Add loyalty points (1 point per ₹10 spent)
-        points_earned = int(amount // 10)
-        self.add_loyalty_points(points_earned)
-        self.save()
+        points_earned = int(amount // 10) if orders > 0 else 0
+        changes = {
+            'total_orders': F('total_orders') + orders,
+            'total_spent': F('total_spent') + amount,
+            'loyalty_points': F('loyalty_points') + points_earned,
+        }
+        profile = cls.objects.filter(user_id=user_id)
+        if profile.update(**changes) or orders <= 0:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, total_orders=orders, total_spent=amount, loyalty_points=points_earned)
+        except IntegrityError:
+            # Another transaction created the profile first
+            profile.update(**changes)
+    
+    @classmethod
+    def update_orders_stats(cls, orders, sign=1):
+        """
+        update_order_stats for a batch of orders placed (sign=1) or deleted
+        (sign=-1), in one UPDATE however many customers they belong to.
+
+        Args:
+            orders (list): The orders concerned
+            sign (int): 1 for placed orders, -1 for deleted ones
+        """
+        stats = {}
+        for order in orders:
+            row = stats.setdefault(order.customer_id, {'total_orders': 0, 'total_spent': 0, 'loyalty_points': 0})
+            row['total_orders'] += sign
+            row['total_spent'] += sign * order.total_amount
+            if sign > 0:
+                row['loyalty_points'] += int(order.total_amount // 10)
+        if not stats:
+            return
+        if sign > 0:
+            cls.objects.bulk_create([cls(user_id=user_id) for user_id in stats], ignore_conflicts=True)
+
+        cls.objects.filter(user_id__in=list(stats)).update(**{
+            field: F(field) + Case(
+                *[When(user_id=user_id, then=Value(row[field])) for user_id, row in stats.items()],
+                default=Value(0),
+                output_field=cls._meta.get_field(field),
+            )
+            for field in cls.STATS_FIELDS
+        })
+    
+    def save_details(self):
+        """Save the profile without writing back its order statistics"""
+        self.save(update_fields=[
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.STATS_FIELDS
+        ])
@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.orders.models import Order
+from apps.orders.signals import announced, orders_deleting, orders_moved
+from .models import CustomUser, CustomerProfile
+
+
+@receiver(post_save, sender=CustomUser)
+def create_customer_profile(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Give every customer a profile, so their order stats have a row to update"""
+    if raw or instance.role != CustomUser.UserRole.CUSTOMER:
+        return
+    if created:
+        CustomerProfile.objects.create(user=instance)
+    elif update_fields is None or 'role' in update_fields:
+        # An existing user may just have become a customer
+        CustomerProfile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Order)
+def order_placed(sender, instance, created, **kwargs):
+    """Count an order towards its customer's stats once it leaves the cart"""
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if instance.status == Order.OrderStatus.PENDING:
+        return
+    if previous_status in (None, Order.OrderStatus.PENDING):
+        CustomerProfile.update_order_stats(instance.customer_id, instance.total_amount)
+        return
+    previous_total = getattr(instance, '_loaded_total', None)
+    if previous_total is not None and previous_total != instance.total_amount:
+        CustomerProfile.update_order_stats(instance.customer_id, instance.total_amount - previous_total, orders=0)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, origin=None, **kwargs):
+    """Take a deleted order back out of its customer's stats"""
+    if instance.status != Order.OrderStatus.PENDING and not announced(origin):
+        CustomerProfile.update_order_stats(instance.customer_id, -instance.total_amount, orders=-1)
+
+
+@receiver(orders_moved)
+def orders_placed(sender, orders, from_status, **kwargs):
+    """Count a batch of orders moved out of the cart together"""
+    if from_status == Order.OrderStatus.PENDING:
+        CustomerProfile.update_orders_stats(orders)
+
+
+@receiver(orders_deleting)
+def orders_deleted(sender, orders, **kwargs):
+    """Take a batch of deleted orders back out of their customers' stats"""
+    CustomerProfile.update_orders_stats([order for order in orders if order.status != Order.OrderStatus.PENDING], -1)
@@ -0,0 +1,221 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.orders.checkout_utils import checkout_order
+from apps.orders.models import MenuItem, Order, OrderItem
+from apps.orders.status_utils import transition_orders
+from .history_utils import order_history
+from .models import CustomUser, CustomerProfile
+
+
+class OrderHistoryTests(TestCase):
+    """Order history pages by (created_at, id) and lists stored line summaries"""
+
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user(username='diner', password='secret123')
+        self.naan = MenuItem.objects.create(name='Naan', description='Naan', price=Decimal('40.00'))
+        self.lassi = MenuItem.objects.create(name='Lassi', description='Lassi', price=Decimal('60.00'))
+
+    def place_orders(self, count, customer=None):
+        return [
+            checkout_order(customer or self.customer, [(self.naan.id, i + 1, self.naan.price)])
+            for i in range(count)
+        ]
+
+    def test_checkout_writes_line_summary(self):
+        order = checkout_order(self.customer, [(self.naan.id, 2, self.naan.price), (self.lassi.id, 1, self.lassi.price)])
+
+        order.refresh_from_db()
+        self.assertEqual(order.line_summary, '2× Naan, 1× Lassi')
+        self.assertEqual(order.total_amount, Decimal('140.00'))
+
+    def test_calculate_total_refreshes_line_summary(self):
+        order = checkout_order(self.customer, [(self.naan.id, 2, self.naan.price)])
+        OrderItem.objects.create(order=order, menu_item=self.lassi, quantity=3, price=self.lassi.price)
+
+        order.calculate_total()
+
+        order.refresh_from_db()
+        self.assertEqual(order.line_summary, '2× Naan, 3× Lassi')
+
+    def test_pages_cover_every_order_once_newest_first(self):
+        orders = self.place_orders(5)
+        # Orders placed in the same instant are told apart by id
+        Order.objects.filter(pk__in=[orders[1].pk, orders[2].pk, orders[3].pk]).update(created_at=orders[2].created_at)
+        self.place_orders(2, CustomUser.objects.create_user(username='other'))
+
+        seen, cursor, has_more = [], '', True
+        while has_more:
+            page, cursor, has_more = order_history(self.customer, cursor, limit=2)
+            self.assertLessEqual(len(page), 2)
+            seen.extend(page)
+
+        expected = list(Order.objects.filter(customer=self.customer).order_by('-created_at', '-id'))
+        self.assertEqual([order.id for order in seen], [order.id for order in expected])
+
+    @mock.patch('apps.accounts.history_utils.HISTORY_PAGE_SIZE', 2)
+    def test_load_more_endpoint(self):
+        orders = self.place_orders(3)
+        self.client.login(username='diner', password='secret123')
+
+        response = self.client.get(reverse('accounts:order_history'))
+        self.assertEqual([order.id for order in response.context['orders']], [orders[2].id, orders[1].id])
+        self.assertTrue(response.context['has_more'])
+        self.assertContains(response, '3× Naan')
+
+        data = self.client.get(reverse('accounts:order_history_more'), {'cursor': response.context['next_cursor']}).json()
+        self.assertEqual([order['id'] for order in data['orders']], [orders[0].id])
+        self.assertIn('1× Naan', data['orders'][0]['html'])
+        self.assertFalse(data['has_more'])
+
+    def test_load_more_rejects_bad_cursor(self):
+        self.client.login(username='diner', password='secret123')
+
+        response = self.client.get(reverse('accounts:order_history_more'), {'cursor': 'nope'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CustomerProfileStatsTests(TestCase):
+    """Profile stats are kept up to date as orders are placed"""
+
+    def setUp(self):
+        self.customer = CustomUser.objects.create_user(username='diner', password='secret123')
+        self.naan = MenuItem.objects.create(name='Naan', description='Naan', price=Decimal('40.00'))
+
+    def place(self, quantity):
+        return checkout_order(self.customer, [(self.naan.id, quantity, self.naan.price)])
+
+    def test_new_customer_gets_a_profile(self):
+        self.assertTrue(CustomerProfile.objects.filter(user=self.customer).exists())
+        staff = CustomUser.objects.create_user(username='chef', role=CustomUser.UserRole.KITCHEN)
+        self.assertFalse(CustomerProfile.objects.filter(user=staff).exists())
+
+    def test_placing_orders_updates_stats(self):
+        self.place(3)
+        self.place(1)
+
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.assertEqual(profile.total_orders, 2)
+        self.assertEqual(profile.total_spent, Decimal('160.00'))
+        self.assertEqual(profile.loyalty_points, 16)
+
+    def test_status_changes_after_placement_do_not_count_again(self):
+        order = self.place(2)
+        order.status = Order.OrderStatus.COMPLETED
+        order.save()
+
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.assertEqual(profile.total_orders, 1)
+        self.assertEqual(profile.total_spent, Decimal('80.00'))
+
+    def test_bulk_moves_out_of_the_cart_count_each_order(self):
+        other = CustomUser.objects.create_user(username='other')
+        for customer, total in ((self.customer, '80.00'), (other, '45.00')):
+            Order.objects.create(customer=customer, total_amount=Decimal(total))
+
+        transition_orders(Order.objects.all(), Order.OrderStatus.PENDING, Order.OrderStatus.CONFIRMED)
+
+        self.assertEqual(
+            sorted(CustomerProfile.objects.values_list('user', 'total_orders', 'total_spent', 'loyalty_points')),
+            [(self.customer.id, 1, Decimal('80.00'), 8), (other.id, 1, Decimal('45.00'), 4)],
+        )
+
+    def test_missing_profile_is_created_on_first_order(self):
+        CustomerProfile.objects.filter(user=self.customer).delete()
+
+        self.place(2)
+
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.assertEqual((profile.total_orders, profile.total_spent), (1, Decimal('80.00')))
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.place(2)
+        self.place(1)
+        CustomerProfile.objects.filter(user=self.customer).update(total_orders=7)
+        other = CustomUser.objects.create_user(username='other')
+        CustomerProfile.objects.filter(user=other).delete()
+
+        out = StringIO()
+        call_command('reconcile_customer_stats', stdout=out)
+        self.assertIn('1 customer(s) without a profile, 1 profile(s) with drifted stats.', out.getvalue())
+        self.assertEqual(CustomerProfile.objects.get(user=self.customer).total_orders, 7)
+
+        call_command('reconcile_customer_stats', '--fix', stdout=StringIO())
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.assertEqual((profile.total_orders, profile.total_spent), (2, Decimal('120.00')))
+        self.assertEqual(CustomerProfile.objects.get(user=other).total_orders, 0)
+
+        out = StringIO()
+        call_command('reconcile_customer_stats', stdout=out)
+        self.assertIn('All customer stats match their orders.', out.getvalue())
+
+    def test_profile_page_reads_stats_from_profile(self):
+        self.place(2)
+        self.client.login(username='diner', password='secret123')
+
+        response = self.client.get(reverse('accounts:profile'))
+
+        self.assertEqual(response.context['total_orders'], 1)
+        self.assertEqual(response.context['total_spent'], Decimal('80.00'))
+
+    def test_deleting_a_placed_order_takes_it_out_of_the_stats(self):
+        self.place(2)
+        self.place(1).delete()
+
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.assertEqual((profile.total_orders, profile.total_spent), (1, Decimal('80.00')))
+        # Points already earned are kept
+        self.assertEqual(profile.loyalty_points, 12)
+
+        out = StringIO()
+        call_command('reconcile_customer_stats', stdout=out)
+        self.assertIn('All customer stats match their orders.', out.getvalue())
+
+    def test_total_change_after_placement_moves_total_spent(self):
+        order = self.place(2)
+        order.total_amount = Decimal('100.00')
+        order.save()
+
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.assertEqual((profile.total_orders, profile.total_spent), (1, Decimal('100.00')))
+
+    def test_saving_profile_details_keeps_newer_stats(self):
+        profile = CustomerProfile.objects.get(user=self.customer)
+        self.place(2)
+
+        profile.city = 'Chennai'
+        profile.save_details()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.city, 'Chennai')
+        self.assertEqual((profile.total_orders, profile.total_spent), (1, Decimal('80.00')))
+
+    def test_user_who_becomes_a_customer_gets_a_profile(self):
+        chef = CustomUser.objects.create_user(username='chef', role=CustomUser.UserRole.KITCHEN)
+        chef.role = CustomUser.UserRole.CUSTOMER
+        chef.save(update_fields=['role'])
+
+        self.assertTrue(CustomerProfile.objects.filter(user=chef).exists())
+
+    def test_profile_pages_recreate_a_missing_profile(self):
+        CustomerProfile.objects.filter(user=self.customer).delete()
+        self.client.login(username='diner', password='secret123')
+
+        self.assertEqual(self.client.get(reverse('accounts:profile')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('accounts:edit_profile')).status_code, 200)
+        self.assertEqual(CustomerProfile.objects.filter(user=self.customer).count(), 1)
+
+    def test_profile_page_does_not_create_profiles(self):
+        self.client.login(username='diner', password='secret123')
+
+        with mock.patch.object(CustomerProfile.objects, 'get_or_create') as get_or_create:
+            self.client.get(reverse('accounts:profile'))
+            self.client.get(reverse('accounts:edit_profile'))
+
+        get_or_create.assert_not_called()
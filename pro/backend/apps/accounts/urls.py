@@ -13,4 +13,5 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
     path('orders/', views.order_history_view, name='order_history'),
+    path('orders/more/', views.order_history_more_view, name='order_history_more'),
 ]
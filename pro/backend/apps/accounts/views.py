@@ -2,9 +2,12 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count
+from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.utils import timezone
+from .history_utils import order_history
 from .models import CustomUser, CustomerProfile
+from apps.orders.cursor_utils import InvalidCursor
 from apps.orders.models import Order
 
 
@@ -88,10 +91,13 @@ def customer_signup_view(request):
             messages.error(request, 'Email already exists.')
             return render(request, 'accounts/customer-signup.html')
 
-        user = CustomUser.objects.create_user(username=username, email=email, password=password)
-        user.phone_number = phone_number
-        user.role = CustomUser.UserRole.CUSTOMER
-        user.save()
+        user = CustomUser.objects.create_user(
+            username=username,
+            email=email,
+            password=password,
+            phone_number=phone_number,
+            role=CustomUser.UserRole.CUSTOMER,
+        )
 
         login(request, user)
         messages.success(request, f'Account created successfully! Welcome, {user.username}!')
@@ -108,6 +114,15 @@ def logout_view(request):
     return redirect('main:index')
 
 
+def _customer_profile(user):
+    """The customer's profile, created if the account was made outside signup"""
+    try:
+        return user.customer_profile
+    except CustomerProfile.DoesNotExist:
+        # e.g. created with createsuperuser or in the admin, or the profile was deleted
+        return CustomerProfile.objects.get_or_create(user=user)[0]
+
+
 @login_required
 def profile_view(request):
     """Customer profile view"""
@@ -115,23 +130,17 @@ def profile_view(request):
         messages.error(request, 'Access denied. This page is for customers only.')
         return redirect('main:index')
     
-    # Get or create customer profile
-    profile, created = CustomerProfile.objects.get_or_create(user=request.user)
+    profile = _customer_profile(request.user)
     
     # Get order history
     orders = Order.objects.filter(customer=request.user).order_by('-created_at')[:10]
     
-    # Calculate statistics
-    total_orders = Order.objects.filter(customer=request.user).count()
-    total_spent = Order.objects.filter(customer=request.user).aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-    
+    # Statistics are kept on the profile as orders are placed
     context = {
         'profile': profile,
         'orders': orders,
-        'total_orders': total_orders,
-        'total_spent': total_spent,
+        'total_orders': profile.total_orders,
+        'total_spent': profile.total_spent,
     }
     
     return render(request, 'accounts/profile.html', context)
@@ -144,7 +153,7 @@ def edit_profile_view(request):
         messages.error(request, 'Access denied. This page is for customers only.')
         return redirect('main:index')
     
-    profile, created = CustomerProfile.objects.get_or_create(user=request.user)
+    profile = _customer_profile(request.user)
     
     if request.method == 'POST':
         # Update personal information
@@ -183,12 +192,13 @@ def edit_profile_view(request):
                 messages.error(request, 'Invalid date format for date of birth.')
         
         try:
-            profile.save()
+            # Order stats may have moved since the profile was read
+            profile.save_details()
             
             # Update user phone number if provided
             if request.POST.get('phone_number'):
                 request.user.phone_number = request.POST.get('phone_number')
-                request.user.save()
+                request.user.save(update_fields=['phone_number'])
             
             messages.success(request, 'Profile updated successfully!')
             return redirect('accounts:profile')
@@ -209,10 +219,42 @@ def order_history_view(request):
         messages.error(request, 'Access denied. This page is for customers only.')
         return redirect('main:index')
     
-    orders = Order.objects.filter(customer=request.user).order_by('-created_at')
+    # First page only; older orders are fetched by order_history_more_view
+    orders, next_cursor, has_more = order_history(request.user)
     
     context = {
         'orders': orders,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
     }
     
     return render(request, 'accounts/order_history.html', context)
+
+
+@login_required
+def order_history_more_view(request):
+    """
+    Next page of the customer's order history, for the Load more button.
+
+    Pass the cursor from the page (or the previous response) as ?cursor=.
+    """
+    if not request.user.is_customer():
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    try:
+        orders, next_cursor, has_more = order_history(request.user, request.GET.get('cursor', ''))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'orders': [
+            {
+                'id': order.id,
+                'status': order.status,
+                'html': render_to_string('accounts/order-history-card.html', {'order': order}, request=request),
+            }
+            for order in orders
+        ],
+        'cursor': next_cursor,
+        'has_more': has_more,
+    })
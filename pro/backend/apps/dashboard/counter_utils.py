@@ -0,0 +1,163 @@
+"""
+Dashboard counters for DineAt
+
+Order signals translate every status change into deltas on a handful of
+DashboardCounter rows, applied with F() updates in the same transaction
+as the order write. Admin clients share one cached stats snapshot built
+from those rows and today's sales rollups, so a poll costs one cache
+read (or two small indexed queries) however long the order history is.
+"""
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from apps.orders.models import Order
+from .models import DashboardCounter
+from .rollup_utils import revenue_on
+
+STATUS_KEY = 'orders:{}'
+STATS_SNAPSHOT_KEY = 'dashboard:stats:{}:{}'
+STATS_SNAPSHOT_TTL = 60 * 60
+# Bumped on every invalidation; snapshots are stored under the version
+# that was current before their queries ran
+STATS_VERSION_KEY = 'dashboard:stats:version'
+
+
+def _order_deltas(status, sign):
+    """Counter deltas contributed by one order in a given state"""
+    if status in (None, Order.OrderStatus.PENDING):
+        return {}
+    return {STATUS_KEY.format(status): Decimal(sign)}
+
+
+def _apply(deltas):
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        counter = DashboardCounter.objects.filter(key=key)
+        if counter.update(value=F('value') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                DashboardCounter.objects.create(key=key, value=delta)
+        except IntegrityError:
+            # Another transaction created the row first
+            counter.update(value=F('value') + delta)
+
+    transaction.on_commit(invalidate_stats)
+
+
+def record_order_change(order, previous_status):
+    """
+    Move the counters from an order's previous status to its current one.
+
+    Args:
+        order (Order): The order after the change
+        previous_status (str): Stored status before the change, None if new
+    """
+    record_orders_moved([order], previous_status)
+
+
+def record_orders_moved(orders, previous_status):
+    """Move the counters for orders that all left previous_status, in one update per counter"""
+    deltas = defaultdict(Decimal)
+    for order in orders:
+        for status, sign in ((previous_status, -1), (order.status, 1)):
+            for key, delta in _order_deltas(status, sign).items():
+                deltas[key] += delta
+    _apply(deltas)
+
+
+def record_order_removed(order):
+    """Take a deleted order out of the counters"""
+    record_orders_removed([order])
+
+
+def record_orders_removed(orders):
+    """Take deleted orders out of the counters, in one update per counter"""
+    deltas = defaultdict(Decimal)
+    for order in orders:
+        for key, delta in _order_deltas(order.status, -1).items():
+            deltas[key] += delta
+    _apply(deltas)
+
+
+def dashboard_stats():
+    """
+    Shared stats snapshot for every admin client.
+
+    Returns:
+        dict: total_orders, pending_orders, active_orders and today_revenue
+              (orders completed today, from the sales rollups)
+    """
+    today = timezone.localdate()
+    snapshot_key = STATS_SNAPSHOT_KEY.format(today.isoformat(), _stats_version())
+    stats = cache.get(snapshot_key)
+    if stats is not None:
+        return stats
+
+    status_keys = {status: STATUS_KEY.format(status) for status in Order.OrderStatus.values}
+    values = dict(DashboardCounter.objects.filter(key__in=status_keys.values()).values_list('key', 'value'))
+
+    def count(status):
+        return int(values.get(status_keys[status], 0))
+
+    stats = {
+        'total_orders': sum(count(status) for status in Order.OrderStatus.values if status != Order.OrderStatus.PENDING),
+        'pending_orders': count(Order.OrderStatus.CONFIRMED),
+        'active_orders': count(Order.OrderStatus.PREPARING) + count(Order.OrderStatus.READY),
+        'today_revenue': revenue_on(today),
+    }
+    cache.set(snapshot_key, stats, STATS_SNAPSHOT_TTL)
+    return stats
+
+
+def _stats_version():
+    version = cache.get(STATS_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version never revives old snapshots
+        cache.add(STATS_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(STATS_VERSION_KEY)
+    return version
+
+
+def invalidate_stats():
+    """
+    Move on to a new stats version so the next reader rebuilds the snapshot.
+
+    A reader that built its snapshot from data older than this change
+    stores it under the previous version, where nobody looks any more.
+    """
+    try:
+        cache.incr(STATS_VERSION_KEY)
+    except ValueError:
+        # No version yet, so no snapshot either
+        pass
+
+
+def rebuild_counters():
+    """
+    Recompute every counter from the orders table.
+
+    Returns:
+        int: number of counter rows written
+    """
+    placed = Order.objects.exclude(status=Order.OrderStatus.PENDING)
+    counters = {
+        STATUS_KEY.format(row['status']): Decimal(row['count'])
+        for row in placed.values('status').annotate(count=Count('id')).order_by()
+    }
+
+    with transaction.atomic():
+        DashboardCounter.objects.all().delete()
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(key=key, value=value) for key, value in counters.items()],
+            batch_size=1000,
+        )
+        transaction.on_commit(invalidate_stats)
+    return len(counters)
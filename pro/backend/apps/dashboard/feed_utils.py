@@ -0,0 +1,53 @@
+"""
+Recent-order changes feed for the DineAt admin dashboard
+
+The feed follows the order event log (apps.orders.event_utils) rather
+than order timestamps. The cursor is the id of the last event a client
+has seen, and event ids follow commit order, so a change committed late
+or stamped by a server with a skewed clock still lands after the cursor
+instead of behind it. Each page lists the orders touched by the next
+events (placed, moved, edited in any other way, or removed), as they are
+now, and the ids of those that were deleted.
+"""
+from apps.orders.cursor_utils import InvalidCursor
+from apps.orders.event_utils import events_since, latest_event_id
+from apps.orders.models import Order
+
+CHANGES_PAGE_SIZE = 50
+
+
+def latest_cursor():
+    """Cursor just past the newest change"""
+    return str(latest_event_id())
+
+
+def order_changes(cursor='', limit=None):
+    """
+    Placed orders changed after cursor, least recently changed first.
+
+    Returns:
+        tuple: (orders, ids of deleted orders, next cursor, whether more
+            changes are waiting)
+
+    Raises:
+        InvalidCursor: if cursor is malformed
+        EventsExpired: if changes after cursor can no longer be replayed
+    """
+    limit = limit or CHANGES_PAGE_SIZE
+    try:
+        cursor = int(cursor or 0)
+    except ValueError:
+        raise InvalidCursor('Malformed cursor.')
+
+    events = events_since(cursor)[0]
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    # An order changed several times on the page is listed once, at its last change
+    order_ids = list(dict.fromkeys(event['order_id'] for event in reversed(events)))[::-1]
+    found = Order.objects.exclude(status=Order.OrderStatus.PENDING).select_related('customer', 'table').in_bulk(order_ids)
+
+    orders = [found[order_id] for order_id in order_ids if order_id in found]
+    removed = [order_id for order_id in order_ids if order_id not in found]
+    next_cursor = str(events[-1]['id']) if events else str(cursor)
+    return orders, removed, next_cursor, has_more
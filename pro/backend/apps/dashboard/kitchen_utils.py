@@ -0,0 +1,142 @@
+"""
+Kitchen board rendering for DineAt
+
+The board is built from one query of active orders, split into columns in
+Python. Each order card is cached as an HTML fragment keyed by the order
+id and its updated_at, so a refresh only re-renders (and only loads the
+items of) tickets that changed since they were last drawn. The prep
+ticket the scheduler needs (see prep_utils) is cached the same way.
+"""
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery, prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from apps.orders.models import MenuItem, Order, OrderItem, OrderStatusEvent
+from apps.orders.status_utils import StatusConflict, claim_next, transition_item
+from .prep_utils import order_ticket, plan_prep
+
+KITCHEN_CARD_KEY = 'kitchen:card:{}:{}'
+KITCHEN_TICKET_KEY = 'kitchen:ticket:{}:{}'
+KITCHEN_CARD_TTL = 60 * 60 * 12
+
+
+def kitchen_card_key(order):
+    """Cache key of an order card; any save of the order changes it"""
+    return KITCHEN_CARD_KEY.format(order.id, order.updated_at.timestamp())
+
+
+def kitchen_ticket_key(order):
+    return KITCHEN_TICKET_KEY.format(order.id, order.updated_at.timestamp())
+
+
+def render_kitchen_cards(orders):
+    """
+    Attach the rendered card of every order as order.card_html and its
+    prep ticket as order.ticket.
+
+    Cards and tickets are fetched from the cache in one round trip; only
+    the misses get their items loaded and their templates rendered.
+    """
+    card_keys = {order.id: kitchen_card_key(order) for order in orders}
+    ticket_keys = {order.id: kitchen_ticket_key(order) for order in orders}
+    cached = cache.get_many([*card_keys.values(), *ticket_keys.values()])
+
+    missing = [
+        order for order in orders
+        if card_keys[order.id] not in cached or ticket_keys[order.id] not in cached
+    ]
+    if missing:
+        prefetch_related_objects(missing, 'items__menu_item')
+        fresh = {}
+        for order in missing:
+            fresh[card_keys[order.id]] = render_to_string('dashboard/kitchen-card.html', {'order': order})
+            fresh[ticket_keys[order.id]] = order_ticket(order)
+        cache.set_many(fresh, KITCHEN_CARD_TTL)
+        cached.update(fresh)
+
+    for order in orders:
+        order.card_html = mark_safe(cached[card_keys[order.id]])
+        order.ticket = cached[ticket_keys[order.id]]
+
+
+def _reached_status(status):
+    """When an order last moved into status, from the status log"""
+    return Subquery(
+        OrderStatusEvent.objects.filter(order=OuterRef('pk'), to_status=status)
+        .order_by('-created_at')
+        .values('created_at')[:1]
+    )
+
+
+def kitchen_board(now=None):
+    """
+    Active orders split by kitchen status, with their cards rendered.
+
+    Confirmed and preparing orders come in the order the prep plan expects
+    them to be ready, each with a projected_ready time.
+
+    Returns:
+        tuple: ({status: [orders]} for every status in
+        Order.KITCHEN_STATUSES, list of PrepBatch)
+    """
+    orders = list(
+        Order.objects.filter(status__in=Order.KITCHEN_STATUSES)
+        .select_related('customer', 'table', 'claimed_by')
+        .annotate(
+            # Orders placed before the status log fall back to their timestamps
+            placed_at=Coalesce(_reached_status(Order.OrderStatus.CONFIRMED), F('created_at')),
+            status_since=Coalesce(_reached_status(OuterRef('status')), F('updated_at')),
+        )
+    )
+    render_kitchen_cards(orders)
+
+    open_orders = [order for order in orders if order.status != Order.OrderStatus.READY]
+    planned, batches = plan_prep(open_orders, now)
+
+    columns = {status: [] for status in Order.KITCHEN_STATUSES}
+    for order in planned + [order for order in orders if order.status == Order.OrderStatus.READY]:
+        columns[order.status].append(order)
+    return columns, batches
+
+
+def station_items(station):
+    """Unfinished items of open orders made at a station, oldest order first"""
+    return OrderItem.objects.filter(
+        status__in=(OrderItem.ItemStatus.QUEUED, OrderItem.ItemStatus.PREPARING),
+        order__status__in=(Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING),
+        menu_item__category__in=MenuItem.station_categories(station),
+    ).order_by('order_id', 'id')
+
+
+def station_queue(station):
+    """
+    Items a kitchen station still has to make, oldest order first.
+
+    Args:
+        station (str): One of MenuItem.Station
+
+    Returns:
+        list: OrderItems with their menu item, order and cook loaded
+    """
+    return list(station_items(station).select_related('menu_item', 'order__table', 'claimed_by'))
+
+
+def claim_next_station_item(station, user):
+    """
+    Give the oldest queued item of a station to user and start it.
+
+    Returns:
+        OrderItem: the claimed item, None when nothing is queued
+    """
+    queued = station_items(station).filter(status=OrderItem.ItemStatus.QUEUED)
+    while True:
+        item_id = claim_next(queued, user)
+        if item_id is None:
+            return None
+        try:
+            return transition_item(item_id, OrderItem.ItemStatus.QUEUED, OrderItem.ItemStatus.PREPARING, user)
+        except StatusConflict:
+            # The order left the kitchen since the item was claimed
+            continue
@@ -0,0 +1,73 @@
+import itertools
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from apps.dashboard.rollup_utils import POPULAR_WINDOWS, rebuild_rollups, top_menu_items
+from apps.main.benchmark_utils import add_not_prod_argument, check_not_prod, rolled_back, time_calls
+from apps.orders.models import MenuItem, Order, OrderItem
+
+LINES_PER_ORDER = 5
+
+
+class Command(BaseCommand):
+    help = 'Compare the popular items scan over OrderItem with the maintained sales counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Number of order items to generate')
+        parser.add_argument('--menu-items', type=int, default=200, help='Number of menu items to generate')
+        parser.add_argument('--rounds', type=int, default=5, help='Timed runs per query')
+        add_not_prod_argument(parser)
+
+    def handle(self, *args, **options):
+        check_not_prod(options)
+        rng = random.Random(42)
+        statuses = [Order.OrderStatus.COMPLETED] * 8 + [Order.OrderStatus.CANCELLED, Order.OrderStatus.CONFIRMED]
+
+        with rolled_back():
+            customer = get_user_model().objects.create_user(username='popular-benchmark', password=None)
+            dishes = MenuItem.objects.bulk_create([
+                MenuItem(name=f'Dish {i}', description=f'Dish {i}', price=Decimal(rng.randint(50, 500)))
+                for i in range(options['menu_items'])
+            ])
+            # A few dishes sell far more than the rest
+            cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(dishes))))
+
+            started = time.perf_counter()
+            orders = Order.objects.bulk_create(
+                [Order(customer=customer, status=rng.choice(statuses)) for _ in range(options['rows'] // LINES_PER_ORDER)],
+                batch_size=5000,
+            )
+            lines = []
+            for order in orders:
+                chosen = set()
+                while len(chosen) < LINES_PER_ORDER:
+                    chosen.update(rng.choices(dishes, cum_weights=cum_weights, k=LINES_PER_ORDER))
+                chosen = list(chosen)[:LINES_PER_ORDER]
+                lines.extend(
+                    OrderItem(order=order, menu_item=dish, quantity=rng.randint(1, 3), price=dish.price)
+                    for dish in chosen
+                )
+                if len(lines) >= 50000:
+                    OrderItem.objects.bulk_create(lines, batch_size=5000)
+                    lines = []
+            OrderItem.objects.bulk_create(lines, batch_size=5000)
+            self.stdout.write(f"Generated {OrderItem.objects.count()} order items in {time.perf_counter() - started:.1f} s")
+
+            started = time.perf_counter()
+            rebuild_rollups(chunk_size=5000)
+            self.stdout.write(f"Rebuilt the sales counters in {time.perf_counter() - started:.1f} s\n")
+
+            scan_ms = statistics.median(time_calls(options['rounds'], lambda: list(
+                MenuItem.objects.annotate(order_count=Count('order_items')).order_by('-order_count')[:5]
+            )))
+            self.stdout.write(f"{'query':<28}{'ms':>10}")
+            self.stdout.write(f"{'annotate scan (old)':<28}{scan_ms:>10.1f}")
+            for window in POPULAR_WINDOWS:
+                window_ms = statistics.median(time_calls(options['rounds'], lambda: top_menu_items(5, window)))
+                self.stdout.write(f"{'counters, ' + window:<28}{window_ms:>10.1f}")
@@ -0,0 +1,65 @@
+import random
+import statistics
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.dashboard.kitchen_utils import kitchen_board
+from apps.dashboard.prep_utils import plan_prep
+from apps.main.benchmark_utils import add_not_prod_argument, check_not_prod, rolled_back, time_calls
+from apps.orders.models import MenuItem, Order, OrderItem
+
+DISHES = ['Naan', 'Paneer Tikka', 'Dal Makhani', 'Biryani', 'Masala Dosa', 'Lassi', 'Samosa', 'Chole Bhature']
+
+
+class Command(BaseCommand):
+    help = 'Time the kitchen board and its prep plan with many open orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500, help='Number of open orders to generate')
+        parser.add_argument('--rounds', type=int, default=20, help='Timed runs per measurement')
+        add_not_prod_argument(parser)
+
+    def handle(self, *args, **options):
+        check_not_prod(options)
+        rng = random.Random(42)
+
+        with rolled_back():
+            customer = get_user_model().objects.create_user(username='prep-benchmark', password=None)
+            dishes = MenuItem.objects.bulk_create([
+                MenuItem(name=name, description=name, price=Decimal(rng.randint(50, 400)),
+                         preparation_time=rng.choice([5, 10, 15, 20, 30]))
+                for name in DISHES
+            ])
+            orders = Order.objects.bulk_create([
+                Order(customer=customer, status=rng.choice([Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING]))
+                for _ in range(options['orders'])
+            ])
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, menu_item=dish, quantity=rng.randint(1, 3), price=dish.price)
+                for order in orders
+                for dish in rng.sample(dishes, rng.randint(1, 4))
+            ], batch_size=1000)
+
+            # The generated orders have never been drawn, so the first board is cold
+            cold_ms = time_calls(1, kitchen_board)[0]
+            warm_ms = statistics.median(time_calls(options['rounds'], kitchen_board))
+
+            # One order moves: only its card and ticket are rebuilt
+            moved = Order.objects.filter(status=Order.OrderStatus.CONFIRMED).first()
+            moved.status = Order.OrderStatus.PREPARING
+            moved.save()
+            changed_ms = time_calls(1, kitchen_board)[0]
+
+            columns, batches = kitchen_board()
+            open_orders = columns[Order.OrderStatus.CONFIRMED] + columns[Order.OrderStatus.PREPARING]
+            now = timezone.now()
+            plan_ms = statistics.median(time_calls(options['rounds'], lambda: plan_prep(open_orders, now)))
+
+            self.stdout.write(f"{len(open_orders)} open orders, {len(batches)} prep batches")
+            self.stdout.write(f"{'board, cold cache':<28}{cold_ms:>10.1f} ms")
+            self.stdout.write(f"{'board, warm cache':<28}{warm_ms:>10.1f} ms")
+            self.stdout.write(f"{'board, one order changed':<28}{changed_ms:>10.1f} ms")
+            self.stdout.write(f"{'prep plan only':<28}{plan_ms:>10.1f} ms")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.counter_utils import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the admin dashboard counters from the orders table'
+
+    def handle(self, *args, **options):
+        written = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} dashboard counter(s).'))
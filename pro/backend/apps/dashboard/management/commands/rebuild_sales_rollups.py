@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.dashboard.rollup_utils import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly and per-menu-item sales rollups from completed orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Orders read per query')
+
+    def handle(self, *args, **options):
+        summed = rebuild_rollups(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups from {summed} completed order(s).'))
@@ -0,0 +1,57 @@
+# Generated by Django 5.0 on 2026-10-17 19:27
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def seed_counters(apps, schema_editor):
+    """Start the counters from the orders already in the database"""
+    Order = apps.get_model('orders', 'Order')
+    DashboardCounter = apps.get_model('dashboard', 'DashboardCounter')
+
+    placed = Order.objects.exclude(status='PENDING')
+    counters = {
+        f"orders:{row['status']}": Decimal(row['count'])
+        for row in placed.values('status').annotate(count=Count('id')).order_by()
+    }
+    revenue_rows = (
+        placed.annotate(day=TruncDate('created_at'))
+        .values('day', 'status')
+        .annotate(revenue=Sum('total_amount'))
+        .order_by()
+    )
+    for row in revenue_rows:
+        counters[f"revenue:{row['day'].isoformat()}:{row['status']}"] = row['revenue']
+
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(key=key, value=value) for key, value in counters.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orders', '0003_cart_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Counter',
+                'verbose_name_plural': 'Dashboard Counters',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0 on 2026-10-17 19:48
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+        ('orders', '0007_ticket_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('orders', models.IntegerField(default=0)),
+                ('items', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Hourly Sales',
+                'verbose_name_plural': 'Hourly Sales',
+                'ordering': ['day', 'hour'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Menu Item Sales',
+                'verbose_name_plural': 'Menu Item Sales',
+                'ordering': ['day', 'menu_item'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hourlysales',
+            constraint=models.UniqueConstraint(fields=('day', 'hour'), name='unique_hourly_sales'),
+        ),
+        migrations.AddField(
+            model_name='menuitemsales',
+            name='menu_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='orders.menuitem'),
+        ),
+        migrations.AddConstraint(
+            model_name='menuitemsales',
+            constraint=models.UniqueConstraint(fields=('day', 'menu_item'), name='unique_menu_item_sales'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0 on 2026-10-17 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_sales_rollups'),
+        ('orders', '0007_ticket_claims'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitemsales',
+            name='ordered',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='MenuItemPopularity',
+            fields=[
+                ('menu_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='orders.menuitem')),
+                ('ordered', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Menu Item Popularity',
+                'verbose_name_plural': 'Menu Item Popularity',
+                'indexes': [models.Index(fields=['-ordered'], name='menu_item_popularity_idx')],
+            },
+        ),
+    ]
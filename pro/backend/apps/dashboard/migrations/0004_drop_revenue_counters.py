@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-17 21:05
+
+from django.db import migrations
+
+
+def drop_revenue_counters(apps, schema_editor):
+    """Today's revenue is read from the sales rollups; its counters are no longer kept"""
+    DashboardCounter = apps.get_model('dashboard', 'DashboardCounter')
+    DashboardCounter.objects.filter(key__startswith='revenue:').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_menu_item_popularity'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_revenue_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,99 @@
+from django.db import models
+from decimal import Decimal
+
+
+class DashboardCounter(models.Model):
+    """
+    Running totals behind the admin dashboard.
+
+    Rows are keyed "orders:<STATUS>", e.g. "orders:CONFIRMED" for the
+    number of orders in that status. They are kept current by order
+    signals, so reading the dashboard never scans the orders table.
+    Revenue comes from HourlySales instead.
+    """
+    
+    key = models.CharField(max_length=64, unique=True)
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Dashboard Counter'
+        verbose_name_plural = 'Dashboard Counters'
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class HourlySales(models.Model):
+    """
+    Completed orders per local hour: how many, their revenue and the
+    number of dishes sold. Days are the sum of their hours.
+    """
+    
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    orders = models.IntegerField(default=0)
+    items = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    
+    class Meta:
+        verbose_name = 'Hourly Sales'
+        verbose_name_plural = 'Hourly Sales'
+        ordering = ['day', 'hour']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'hour'], name='unique_hourly_sales'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.hour:02d}:00 - {self.orders} orders, ₹{self.revenue}"
+
+
+class MenuItemSales(models.Model):
+    """
+    Sales of a menu item per local day: quantity and revenue in orders
+    completed that day, and quantity in orders placed that day.
+    """
+    
+    day = models.DateField()
+    menu_item = models.ForeignKey(
+        'orders.MenuItem',
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    ordered = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Menu Item Sales'
+        verbose_name_plural = 'Menu Item Sales'
+        ordering = ['day', 'menu_item']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'menu_item'], name='unique_menu_item_sales'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.menu_item_id} - {self.quantity} sold, ₹{self.revenue}"
+
+
+class MenuItemPopularity(models.Model):
+    """All-time quantity of a menu item in placed orders"""
+    
+    menu_item = models.OneToOneField(
+        'orders.MenuItem',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity'
+    )
+    ordered = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Menu Item Popularity'
+        verbose_name_plural = 'Menu Item Popularity'
+        indexes = [
+            # Top-K reads walk this index from the top
+            models.Index(fields=['-ordered'], name='menu_item_popularity_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.menu_item_id} - {self.ordered} ordered"
@@ -0,0 +1,113 @@
+"""
+Kitchen prep scheduling for DineAt
+
+Open tickets are planned earliest-deadline-first. The dishes of one order
+cook side by side, so an order takes as long as its slowest item
+(MenuItem.preparation_time) and is due that long after it was placed.
+The kitchen works on KITCHEN_PREP_SLOTS tickets at once: tickets being
+prepared keep their slot, confirmed ones are queued by deadline into the
+first slot that frees up, which gives every order a projected ready time.
+Identical dishes across open orders are grouped into batches
+("6x Naan across 4 orders") so they can be cooked together.
+
+The plan is plain Python over each order's ticket, which the kitchen board
+caches per order version; a refresh after an order arrives or moves only
+re-reads that order and re-runs the (n log n) plan.
+"""
+import heapq
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.orders.models import Order
+
+KITCHEN_PREP_SLOTS = 4
+
+
+def order_ticket(order):
+    """
+    What the kitchen has to cook for an order, from its prefetched items.
+
+    Returns:
+        list: (menu_item_id, name, quantity, preparation_time) tuples
+    """
+    return [
+        (item.menu_item_id, item.menu_item.name, item.quantity, item.menu_item.preparation_time)
+        for item in order.items.all()
+    ]
+
+
+class PrepBatch:
+    """One dish to cook across several open orders"""
+
+    def __init__(self, menu_item_id, name, preparation_time):
+        self.menu_item_id = menu_item_id
+        self.name = name
+        self.preparation_time = preparation_time
+        self.quantity = 0
+        self.order_ids = []
+        self.deadline = None
+
+    def add(self, order, quantity):
+        self.quantity += quantity
+        self.order_ids.append(order.id)
+        if self.deadline is None or order.deadline < self.deadline:
+            self.deadline = order.deadline
+
+    @property
+    def order_count(self):
+        return len(self.order_ids)
+
+    def __str__(self):
+        orders = 'order' if self.order_count == 1 else 'orders'
+        return f'{self.quantity}× {self.name} across {self.order_count} {orders}'
+
+
+def plan_prep(orders, now=None, slots=None):
+    """
+    Schedule open orders earliest-deadline-first.
+
+    Sets deadline, projected_ready and is_late on every order.
+
+    Args:
+        orders (list): CONFIRMED and PREPARING orders with ticket, placed_at
+            (when the order was confirmed) and status_since (when it reached
+            its current status)
+        now (datetime): Planning time, defaults to now
+        slots (int): Tickets the kitchen prepares at once, defaults to
+            KITCHEN_PREP_SLOTS
+
+    Returns:
+        tuple: (orders in the order they will be ready, list of PrepBatch
+        sorted by deadline)
+    """
+    now = now or timezone.now()
+    slots = slots or KITCHEN_PREP_SLOTS
+    for order in orders:
+        order.prep_minutes = max((line[3] for line in order.ticket), default=0)
+        order.deadline = order.placed_at + timedelta(minutes=order.prep_minutes)
+
+    def by_deadline(order):
+        return (order.deadline, order.id)
+
+    # Times at which busy slots free up
+    busy_until = []
+    for order in sorted((o for o in orders if o.status == Order.OrderStatus.PREPARING), key=by_deadline):
+        order.projected_ready = max(now, order.status_since + timedelta(minutes=order.prep_minutes))
+        heapq.heappush(busy_until, order.projected_ready)
+
+    for order in sorted((o for o in orders if o.status == Order.OrderStatus.CONFIRMED), key=by_deadline):
+        start = now if len(busy_until) < slots else max(now, heapq.heappop(busy_until))
+        order.projected_ready = start + timedelta(minutes=order.prep_minutes)
+        heapq.heappush(busy_until, order.projected_ready)
+
+    batches = {}
+    for order in orders:
+        order.is_late = order.projected_ready > order.deadline
+        for menu_item_id, name, quantity, preparation_time in order.ticket:
+            if menu_item_id not in batches:
+                batches[menu_item_id] = PrepBatch(menu_item_id, name, preparation_time)
+            batches[menu_item_id].add(order, quantity)
+
+    planned = sorted(orders, key=lambda order: (order.projected_ready, order.deadline, order.id))
+    return planned, sorted(batches.values(), key=lambda batch: (batch.deadline, batch.name))
@@ -0,0 +1,359 @@
+"""
+Sales rollups for DineAt
+
+Completed orders are summed into HourlySales (orders, dishes and revenue
+per local hour) and MenuItemSales (quantity and revenue per menu item and
+day) when they complete, in the same transaction, with F() updates. An
+order is counted in the hour it was completed, taken from the status log.
+
+Demand is counted earlier, at checkout: the quantities of a placed order
+go to MenuItemSales.ordered for the day it was placed and to the
+all-time MenuItemPopularity counter, which top_menu_items reads.
+
+Reports and charts read these small tables instead of scanning orders;
+rebuild_rollups recomputes them from history.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.orders.models import MenuItem, Order, OrderItem, OrderStatusEvent
+from .models import HourlySales, MenuItemPopularity, MenuItemSales
+
+SERIES_INTERVALS = ('hour', 'day')
+
+# Popular item windows: name -> days back from today, None for all time
+POPULAR_WINDOWS = {
+    'today': 0,
+    '7d': 6,
+    '30d': 29,
+    'all': None,
+}
+
+
+def _bump(model, lookup, deltas):
+    """Add deltas to the row matching lookup, creating it if needed"""
+    rows = model.objects.filter(**lookup)
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another transaction created the row first
+        rows.update(**changes)
+
+
+def _bump_many(model, lookup, key, deltas):
+    """
+    Add per-row deltas to the rows matching lookup, one row per value of key.
+
+    Two statements whatever the number of rows: missing rows are inserted
+    empty (conflicts ignored), then every row gets its delta in one UPDATE.
+    A single row takes the one-statement path of _bump.
+
+    Args:
+        model: Rollup model
+        lookup (dict): Fields shared by all rows, e.g. {'day': day}
+        key (str or tuple): Field(s) telling the rows apart, e.g.
+            'menu_item_id' or ('day', 'hour')
+        deltas (dict): {key value: {field: delta}}, values are tuples for
+            a tuple key
+    """
+    if not deltas:
+        return
+    fields = (key,) if isinstance(key, str) else key
+
+    def row_lookup(value):
+        return dict(zip(fields, (value,) if isinstance(key, str) else value))
+
+    if len(deltas) == 1:
+        (value, row), = deltas.items()
+        _bump(model, {**lookup, **row_lookup(value)}, row)
+        return
+
+    model.objects.bulk_create([model(**lookup, **row_lookup(value)) for value in deltas], ignore_conflicts=True)
+
+    if isinstance(key, str):
+        rows = model.objects.filter(**lookup, **{f'{key}__in': list(deltas)})
+    else:
+        rows = model.objects.filter(reduce(or_, [Q(**lookup, **row_lookup(value)) for value in deltas]))
+    changed = {field for row in deltas.values() for field in row}
+    rows.update(**{
+        field: F(field) + Case(
+            *[When(Q(**row_lookup(value)), then=Value(row.get(field, 0))) for value, row in deltas.items()],
+            default=Value(0),
+            output_field=model._meta.get_field(field),
+        )
+        for field in changed
+    })
+
+
+def _reached_at(orders, status):
+    """When each order last moved into status, from the status log, in one query"""
+    if not orders:
+        return {}
+    return dict(
+        OrderStatusEvent.objects.filter(order__in=orders, to_status=status)
+        .values('order')
+        .annotate(at=Max('created_at'))
+        .order_by()
+        .values_list('order', 'at')
+    )
+
+
+def completed_at(orders):
+    """
+    When each order was completed.
+
+    Returns:
+        dict: {order: moment}
+    """
+    found = _reached_at(orders, Order.OrderStatus.COMPLETED)
+    return {order: found.get(order.pk) or order.updated_at for order in orders}
+
+
+def placed_at(orders):
+    """
+    When each order was placed (confirmed at checkout).
+
+    Returns:
+        dict: {order: moment}
+    """
+    found = _reached_at(orders, Order.OrderStatus.CONFIRMED)
+    return {order: found.get(order.pk) or order.created_at for order in orders}
+
+
+def record_order_sales(completed, sign=1):
+    """
+    Add completed orders to the rollups, or take them out with sign=-1.
+
+    One query for the order lines and two statements per rollup table,
+    however many orders there are.
+
+    Args:
+        completed (dict): {order: when it was completed}
+        sign (int): 1 to add, -1 to remove
+    """
+    if not completed:
+        return
+    moments = {order.pk: timezone.localtime(moment) for order, moment in completed.items()}
+
+    hourly = defaultdict(lambda: {'orders': 0, 'items': 0, 'revenue': Decimal('0.00')})
+    for order in completed:
+        bucket = hourly[moments[order.pk].date(), moments[order.pk].hour]
+        bucket['orders'] += sign
+        bucket['revenue'] += sign * order.total_amount
+
+    by_item = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0.00')})
+    lines = OrderItem.objects.filter(order_id__in=moments).values_list('order_id', 'menu_item_id', 'quantity', 'price')
+    for order_id, menu_item_id, quantity, price in lines:
+        moment = moments[order_id]
+        hourly[moment.date(), moment.hour]['items'] += sign * quantity
+        item = by_item[moment.date(), menu_item_id]
+        item['quantity'] += sign * quantity
+        item['revenue'] += sign * quantity * price
+
+    _bump_many(HourlySales, {}, ('day', 'hour'), hourly)
+    _bump_many(MenuItemSales, {}, ('day', 'menu_item_id'), by_item)
+
+
+def record_order_placed(placed, sign=1):
+    """
+    Count the dishes of placed orders as ordered, or take them out with
+    sign=-1.
+
+    Args:
+        placed (dict): {order: when it was placed}
+        sign (int): 1 to add, -1 to remove
+    """
+    if not placed:
+        return
+    days = {order.pk: timezone.localdate(moment) for order, moment in placed.items()}
+
+    by_item = defaultdict(lambda: {'ordered': 0})
+    popularity = defaultdict(lambda: {'ordered': 0})
+    lines = OrderItem.objects.filter(order_id__in=days).values_list('order_id', 'menu_item_id', 'quantity')
+    for order_id, menu_item_id, quantity in lines:
+        by_item[days[order_id], menu_item_id]['ordered'] += sign * quantity
+        popularity[menu_item_id]['ordered'] += sign * quantity
+
+    _bump_many(MenuItemSales, {}, ('day', 'menu_item_id'), by_item)
+    _bump_many(MenuItemPopularity, {}, 'menu_item_id', popularity)
+
+
+def _status_reached(status):
+    return Subquery(
+        OrderStatusEvent.objects.filter(order=OuterRef('pk'), to_status=status)
+        .order_by('-created_at')
+        .values('created_at')[:1]
+    )
+
+
+def _in_chunks(orders, fields, chunk_size):
+    """Yield values_list rows of orders in primary key chunks"""
+    last_pk = 0
+    while True:
+        chunk = list(orders.filter(pk__gt=last_pk).order_by('pk').values_list('pk', *fields)[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+        yield chunk
+
+
+def rebuild_rollups(chunk_size=1000):
+    """
+    Recompute the rollups from every completed and placed order.
+
+    Orders are read in primary key chunks so history of any length fits
+    in memory; the tables are swapped in one transaction at the end.
+
+    Returns:
+        int: number of completed orders summed
+    """
+    hourly = defaultdict(lambda: {'orders': 0, 'items': 0, 'revenue': Decimal('0.00')})
+    by_item = defaultdict(lambda: {'quantity': 0, 'revenue': Decimal('0.00'), 'ordered': 0})
+    popularity = defaultdict(int)
+
+    completed = Order.objects.filter(status=Order.OrderStatus.COMPLETED).annotate(
+        completed=Coalesce(_status_reached(Order.OrderStatus.COMPLETED), F('updated_at'))
+    )
+    summed = 0
+    for chunk in _in_chunks(completed, ('completed', 'total_amount'), chunk_size):
+        summed += len(chunk)
+        moments = {pk: timezone.localtime(when) for pk, when, _ in chunk}
+        for pk, _, total in chunk:
+            bucket = hourly[moments[pk].date(), moments[pk].hour]
+            bucket['orders'] += 1
+            bucket['revenue'] += total
+
+        lines = OrderItem.objects.filter(order_id__in=moments).values_list('order_id', 'menu_item_id', 'quantity', 'price')
+        for order_id, menu_item_id, quantity, price in lines:
+            hourly[moments[order_id].date(), moments[order_id].hour]['items'] += quantity
+            item = by_item[moments[order_id].date(), menu_item_id]
+            item['quantity'] += quantity
+            item['revenue'] += quantity * price
+
+    placed = Order.objects.exclude(status=Order.OrderStatus.PENDING).annotate(
+        placed=Coalesce(_status_reached(Order.OrderStatus.CONFIRMED), F('created_at'))
+    )
+    for chunk in _in_chunks(placed, ('placed',), chunk_size):
+        days = {pk: timezone.localdate(when) for pk, when in chunk}
+        lines = OrderItem.objects.filter(order_id__in=days).values_list('order_id', 'menu_item_id', 'quantity')
+        for order_id, menu_item_id, quantity in lines:
+            by_item[days[order_id], menu_item_id]['ordered'] += quantity
+            popularity[menu_item_id] += quantity
+
+    with transaction.atomic():
+        HourlySales.objects.all().delete()
+        MenuItemSales.objects.all().delete()
+        HourlySales.objects.bulk_create(
+            [HourlySales(day=day, hour=hour, **values) for (day, hour), values in hourly.items()],
+            batch_size=chunk_size,
+        )
+        MenuItemSales.objects.bulk_create(
+            [MenuItemSales(day=day, menu_item_id=menu_item_id, **values) for (day, menu_item_id), values in by_item.items()],
+            batch_size=chunk_size,
+        )
+        MenuItemPopularity.objects.all().delete()
+        MenuItemPopularity.objects.bulk_create(
+            [MenuItemPopularity(menu_item_id=menu_item_id, ordered=ordered) for menu_item_id, ordered in popularity.items()],
+            batch_size=chunk_size,
+        )
+    return summed
+
+
+def sales_series(start, end, interval='day'):
+    """
+    Completed sales per hour or day between two local dates, gaps filled
+    with zeros.
+
+    Args:
+        start (date): First day, inclusive
+        end (date): Last day, inclusive
+        interval (str): 'hour' or 'day'
+
+    Returns:
+        list: dicts with period (ISO date or datetime), orders, items and revenue
+    """
+    rows = HourlySales.objects.filter(day__range=(start, end))
+    if interval == 'day':
+        found = {
+            row['day']: row
+            for row in rows.values('day').annotate(
+                orders=Sum('orders'), items=Sum('items'), revenue=Sum('revenue')
+            ).order_by('day')
+        }
+        periods = [(start + timedelta(days=offset), start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
+    else:
+        found = {(row['day'], row['hour']): row for row in rows.values('day', 'hour', 'orders', 'items', 'revenue')}
+        periods = [
+            ((start + timedelta(days=offset), hour), datetime.combine(start + timedelta(days=offset), datetime.min.time()).replace(hour=hour))
+            for offset in range((end - start).days + 1)
+            for hour in range(24)
+        ]
+
+    series = []
+    for key, period in periods:
+        row = found.get(key, {})
+        series.append({
+            'period': period.isoformat(),
+            'orders': row.get('orders') or 0,
+            'items': row.get('items') or 0,
+            'revenue': row.get('revenue') or Decimal('0.00'),
+        })
+    return series
+
+
+def revenue_on(day):
+    """Revenue of the orders completed on a local date"""
+    return HourlySales.objects.filter(day=day).aggregate(total=Sum('revenue'))['total'] or Decimal('0.00')
+
+
+def top_menu_items(limit=5, window='all'):
+    """
+    Most ordered menu items over a window of days, by quantity.
+
+    All time reads the top of the MenuItemPopularity index; shorter
+    windows sum at most 30 days of MenuItemSales per item.
+
+    Args:
+        limit (int): Number of items
+        window (str): One of POPULAR_WINDOWS
+
+    Returns:
+        list: MenuItems annotated with quantity_ordered
+    """
+    days_back = POPULAR_WINDOWS[window]
+    if days_back is None:
+        totals = list(
+            MenuItemPopularity.objects.filter(ordered__gt=0)
+            .order_by('-ordered', 'menu_item')
+            .values_list('menu_item', 'ordered')[:limit]
+        )
+    else:
+        since = timezone.localdate() - timedelta(days=days_back)
+        totals = list(
+            MenuItemSales.objects.filter(day__gte=since)
+            .values('menu_item')
+            .annotate(quantity=Sum('ordered'))
+            .filter(quantity__gt=0)
+            .order_by('-quantity', 'menu_item')
+            .values_list('menu_item', 'quantity')[:limit]
+        )
+
+    items = MenuItem.objects.in_bulk([menu_item_id for menu_item_id, _ in totals])
+    ranked = []
+    for menu_item_id, quantity in totals:
+        item = items[menu_item_id]
+        item.quantity_ordered = quantity
+        ranked.append(item)
+    return ranked
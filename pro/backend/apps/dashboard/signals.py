@@ -0,0 +1,73 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.orders.models import Order
+from apps.orders.signals import announced, orders_deleting, orders_moved
+from .counter_utils import record_order_change, record_order_removed, record_orders_moved, record_orders_removed
+from .rollup_utils import completed_at, placed_at, record_order_placed, record_order_sales
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    """Keep the dashboard counters in step with the order"""
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if previous_status != instance.status:
+        record_order_change(instance, previous_status)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, origin=None, **kwargs):
+    """Take deleted orders out of the dashboard counters"""
+    if not announced(origin):
+        record_order_removed(instance)
+
+
+@receiver(post_save, sender=Order)
+def order_completed(sender, instance, created, **kwargs):
+    """Add orders to the sales rollups when they complete (and back out if they are reopened)"""
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if previous_status == instance.status:
+        return
+    if previous_status == Order.OrderStatus.COMPLETED:
+        record_order_sales(completed_at([instance]), -1)
+    elif instance.status == Order.OrderStatus.COMPLETED:
+        record_order_sales({instance: instance.updated_at})
+
+
+@receiver(post_save, sender=Order)
+def order_placed(sender, instance, created, **kwargs):
+    """Count the dishes of an order as ordered once it leaves the cart"""
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if previous_status in (None, Order.OrderStatus.PENDING) and instance.status != Order.OrderStatus.PENDING:
+        record_order_placed({instance: instance.updated_at})
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleting(sender, instance, origin=None, **kwargs):
+    """Take deleted orders out of the rollups while their items still exist"""
+    if announced(origin):
+        return
+    if instance.status == Order.OrderStatus.COMPLETED:
+        record_order_sales(completed_at([instance]), -1)
+    if instance.status != Order.OrderStatus.PENDING:
+        record_order_placed(placed_at([instance]), -1)
+
+
+@receiver(orders_moved)
+def orders_moved_counted(sender, orders, from_status, to_status, **kwargs):
+    """Counters and rollups for a batch of orders moved together (one shared timestamp)"""
+    record_orders_moved(orders, from_status)
+    if from_status == Order.OrderStatus.COMPLETED:
+        record_order_sales(completed_at(orders), -1)
+    elif to_status == Order.OrderStatus.COMPLETED:
+        record_order_sales({order: order.updated_at for order in orders})
+    if from_status == Order.OrderStatus.PENDING:
+        record_order_placed({order: order.updated_at for order in orders})
+
+
+@receiver(orders_deleting)
+def orders_deleted(sender, orders, **kwargs):
+    """Take a batch of deleted orders out of the counters and rollups"""
+    record_orders_removed(orders)
+    record_order_sales(completed_at([order for order in orders if order.status == Order.OrderStatus.COMPLETED]), -1)
+    record_order_placed(placed_at([order for order in orders if order.status != Order.OrderStatus.PENDING]), -1)
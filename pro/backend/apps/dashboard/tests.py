@@ -0,0 +1,944 @@
+import json
+import re
+import threading
+from decimal import Decimal
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipIfDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import CustomUser
+from apps.orders.cart_utils import get_cart_order
+from apps.orders.event_utils import EventWindow, latest_event_id
+from apps.orders.models import MenuItem, Order, OrderEvent, OrderItem, OrderStatusEvent
+from apps.orders.status_utils import claim_next_order, delete_orders, transition_order, transition_orders
+from .counter_utils import dashboard_stats, invalidate_stats
+from .kitchen_utils import claim_next_station_item, kitchen_board, kitchen_card_key
+from .models import DashboardCounter, HourlySales, MenuItemPopularity, MenuItemSales
+from .rollup_utils import POPULAR_WINDOWS, top_menu_items
+
+
+def parse_stream(body):
+    """(event type, id, data) for each message of an SSE body"""
+    messages = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith((':', 'retry')))
+        if 'event' in fields:
+            messages.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return messages
+
+
+def make_user(username, role=CustomUser.UserRole.CUSTOMER):
+    return CustomUser.objects.create_user(username=username, password='secret123', role=role)
+
+
+def make_dish(name, price, **fields):
+    return MenuItem.objects.create(name=name, description=name, price=Decimal(price), **fields)
+
+
+def place_order(customer, *lines):
+    """
+    Move a cart with (dish, quantity) lines to CONFIRMED and publish its
+    events, as checkout does.
+    """
+    order = Order.objects.create(customer=customer)
+    for dish, quantity in lines:
+        OrderItem.objects.create(order=order, menu_item=dish, quantity=quantity, price=dish.price)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        return transition_order(order.id, Order.OrderStatus.PENDING, Order.OrderStatus.CONFIRMED)
+
+
+def move_order(order, status):
+    """Save order in status and publish its events"""
+    order = Order.objects.get(pk=order.pk)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        order.status = status
+        order.save()
+    return order
+
+
+@mock.patch.multiple(
+    'apps.dashboard.views',
+    KITCHEN_STREAM_SECONDS=0.05,
+    KITCHEN_STREAM_POLL_SECONDS=0.01,
+)
+class KitchenStreamTests(TestCase):
+    """Kitchen screens follow order changes over Server-Sent Events"""
+
+    def setUp(self):
+        cache.clear()
+        # Each test starts with an empty window; ids restart with the test database
+        window = mock.patch('apps.orders.event_utils._window', EventWindow())
+        window.start()
+        self.addCleanup(window.stop)
+        self.chef = make_user('chef', CustomUser.UserRole.KITCHEN)
+        self.customer = make_user('diner')
+
+    async def async_run(self, func, *args):
+        return await sync_to_async(func)(*args)
+
+    async def read_stream(self, **headers):
+        await self.async_client.aforce_login(self.chef)
+        response = await self.async_client.get(reverse('dashboard:kitchen_stream'), headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        return parse_stream(body)
+
+    async def test_reconnect_replays_missed_events(self):
+        first = await self.async_run(place_order, self.customer)
+        await self.async_run(move_order, first, Order.OrderStatus.PREPARING)
+        second = await self.async_run(place_order, self.customer)
+
+        messages = await self.read_stream(**{'Last-Event-ID': '1'})
+
+        self.assertEqual(
+            [(kind, event_id, data['order_id']) for kind, event_id, data in messages],
+            [('status_changed', '2', first.id), ('order_created', '3', second.id)],
+        )
+        self.assertEqual(messages[0][2]['previous_status'], Order.OrderStatus.CONFIRMED)
+
+    async def test_new_connection_starts_at_latest_event(self):
+        await self.async_run(place_order, self.customer)
+        self.assertEqual(await self.read_stream(), [])
+
+    async def test_events_still_being_written_are_waited_for(self):
+        await self.async_run(place_order, self.customer)
+        await self.async_run(place_order, self.customer)
+        await OrderEvent.objects.filter(pk=1).adelete()
+
+        self.assertEqual(await self.read_stream(**{'Last-Event-ID': '0'}), [])
+
+    async def test_lost_events_reset_the_screen(self):
+        await self.async_run(place_order, self.customer)
+        await self.async_run(place_order, self.customer)
+        await OrderEvent.objects.filter(pk=1).adelete()
+        await OrderEvent.objects.filter(pk=2).aupdate(created_at=timezone.now() - timedelta(minutes=1))
+
+        messages = await self.read_stream(**{'Last-Event-ID': '0'})
+        self.assertEqual(messages, [('reset', '2', {'cursor': 2})])
+
+    def test_wsgi_requests_poll_instead_of_holding_a_worker(self):
+        place_order(self.customer)
+        self.client.force_login(self.chef)
+
+        with mock.patch('apps.dashboard.views.KITCHEN_STREAM_SECONDS', 60):
+            response = self.client.get(reverse('dashboard:kitchen_stream'), headers={'Last-Event-ID': '0'})
+
+        self.assertFalse(response.streaming)
+        body = response.content.decode()
+        self.assertEqual([(kind, event_id) for kind, event_id, _ in parse_stream(body)], [('order_created', '1')])
+        self.assertIn('retry: ', body)
+
+    def test_polls_without_events_resume_from_their_cursor(self):
+        place_order(self.customer)
+        self.client.force_login(self.chef)
+
+        body = self.client.get(reverse('dashboard:kitchen_stream')).content.decode()
+
+        self.assertEqual(parse_stream(body), [])
+        self.assertIn('id: 1\n', body)
+
+    def test_screens_share_one_read_of_the_event_log(self):
+        window = EventWindow()
+        cursor = window.current()
+        place_order(self.customer)
+        place_order(self.customer)
+        window.refreshed_at = None
+
+        with self.assertNumQueries(2):
+            screens = [window.read(cursor) for _ in range(5)]
+
+        self.assertEqual([[event['id'] for event in events] for events in screens], [[1, 2]] * 5)
+
+    def test_kitchen_board_partial(self):
+        self.client.force_login(self.chef)
+        response = self.client.get(reverse('dashboard:kitchen_dashboard'), {'partial': 'board'})
+        self.assertTemplateUsed(response, 'dashboard/kitchen-board.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+
+    async def test_customers_are_refused(self):
+        await self.async_client.aforce_login(self.customer)
+        response = await self.async_client.get(reverse('dashboard:kitchen_stream'))
+        self.assertEqual(response.status_code, 403)
+
+
+class OrderEventTests(TestCase):
+    """Order saves publish kitchen events only for placed orders"""
+
+    def setUp(self):
+        cache.clear()
+        self.customer = make_user('diner')
+
+    def test_cart_changes_publish_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer=self.customer)
+            order.total_amount = Decimal('10.00')
+            order.save()
+        self.assertEqual(latest_event_id(), 0)
+
+    def test_edits_that_keep_the_status_publish_an_update(self):
+        order = Order.objects.create(customer=self.customer, status=Order.OrderStatus.CONFIRMED)
+        order = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.special_instructions = 'Less spicy'
+            order.save()
+        event = OrderEvent.objects.get()
+        self.assertEqual(event.kind, OrderEvent.Kind.ORDER_UPDATED)
+        self.assertEqual(event.previous_status, Order.OrderStatus.CONFIRMED)
+
+
+class KitchenBoardTests(TestCase):
+    """The kitchen board costs one order query plus item loads for changed cards"""
+
+    def setUp(self):
+        cache.clear()
+        self.chef = make_user('chef', CustomUser.UserRole.KITCHEN)
+        self.customer = make_user('diner')
+        self.client.force_login(self.chef)
+        self.dish = make_dish('Masala Dosa', '120.00')
+
+    def add_orders(self, status, count):
+        for _ in range(count):
+            order = Order.objects.create(customer=self.customer, status=status, total_amount=Decimal('240.00'))
+            OrderItem.objects.create(order=order, menu_item=self.dish, quantity=2, price=self.dish.price)
+
+    def board(self):
+        return self.client.get(reverse('dashboard:kitchen_dashboard'), {'partial': 'board'})
+
+    def test_board_is_one_query_when_cards_are_cached(self):
+        self.add_orders(Order.OrderStatus.CONFIRMED, 3)
+        self.add_orders(Order.OrderStatus.PREPARING, 2)
+        self.add_orders(Order.OrderStatus.READY, 1)
+
+        # session + user + orders, then items and menu items for the cold cards
+        with self.assertNumQueries(5):
+            self.board()
+        with self.assertNumQueries(3):
+            response = self.board()
+
+        self.assertEqual(len(response.context['pending_orders']), 3)
+        self.assertEqual(len(response.context['preparing_orders']), 2)
+        self.assertEqual(len(response.context['ready_orders']), 1)
+        self.assertContains(response, 'Pending (3)')
+        self.assertContains(response, '2x Masala Dosa', count=6)
+
+    def test_only_changed_cards_are_rerendered(self):
+        self.add_orders(Order.OrderStatus.CONFIRMED, 4)
+        self.board()
+
+        order = Order.objects.first()
+        order.status = Order.OrderStatus.PREPARING
+        order.save()
+
+        with mock.patch('apps.dashboard.kitchen_utils.render_to_string', return_value='card') as render:
+            response = self.board()
+        render.assert_called_once()
+        self.assertEqual(response.context['preparing_orders'], [order])
+
+    def test_cached_cards_hold_no_csrf_token(self):
+        self.add_orders(Order.OrderStatus.CONFIRMED, 1)
+        response = self.board()
+
+        card = cache.get(kitchen_card_key(response.context['pending_orders'][0]))
+        self.assertIn('Order #', card)
+        self.assertNotIn('csrfmiddlewaretoken', card)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+
+class DashboardCounterTests(TestCase):
+    """Dashboard stats come from counters kept current by order writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('boss', CustomUser.UserRole.ADMIN)
+        self.customer = make_user('diner')
+
+    def scanned_stats(self):
+        """The stats as the dashboard used to compute them"""
+        placed = Order.objects.exclude(status=Order.OrderStatus.PENDING)
+        return {
+            'total_orders': placed.count(),
+            'pending_orders': placed.filter(status=Order.OrderStatus.CONFIRMED).count(),
+            'active_orders': placed.filter(status__in=[Order.OrderStatus.PREPARING, Order.OrderStatus.READY]).count(),
+            # every order here was completed today
+            'today_revenue': placed.filter(
+                status=Order.OrderStatus.COMPLETED
+            ).aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00'),
+        }
+
+    def exercise_orders(self):
+        orders = []
+        for i, status in enumerate(['CONFIRMED', 'PREPARING', 'READY', 'COMPLETED', 'CANCELLED']):
+            order = Order.objects.create(customer=self.customer, total_amount=Decimal(100 * (i + 1)))
+            order.status = status
+            order.save()
+            orders.append(order)
+
+        reloaded = Order.objects.get(pk=orders[1].pk)
+        reloaded.total_amount = Decimal('250.00')
+        reloaded.save()
+        Order.objects.get(pk=orders[2].pk).delete()
+
+    def test_counters_follow_status_changes_and_deletes(self):
+        self.exercise_orders()
+        self.assertEqual(dashboard_stats(), self.scanned_stats())
+
+    def test_rebuild_matches_live_counters(self):
+        self.exercise_orders()
+        live = dict(DashboardCounter.objects.exclude(value=0).values_list('key', 'value'))
+
+        call_command('rebuild_dashboard_counters', stdout=StringIO())
+        self.assertEqual(dict(DashboardCounter.objects.values_list('key', 'value')), live)
+
+    def test_snapshot_built_before_a_change_is_not_served_after_it(self):
+        def change_commits_meanwhile(day):
+            # An order change commits while this reader is still building
+            invalidate_stats()
+            return Decimal('0.00')
+
+        with mock.patch('apps.dashboard.counter_utils.revenue_on', side_effect=change_commits_meanwhile):
+            dashboard_stats()
+
+        # counters + today's rollups: the stale snapshot is not used
+        with self.assertNumQueries(2):
+            dashboard_stats()
+        with self.assertNumQueries(0):
+            dashboard_stats()
+
+    def test_stats_api_cost_is_constant_and_shared(self):
+        other_admin = make_user('boss2', CustomUser.UserRole.ADMIN)
+        self.exercise_orders()
+
+        self.client.force_login(self.admin)
+        # session + user + counters + today's rollups
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard:admin_stats_api'))
+        self.assertEqual(response.json()['total_orders'], 4)
+
+        self.client.force_login(other_admin)
+        # the snapshot is shared: session + user only
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard:admin_stats_api'))
+        self.assertEqual(Decimal(response.json()['today_revenue']), Decimal('400.00'))
+
+
+class OrderChangesFeedTests(TestCase):
+    """The admin changes feed pages through the order event log"""
+
+    def setUp(self):
+        self.admin = make_user('boss', CustomUser.UserRole.ADMIN)
+        self.customer = make_user('diner')
+        self.client.force_login(self.admin)
+
+    def changes(self, cursor=''):
+        return self.client.get(reverse('dashboard:admin_order_changes'), {'cursor': cursor}).json()
+
+    def test_pages_through_changes_in_order(self):
+        orders = [place_order(self.customer) for _ in range(5)]
+        cursor, seen = '', []
+        with mock.patch('apps.dashboard.feed_utils.CHANGES_PAGE_SIZE', 2):
+            while True:
+                data = self.changes(cursor)
+                seen += [row['id'] for row in data['orders']]
+                cursor = data['cursor']
+                if not data['has_more']:
+                    break
+
+        self.assertEqual(seen, [order.id for order in orders])
+        self.assertEqual(self.changes(cursor)['orders'], [])
+        self.assertIn(f'data-order-id="{orders[0].id}"', self.changes()['orders'][0]['html'])
+
+    def test_updates_inserts_and_deletes_are_reported(self):
+        first, second = place_order(self.customer), place_order(self.customer)
+        first_id = first.id
+        cursor = self.changes()['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        third = place_order(self.customer)
+        move_order(second, Order.OrderStatus.PREPARING)
+
+        data = self.changes(cursor)
+        self.assertEqual([row['id'] for row in data['orders']], [third.id, second.id])
+        self.assertEqual(data['orders'][1]['status'], 'PREPARING')
+        self.assertEqual(data['removed'], [first_id])
+
+    def test_edits_that_keep_the_status_are_reported(self):
+        order = place_order(self.customer)
+        cursor = self.changes()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            order.special_instructions = 'No onions'
+            order.save()
+        self.assertEqual([row['id'] for row in self.changes(cursor)['orders']], [order.id])
+
+    def test_late_commits_are_not_skipped(self):
+        place_order(self.customer)
+        place_order(self.customer)
+        # The first change is still being written when the feed is read
+        late = OrderEvent.objects.get(pk=1)
+        OrderEvent.objects.filter(pk=late.pk).delete()
+
+        self.assertEqual(self.changes()['orders'], [])
+
+        late.save(force_insert=True)
+        self.assertEqual(len(self.changes()['orders']), 2)
+
+    def test_lost_changes_ask_the_page_to_reload(self):
+        place_order(self.customer)
+        place_order(self.customer)
+        OrderEvent.objects.filter(pk=1).delete()
+        OrderEvent.objects.filter(pk=2).update(created_at=timezone.now() - timedelta(minutes=1))
+
+        data = self.changes()
+        self.assertTrue(data['reset'])
+        self.assertEqual(data['cursor'], '2')
+
+    def test_pending_carts_are_hidden(self):
+        place_order(self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(customer=self.customer)
+        self.assertEqual(len(self.changes()['orders']), 1)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get(reverse('dashboard:admin_order_changes'), {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderStatusTransitionTests(TestCase):
+    """Status changes follow Order.TRANSITIONS and never overwrite a newer status"""
+
+    def setUp(self):
+        cache.clear()
+        self.chef = make_user('chef', CustomUser.UserRole.KITCHEN)
+        self.customer = make_user('diner')
+        self.client.force_login(self.chef)
+
+    def add_order(self, status, total='100.00'):
+        order = Order.objects.create(customer=self.customer, total_amount=Decimal(total))
+        order.status = status
+        order.save()
+        return order
+
+    def update(self, order, status, expected_status=None):
+        data = {'status': status}
+        if expected_status:
+            data['expected_status'] = expected_status
+        return self.client.post(
+            reverse('dashboard:update_order_status', args=[order.id]), data, HTTP_ACCEPT='application/json'
+        )
+
+    def test_status_moves_forward(self):
+        order = self.add_order(Order.OrderStatus.CONFIRMED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.update(order, 'PREPARING', 'CONFIRMED')
+
+        self.assertEqual(response.json(), {'ok': True, 'order_id': order.id, 'status': 'PREPARING'})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.OrderStatus.PREPARING)
+        self.assertEqual(OrderEvent.objects.get(pk=latest_event_id()).previous_status, 'CONFIRMED')
+
+    def test_invalid_transition_is_rejected(self):
+        order = self.add_order(Order.OrderStatus.CONFIRMED)
+
+        response = self.update(order, 'SERVED', 'CONFIRMED')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.OrderStatus.CONFIRMED)
+
+    def test_stale_screen_gets_a_conflict(self):
+        order = self.add_order(Order.OrderStatus.PREPARING)
+        self.update(order, 'READY', 'PREPARING')
+
+        # a second screen still shows the order as preparing
+        response = self.update(order, 'CANCELLED', 'PREPARING')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'READY')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.OrderStatus.READY)
+
+    def test_form_post_redirects_with_message(self):
+        order = self.add_order(Order.OrderStatus.CONFIRMED)
+
+        response = self.client.post(
+            reverse('dashboard:update_order_status', args=[order.id]), {'status': 'PREPARING'}, follow=True
+        )
+
+        self.assertRedirects(response, reverse('dashboard:kitchen_dashboard'))
+        self.assertContains(response, 'status updated to Preparing')
+
+    def test_bulk_move_keeps_counters_and_events_in_step(self):
+        ready = [self.add_order(Order.OrderStatus.READY) for _ in range(3)]
+        self.add_order(Order.OrderStatus.PREPARING)
+        before = latest_event_id()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('dashboard:bulk_update_order_status'),
+                json.dumps({'from_status': 'READY', 'to_status': 'SERVED'}),
+                content_type='application/json',
+                HTTP_ACCEPT='application/json',
+            )
+
+        self.assertEqual(response.json()['count'], 3)
+        self.assertEqual(sorted(response.json()['moved']), [order.id for order in ready])
+        self.assertEqual(Order.objects.filter(status=Order.OrderStatus.SERVED).count(), 3)
+        self.assertEqual(latest_event_id() - before, 3)
+        self.assertEqual(dashboard_stats()['active_orders'], 1)
+
+    def test_bulk_move_rejects_json_that_is_not_an_object(self):
+        for body in ('[1, 2]', '"READY"', '3'):
+            response = self.client.post(
+                reverse('dashboard:bulk_update_order_status'), body,
+                content_type='application/json', HTTP_ACCEPT='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['error'], 'Expected a JSON object.')
+
+        response = self.client.post(
+            reverse('dashboard:bulk_update_order_status'),
+            json.dumps({'from_status': 'READY', 'to_status': 'SERVED', 'order_ids': 5}),
+            content_type='application/json', HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_move_rejects_invalid_transition(self):
+        self.add_order(Order.OrderStatus.READY)
+
+        response = self.client.post(
+            reverse('dashboard:bulk_update_order_status'),
+            {'from_status': 'READY', 'to_status': 'CONFIRMED'},
+            HTTP_ACCEPT='application/json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.filter(status=Order.OrderStatus.READY).count(), 1)
+
+
+class PrepScheduleTests(TestCase):
+    """The kitchen board plans tickets earliest-deadline-first from prep times"""
+
+    def setUp(self):
+        cache.clear()
+        self.chef = make_user('chef', CustomUser.UserRole.KITCHEN)
+        self.customer = make_user('diner')
+        self.naan = make_dish('Naan', '40.00', preparation_time=5)
+        self.biryani = make_dish('Biryani', '250.00', preparation_time=30)
+
+    def test_quick_orders_are_planned_before_slow_ones(self):
+        slow = place_order(self.customer, (self.biryani, 1))
+        quick = place_order(self.customer, (self.naan, 2))
+        now = Order.objects.get(pk=quick.pk).updated_at
+
+        columns, _ = kitchen_board(now)
+        self.assertEqual(columns[Order.OrderStatus.CONFIRMED], [quick, slow])
+
+        with mock.patch('apps.dashboard.prep_utils.KITCHEN_PREP_SLOTS', 1):
+            columns, _ = kitchen_board(now)
+        quick, slow = columns[Order.OrderStatus.CONFIRMED]
+        self.assertEqual(quick.projected_ready, now + timedelta(minutes=5))
+        self.assertEqual(slow.projected_ready, now + timedelta(minutes=35))
+        self.assertTrue(slow.is_late)
+        self.assertFalse(quick.is_late)
+
+    def test_preparing_orders_keep_their_slot(self):
+        cooking = place_order(self.customer, (self.biryani, 1))
+        transition_order(cooking.id, Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING)
+        waiting = place_order(self.customer, (self.naan, 1))
+        started = OrderStatusEvent.objects.get(order=cooking, to_status=Order.OrderStatus.PREPARING).created_at
+
+        with mock.patch('apps.dashboard.prep_utils.KITCHEN_PREP_SLOTS', 1):
+            columns, _ = kitchen_board(started + timedelta(minutes=10))
+
+        self.assertEqual(columns[Order.OrderStatus.PREPARING][0].projected_ready, started + timedelta(minutes=30))
+        self.assertEqual(columns[Order.OrderStatus.CONFIRMED][0].projected_ready, started + timedelta(minutes=35))
+
+    def test_identical_dishes_are_batched(self):
+        for quantity in (1, 2, 1, 2):
+            place_order(self.customer, (self.naan, quantity))
+        place_order(self.customer, (self.biryani, 1))
+
+        _, batches = kitchen_board()
+
+        self.assertEqual([str(batch) for batch in batches], ['6× Naan across 4 orders', '1× Biryani across 1 order'])
+
+        self.client.force_login(self.chef)
+        response = self.client.get(reverse('dashboard:kitchen_dashboard'), {'partial': 'board'})
+        self.assertContains(response, 'Ready by', count=5)
+
+    def test_benchmark_needs_a_development_database(self):
+        args = ['benchmark_prep_schedule', '--orders', '5', '--rounds', '1']
+        with self.assertRaises(CommandError):
+            call_command(*args, stdout=StringIO())
+
+        cache.set('kitchen:live', 'card')
+        call_command(*args, '--i-know-this-is-not-prod', stdout=StringIO())
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cache.get('kitchen:live'), 'card')
+
+
+class StationQueueTests(TestCase):
+    """Stations see only their own items and orders follow their items"""
+
+    def setUp(self):
+        cache.clear()
+        self.chef = make_user('chef', CustomUser.UserRole.KITCHEN)
+        self.customer = make_user('diner')
+        self.client.force_login(self.chef)
+        self.lassi = make_dish('Mango Lassi', '80.00', category=MenuItem.DishType.BEVERAGE)
+        self.curry = make_dish('Paneer Curry', '220.00')
+
+    def move(self, item, status, expected_status):
+        return self.client.post(
+            reverse('dashboard:update_item_status', args=[item.id]),
+            {'status': status, 'expected_status': expected_status},
+            HTTP_ACCEPT='application/json',
+        )
+
+    def test_station_lists_only_its_pending_items(self):
+        order = place_order(self.customer, (self.lassi, 1), (self.curry, 1))
+        place_order(self.customer, (self.curry, 1))
+        cancelled = place_order(self.customer, (self.lassi, 1))
+        transition_order(cancelled.id, Order.OrderStatus.CONFIRMED, Order.OrderStatus.CANCELLED)
+
+        # session + user + items
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard:station_items', args=['BAR']))
+
+        items = response.json()['items']
+        self.assertEqual([(item['order_id'], item['name']) for item in items], [(order.id, 'Mango Lassi')])
+        self.assertEqual(self.client.get(reverse('dashboard:station_items', args=['GRILL'])).status_code, 404)
+
+    def test_order_rolls_up_with_its_items(self):
+        order = place_order(self.customer, (self.lassi, 1), (self.curry, 1))
+        lassi, curry = order.items.order_by('id')
+
+        response = self.move(lassi, 'READY', 'QUEUED')
+        self.assertEqual(response.json()['order_status'], 'PREPARING')
+        self.assertEqual(self.client.get(reverse('dashboard:station_items', args=['BAR'])).json()['items'], [])
+
+        self.move(curry, 'PREPARING', 'QUEUED')
+        response = self.move(curry, 'READY', 'PREPARING')
+        self.assertEqual(response.json()['order_status'], 'READY')
+        self.assertEqual(
+            list(order.status_events.values_list('to_status', flat=True)),
+            ['CONFIRMED', 'PREPARING', 'READY'],
+        )
+
+    def test_stale_item_update_conflicts(self):
+        order = place_order(self.customer, (self.curry, 1))
+        curry = order.items.get()
+        self.move(curry, 'PREPARING', 'QUEUED')
+
+        response = self.move(curry, 'READY', 'QUEUED')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'PREPARING')
+
+        self.assertEqual(self.move(curry, 'QUEUED', 'PREPARING').status_code, 400)
+
+    def test_station_page_renders(self):
+        place_order(self.customer, (self.lassi, 1))
+        response = self.client.get(reverse('dashboard:station_queue', args=['BAR']))
+        self.assertContains(response, '1× Mango Lassi')
+        self.assertContains(response, 'Bar Station')
+
+
+class TicketClaimTests(TestCase):
+    """Cooks claim the oldest unclaimed ticket and their name shows on it"""
+
+    def setUp(self):
+        cache.clear()
+        self.chef = make_user('chef', CustomUser.UserRole.KITCHEN)
+        self.customer = make_user('diner')
+        self.client.force_login(self.chef)
+        self.lassi = make_dish('Mango Lassi', '80.00', category=MenuItem.DishType.BEVERAGE)
+
+    def claim(self):
+        return self.client.post(reverse('dashboard:claim_order'), HTTP_ACCEPT='application/json').json()
+
+    def test_claims_go_oldest_first_and_show_the_cook(self):
+        first, second = [place_order(self.customer, (self.lassi, 1)) for _ in range(2)]
+
+        self.assertEqual(self.claim()['order_id'], first.id)
+        self.assertEqual(self.claim()['order_id'], second.id)
+        self.assertEqual(self.claim(), {'ok': True, 'order_id': None})
+
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.claimed_by), (Order.OrderStatus.PREPARING, self.chef))
+        response = self.client.get(reverse('dashboard:kitchen_dashboard'), {'partial': 'board'})
+        self.assertContains(response, '<i class="fas fa-user"></i> chef', count=2)
+
+    def test_cancelled_orders_are_not_claimed(self):
+        cancelled = place_order(self.customer, (self.lassi, 1))
+        transition_order(cancelled.id, Order.OrderStatus.CONFIRMED, Order.OrderStatus.CANCELLED)
+        self.assertIsNone(claim_next_order(self.chef))
+
+    def test_station_items_are_claimed(self):
+        order = place_order(self.customer, (self.lassi, 1))
+
+        item = claim_next_station_item(MenuItem.Station.BAR, self.chef)
+
+        self.assertEqual((item.order_id, item.status, item.claimed_by), (order.id, 'PREPARING', self.chef))
+        self.assertIsNone(claim_next_station_item(MenuItem.Station.BAR, self.chef))
+        self.assertEqual(Order.objects.get(pk=order.pk).status, Order.OrderStatus.PREPARING)
+
+    @skipIfDBFeature('has_select_for_update_skip_locked')
+    def test_compare_and_set_moves_past_a_ticket_taken_meanwhile(self):
+        first, second = [place_order(self.customer, (self.lassi, 1)) for _ in range(2)]
+        other = make_user('sous', CustomUser.UserRole.KITCHEN)
+        stolen = []
+
+        def other_cook_first(execute, sql, params, many, context):
+            # Another cook claims the first ticket between our read and our update
+            if sql.startswith('UPDATE') and 'claimed_by_id' in sql and not stolen:
+                stolen.append(first.id)
+                Order.objects.filter(pk=first.pk).update(claimed_by=other)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(other_cook_first):
+            order = claim_next_order(self.chef)
+
+        self.assertEqual(stolen, [first.id])
+        self.assertEqual((order.id, order.claimed_by), (second.id, self.chef))
+        self.assertEqual(Order.objects.get(pk=first.pk).claimed_by, other)
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    """Cooks claiming at the same time never get the same ticket"""
+
+    THREADS = 6
+    ORDERS = 30
+
+    def setUp(self):
+        self.customer = make_user('diner')
+        self.cooks = [
+            make_user(f'cook{i}', CustomUser.UserRole.KITCHEN)
+            for i in range(self.THREADS)
+        ]
+        for _ in range(self.ORDERS):
+            Order.objects.create(customer=self.customer, status=Order.OrderStatus.CONFIRMED)
+
+    def work(self, cook, barrier, claimed, errors):
+        try:
+            barrier.wait()
+            while True:
+                order = claim_next_order(cook)
+                if order is None:
+                    break
+                claimed.append((order.id, cook.id))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_no_ticket_is_claimed_twice(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Threads share an in-memory database through one locked cache
+            self.skipTest('Needs a file-backed or server test database.')
+        barrier = threading.Barrier(self.THREADS)
+        claimed, errors = [], []
+        threads = [
+            threading.Thread(target=self.work, args=(cook, barrier, claimed, errors))
+            for cook in self.cooks
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(claimed), self.ORDERS)
+        self.assertEqual(len({order_id for order_id, _ in claimed}), self.ORDERS)
+        self.assertEqual(
+            sorted(claimed),
+            sorted(Order.objects.values_list('id', 'claimed_by_id')),
+        )
+        self.assertFalse(Order.objects.filter(status=Order.OrderStatus.CONFIRMED).exists())
+
+
+class SalesRollupTests(TestCase):
+    """Completed orders are summed into hourly and per-item rollups"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('boss', CustomUser.UserRole.ADMIN)
+        self.customer = make_user('diner')
+        self.naan = make_dish('Naan', '40.00')
+        self.curry = make_dish('Paneer Curry', '220.00')
+
+    def complete(self, *lines, status=Order.OrderStatus.COMPLETED):
+        order = Order.objects.create(customer=self.customer)
+        for dish, quantity in lines:
+            OrderItem.objects.create(order=order, menu_item=dish, quantity=quantity, price=dish.price)
+        order = Order.objects.get(pk=order.pk)
+        order.calculate_total()
+        order.status = Order.OrderStatus.SERVED
+        order.save()
+        order.status = status
+        order.save()
+        return order
+
+    def rollups(self):
+        return (
+            list(HourlySales.objects.exclude(orders=0).values_list('day', 'hour', 'orders', 'items', 'revenue')),
+            list(MenuItemSales.objects.exclude(quantity=0).values_list('day', 'menu_item', 'quantity', 'revenue')),
+        )
+
+    def test_completion_updates_rollups_like_a_rebuild(self):
+        self.complete((self.naan, 3), (self.curry, 1))
+        self.complete((self.naan, 2))
+        reopened = self.complete((self.curry, 2))
+        reopened.status = Order.OrderStatus.SERVED
+        reopened.save()
+        self.complete((self.curry, 5)).delete()
+        self.complete((self.naan, 9), status=Order.OrderStatus.CANCELLED)
+
+        hourly, by_item = self.rollups()
+        self.assertEqual([row[2:] for row in hourly], [(2, 6, Decimal('420.00'))])
+        self.assertEqual(sorted(row[2:] for row in by_item), [(1, Decimal('220.00')), (5, Decimal('200.00'))])
+
+        call_command('rebuild_sales_rollups', '--chunk-size', '1', stdout=StringIO())
+        self.assertEqual(self.rollups(), (hourly, by_item))
+
+    def test_bulk_moves_and_deletes_match_a_rebuild(self):
+        for lines in [((self.naan, 3),), ((self.curry, 1), (self.naan, 1)), ((self.curry, 2),)]:
+            self.complete(*lines, status=Order.OrderStatus.SERVED)
+        self.complete((self.naan, 4))
+        self.complete((self.curry, 6), status=Order.OrderStatus.CANCELLED)
+
+        transition_orders(Order.objects.all(), Order.OrderStatus.SERVED, Order.OrderStatus.COMPLETED)
+        delete_orders(Order.objects.filter(pk__in=Order.objects.order_by('pk').values('pk')[3:]))
+
+        rollups = self.rollups()
+        popularity = dict(MenuItemPopularity.objects.values_list('menu_item', 'ordered'))
+        counters = dict(DashboardCounter.objects.exclude(value=0).values_list('key', 'value'))
+        self.assertEqual(popularity, {self.naan.id: 4, self.curry.id: 3})
+        self.assertEqual(counters, {'orders:COMPLETED': 3})
+
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        call_command('rebuild_dashboard_counters', stdout=StringIO())
+        self.assertEqual(self.rollups(), rollups)
+        self.assertEqual(dict(MenuItemPopularity.objects.values_list('menu_item', 'ordered')), popularity)
+        self.assertEqual(dict(DashboardCounter.objects.values_list('key', 'value')), counters)
+
+        out = StringIO()
+        call_command('reconcile_customer_stats', stdout=out)
+        self.assertIn('All customer stats match their orders.', out.getvalue())
+
+    def test_series_and_popular_items_read_rollups(self):
+        self.complete((self.naan, 3))
+        self.complete((self.curry, 1), (self.naan, 1))
+        self.client.force_login(self.admin)
+
+        # session + user + rollups
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard:admin_sales_series'), {'days': 3})
+        series = response.json()['series']
+        self.assertEqual(len(series), 3)
+        self.assertEqual(series[-1]['period'], timezone.localdate().isoformat())
+        self.assertEqual((series[-1]['orders'], series[-1]['items'], Decimal(series[-1]['revenue'])), (2, 5, Decimal('380.00')))
+
+        series = self.client.get(reverse('dashboard:admin_sales_series'), {'interval': 'hour', 'days': 1}).json()['series']
+        self.assertEqual(len(series), 24)
+        self.assertEqual(sum(point['orders'] for point in series), 2)
+        self.assertEqual(self.client.get(reverse('dashboard:admin_sales_series'), {'interval': 'week'}).status_code, 400)
+
+        response = self.client.get(reverse('dashboard:admin_dashboard'))
+        self.assertEqual(response.context['today_revenue'], Decimal('380.00'))
+        self.assertContains(response, '4 ordered')
+
+
+class PopularItemsTests(TestCase):
+    """Popular items come from per-item counters updated at checkout"""
+
+    def setUp(self):
+        cache.clear()
+        self.customer = make_user('diner')
+        self.naan = make_dish('Naan', '40.00')
+        self.curry = make_dish('Paneer Curry', '220.00')
+        self.lassi = make_dish('Lassi', '80.00')
+
+    def ranking(self, window='all'):
+        return [(item.name, item.quantity_ordered) for item in top_menu_items(5, window)]
+
+    def test_quantities_are_counted_at_checkout(self):
+        place_order(self.customer, (self.naan, 4), (self.curry, 1))
+        place_order(self.customer, (self.curry, 2))
+        place_order(self.customer, (self.lassi, 3)).delete()
+        Order.objects.create(customer=self.customer)
+
+        self.assertEqual(self.ranking(), [('Naan', 4), ('Paneer Curry', 3)])
+        self.assertEqual(self.ranking('today'), self.ranking())
+
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(self.ranking(), [('Naan', 4), ('Paneer Curry', 3)])
+
+    def test_windows_only_count_their_days(self):
+        place_order(self.customer, (self.naan, 1))
+        place_order(self.customer, (self.curry, 5))
+        # curry was ordered 10 days ago
+        MenuItemSales.objects.filter(menu_item=self.curry).update(day=timezone.localdate() - timedelta(days=10))
+
+        self.assertEqual(self.ranking('7d'), [('Naan', 1)])
+        self.assertEqual(self.ranking('30d'), [('Paneer Curry', 5), ('Naan', 1)])
+        self.assertEqual(self.ranking('all'), [('Paneer Curry', 5), ('Naan', 1)])
+
+    def test_ranking_cost_does_not_depend_on_order_history(self):
+        for _ in range(5):
+            place_order(self.customer, (self.naan, 2), (self.curry, 1), (self.lassi, 1))
+
+        # counters + menu items
+        for window in POPULAR_WINDOWS:
+            with self.assertNumQueries(2):
+                top_menu_items(5, window)
+
+
+class QueryPlanTests(TestCase):
+    """Hot queries stay on their indexes (SQLite EXPLAIN QUERY PLAN)"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked on SQLite')
+        cache.clear()
+        self.customer = make_user('diner')
+        self.menu_item = make_dish('Naan', '40.00')
+        for status in (Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING, Order.OrderStatus.COMPLETED):
+            order = Order.objects.create(customer=self.customer, status=status)
+            OrderItem.objects.create(order=order, menu_item=self.menu_item, quantity=2, price=self.menu_item.price)
+
+    def assertNoFullScans(self, func):
+        """Run func and fail if any SELECT it issues scans a whole table"""
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        selects = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        with connection.cursor() as cursor:
+            for sql in selects:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+                scans = [step for step in plan if re.match(r'SCAN (TABLE )?(?!CONSTANT ROW)\S+$', step)]
+                self.assertFalse(scans, f'Full scan in:\n{sql}\n' + '\n'.join(plan))
+
+    def test_cart_lookup(self):
+        self.assertNoFullScans(lambda: get_cart_order(self.customer))
+
+    def test_kitchen_board(self):
+        self.assertNoFullScans(kitchen_board)
+
+    def test_dashboard_stats(self):
+        self.assertNoFullScans(dashboard_stats)
+
+    def test_staff_count_by_role(self):
+        self.assertNoFullScans(lambda: CustomUser.objects.filter(role=CustomUser.UserRole.KITCHEN).count())
+
+    def test_order_history(self):
+        self.client.login(username='diner', password='secret123')
+        self.assertNoFullScans(lambda: self.client.get(reverse('accounts:order_history')))
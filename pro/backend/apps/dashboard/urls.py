@@ -6,9 +6,18 @@ app_name = 'dashboard'
 urlpatterns = [
     path('admin/', views.admin_dashboard_view, name='admin_dashboard'),
     path('kitchen/', views.kitchen_dashboard_view, name='kitchen_dashboard'),
+    path('kitchen/stream/', views.kitchen_stream_view, name='kitchen_stream'),
+    path('kitchen/station/<str:station>/', views.station_queue_view, name='station_queue'),
+    path('kitchen/station/<str:station>/items/', views.station_items_api, name='station_items'),
+    path('kitchen/claim/', views.claim_order_view, name='claim_order'),
+    path('kitchen/station/<str:station>/claim/', views.claim_station_item_view, name='claim_station_item'),
+    path('kitchen/item/<int:item_id>/update-status/', views.update_item_status, name='update_item_status'),
     path('admin/order/<int:order_id>/', views.admin_order_detail_view, name='admin_order_detail'),
     path('admin/order/<int:order_id>/invoice/', views.admin_order_invoice_view, name='admin_order_invoice'),
     path('order/<int:order_id>/update-status/', views.update_order_status, name='update_order_status'),
+    path('orders/bulk-status/', views.bulk_update_order_status, name='bulk_update_order_status'),
     path('admin/clear-recent-orders/', views.clear_recent_orders, name='clear_recent_orders'),
     path('admin/stats-api/', views.admin_stats_api, name='admin_stats_api'),
+    path('admin/orders/changes/', views.admin_order_changes_api, name='admin_order_changes'),
+    path('admin/sales/series/', views.admin_sales_series_api, name='admin_sales_series'),
 ]
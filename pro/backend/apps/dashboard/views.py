@@ -1,12 +1,34 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from apps.orders.models import Order, MenuItem, Table
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_http_methods
+from apps.orders.cursor_utils import InvalidCursor
+from apps.orders.event_utils import EventsExpired, current_event_id, read_events
+from apps.orders.models import Order, OrderItem, MenuItem, Table
+from apps.orders.status_utils import (
+    InvalidTransition, StatusConflict, claim_next_order, delete_orders, transition_item, transition_order,
+    transition_orders,
+)
+from .counter_utils import dashboard_stats
+from .feed_utils import latest_cursor, order_changes
+from .kitchen_utils import claim_next_station_item, kitchen_board, station_queue
+from .rollup_utils import POPULAR_WINDOWS, SERIES_INTERVALS, sales_series, top_menu_items
 from apps.accounts.models import CustomUser
-from django.db.models import Count, Sum
 from django.utils import timezone
 from datetime import timedelta
 
+KITCHEN_STREAM_SECONDS = 55
+KITCHEN_STREAM_POLL_SECONDS = 1
+KITCHEN_STREAM_HEARTBEAT_SECONDS = 15
+KITCHEN_STREAM_RETRY_MS = 2000
+
 
 @login_required
 def admin_dashboard_view(request):
@@ -18,40 +40,32 @@ def admin_dashboard_view(request):
         return redirect('main:index')
     
     # Get statistics
-    total_orders = Order.objects.exclude(status=Order.OrderStatus.PENDING).count()
-    pending_orders = Order.objects.filter(status=Order.OrderStatus.CONFIRMED).count()
-    active_orders = Order.objects.filter(
-        status__in=[Order.OrderStatus.PREPARING, Order.OrderStatus.READY]
-    ).count()
+    stats = dashboard_stats()
     
     # Recent orders
     recent_orders = Order.objects.exclude(
         status=Order.OrderStatus.PENDING
     ).select_related('customer', 'table').prefetch_related('items')[:10]
     
-    # Revenue statistics
-    today = timezone.now().date()
-    today_revenue = Order.objects.filter(
-        created_at__date=today,
-        status=Order.OrderStatus.COMPLETED
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    # Popular items
-    popular_items = MenuItem.objects.annotate(
-        order_count=Count('order_items')
-    ).order_by('-order_count')[:5]
+    # Popular items, from the sales counters
+    popular_window = request.GET.get('popular', 'all')
+    if popular_window not in POPULAR_WINDOWS:
+        popular_window = 'all'
+    popular_items = top_menu_items(5, popular_window)
     
     # User statistics
     total_customers = CustomUser.objects.filter(role=CustomUser.UserRole.CUSTOMER).count()
     total_staff = CustomUser.objects.filter(role=CustomUser.UserRole.KITCHEN).count()
     
     context = {
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'active_orders': active_orders,
+        'total_orders': stats['total_orders'],
+        'pending_orders': stats['pending_orders'],
+        'active_orders': stats['active_orders'],
         'recent_orders': recent_orders,
-        'today_revenue': today_revenue,
+        'changes_cursor': latest_cursor(),
+        'today_revenue': stats['today_revenue'],
         'popular_items': popular_items,
+        'popular_window': popular_window,
         'total_customers': total_customers,
         'total_staff': total_staff,
     }
@@ -110,46 +124,194 @@ def kitchen_dashboard_view(request):
         messages.error(request, 'Access denied. Kitchen staff privileges required.')
         return redirect('main:index')
     
-    # Get active orders
-    pending_orders = Order.objects.filter(
-        status=Order.OrderStatus.CONFIRMED
-    ).select_related('customer', 'table').prefetch_related('items__menu_item')
+    # One query for the whole board; only changed cards are re-rendered
+    columns, prep_batches = kitchen_board()
+    
+    context = {
+        'pending_orders': columns[Order.OrderStatus.CONFIRMED],
+        'preparing_orders': columns[Order.OrderStatus.PREPARING],
+        'ready_orders': columns[Order.OrderStatus.READY],
+        'prep_batches': prep_batches,
+        'stations': MenuItem.Station.choices,
+    }
     
-    preparing_orders = Order.objects.filter(
-        status=Order.OrderStatus.PREPARING
-    ).select_related('customer', 'table').prefetch_related('items__menu_item')
+    # The live board re-fetches just the columns when orders change
+    if request.GET.get('partial') == 'board':
+        return render(request, 'dashboard/kitchen-board.html', context)
+    
+    return render(request, 'dashboard/kitchen-dashboard.html', context)
+
+
+def _get_station(station):
+    if station not in MenuItem.Station.values:
+        raise Http404('Unknown kitchen station.')
+    return MenuItem.Station(station)
+
+
+@login_required
+def station_queue_view(request, station):
+    """Items one kitchen station (bar, desserts, ...) still has to make"""
     
-    ready_orders = Order.objects.filter(
-        status=Order.OrderStatus.READY
-    ).select_related('customer', 'table').prefetch_related('items__menu_item')
+    if not request.user.is_kitchen_staff():
+        messages.error(request, 'Access denied. Kitchen staff privileges required.')
+        return redirect('main:index')
     
     context = {
-        'pending_orders': pending_orders,
-        'preparing_orders': preparing_orders,
-        'ready_orders': ready_orders,
+        'station': _get_station(station),
+        'stations': MenuItem.Station.choices,
+        'items': station_queue(station),
     }
     
-    return render(request, 'dashboard/kitchen-dashboard.html', context)
+    if request.GET.get('partial') == 'queue':
+        return render(request, 'dashboard/station-queue-items.html', context)
+    
+    return render(request, 'dashboard/station-queue.html', context)
+
+
+@login_required
+def station_items_api(request, station):
+    """API endpoint listing the items a station still has to make"""
+    
+    if not request.user.is_kitchen_staff() and not request.user.is_admin():
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    station = _get_station(station)
+    
+    return JsonResponse({
+        'station': station.value,
+        'items': [
+            {
+                'id': item.id,
+                'order_id': item.order_id,
+                'table': item.order.table.table_number if item.order.table else None,
+                'name': item.menu_item.name,
+                'quantity': item.quantity,
+                'status': item.status,
+                'special_instructions': item.order.special_instructions,
+            }
+            for item in station_queue(station)
+        ],
+    })
+
+
+def _sse_message(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _read_events(cursor):
+    """SSE messages for the order events after cursor, and the cursor after them"""
+    try:
+        events = await sync_to_async(read_events)(cursor)
+    except EventsExpired:
+        # Missed events can't be replayed: ask the screen to reload its board
+        cursor = await sync_to_async(current_event_id)()
+        return [_sse_message('reset', {'cursor': cursor}, cursor)], cursor
+
+    if events:
+        cursor = events[-1]['id']
+    return [_sse_message(event['type'], event, event['id']) for event in events], cursor
+
+
+async def _kitchen_events(cursor):
+    """Yield order events after cursor for KITCHEN_STREAM_SECONDS, then let the browser reconnect"""
+    loop = asyncio.get_running_loop()
+    started = last_write = loop.time()
+
+    yield f'retry: {KITCHEN_STREAM_RETRY_MS}\nid: {cursor}\n\n'
+
+    while loop.time() - started < KITCHEN_STREAM_SECONDS:
+        messages, cursor = await _read_events(cursor)
+        for message in messages:
+            yield message
+            last_write = loop.time()
+
+        if loop.time() - last_write > KITCHEN_STREAM_HEARTBEAT_SECONDS:
+            yield ': keepalive\n\n'
+            last_write = loop.time()
+
+        await asyncio.sleep(KITCHEN_STREAM_POLL_SECONDS)
+
+
+async def kitchen_stream_view(request):
+    """
+    Server-Sent Events stream of order changes for kitchen screens.
+
+    Served by the ASGI application (DineAt/asgi.py), every open screen
+    holds a connection. Under a WSGI server that would tie up a worker per
+    screen, so the response ends after one read and the browser polls
+    every KITCHEN_STREAM_RETRY_MS instead. Reconnecting browsers send
+    Last-Event-ID and get the events they missed replayed; new connections
+    start from the latest event. Every response opens with the cursor, so
+    a poll that saw no events still resumes where it left off.
+
+    Events come from the process-wide event window, so the event log is
+    read once per refresh however many screens are open.
+    """
+    user = await request.auser()
+    if not user.is_authenticated or not user.is_kitchen_staff():
+        return HttpResponseForbidden('Kitchen staff privileges required.')
+
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('cursor')
+    try:
+        cursor = int(cursor)
+    except (TypeError, ValueError):
+        cursor = await sync_to_async(current_event_id)()
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_kitchen_events(cursor), content_type='text/event-stream')
+    else:
+        opening = f'retry: {KITCHEN_STREAM_RETRY_MS}\nid: {cursor}\n\n'
+        messages, cursor = await _read_events(cursor)
+        response = HttpResponse(opening + ''.join(messages), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _wants_json(request):
+    return 'application/json' in request.headers.get('Accept', '')
 
 
 @login_required
 def update_order_status(request, order_id):
-    """Update order status (kitchen staff only)"""
+    """
+    Move an order to a new status (kitchen staff and admins).
+
+    The form may send expected_status, the status the order had when it was
+    displayed; the change only applies if the order is still in it. Answers
+    with JSON when asked for it, otherwise redirects back to the dashboard.
+    """
     
     if not request.user.is_kitchen_staff() and not request.user.is_admin():
+        if _wants_json(request):
+            return JsonResponse({'ok': False, 'error': 'Access denied.'}, status=403)
         messages.error(request, 'Access denied.')
         return redirect('main:index')
     
     if request.method == 'POST':
-        order = get_object_or_404(Order, id=order_id)
+        order = get_object_or_404(Order.objects.only('id', 'status'), id=order_id)
         new_status = request.POST.get('status')
+        expected_status = request.POST.get('expected_status') or order.status
         
-        if new_status in dict(Order.OrderStatus.choices):
-            order.status = new_status
-            order.save()
-            messages.success(request, f'Order #{order.id} status updated to {order.get_status_display()}')
+        try:
+            order = transition_order(order.id, expected_status, new_status, request.user)
+        except InvalidTransition as e:
+            if _wants_json(request):
+                return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+            messages.error(request, str(e))
+        except StatusConflict as e:
+            if _wants_json(request):
+                return JsonResponse({'ok': False, 'error': str(e), 'status': e.current_status}, status=409)
+            messages.error(request, f'Order #{order.id}: {e}')
         else:
-            messages.error(request, 'Invalid status.')
+            if _wants_json(request):
+                return JsonResponse({'ok': True, 'order_id': order.id, 'status': order.status})
+            messages.success(request, f'Order #{order.id} status updated to {order.get_status_display()}')
     
     # Redirect based on user role
     if request.user.is_kitchen_staff():
@@ -158,6 +320,151 @@ def update_order_status(request, order_id):
         return redirect('dashboard:admin_dashboard')
 
 
+@login_required
+@require_http_methods(["POST"])
+def bulk_update_order_status(request):
+    """
+    Move many orders at once, e.g. every READY order to SERVED.
+
+    Expects from_status and to_status, plus optional order_ids to limit the
+    change to some orders, as JSON or form data. Orders that already moved
+    are skipped.
+    """
+    
+    if not request.user.is_kitchen_staff() and not request.user.is_admin():
+        return JsonResponse({'ok': False, 'error': 'Access denied.'}, status=403)
+    
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'ok': False, 'error': 'Invalid JSON format.'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'ok': False, 'error': 'Expected a JSON object.'}, status=400)
+        order_ids = data.get('order_ids')
+        if order_ids is not None and not isinstance(order_ids, list):
+            return JsonResponse({'ok': False, 'error': 'order_ids must be a list.'}, status=400)
+    else:
+        data = request.POST
+        order_ids = data.getlist('order_ids') or None
+    
+    orders = Order.objects.all()
+    if order_ids is not None:
+        orders = orders.filter(pk__in=order_ids)
+    
+    try:
+        moved = transition_orders(orders, data.get('from_status'), data.get('to_status'), request.user)
+    except (InvalidTransition, ValueError, TypeError) as e:
+        if not _wants_json(request):
+            messages.error(request, str(e))
+            return redirect('dashboard:kitchen_dashboard')
+        return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+    
+    if not _wants_json(request):
+        messages.success(request, f'{len(moved)} order(s) updated.')
+        if request.user.is_kitchen_staff():
+            return redirect('dashboard:kitchen_dashboard')
+        return redirect('dashboard:admin_dashboard')
+    
+    return JsonResponse({'ok': True, 'moved': [order.id for order in moved], 'count': len(moved)})
+
+
+@login_required
+def update_item_status(request, item_id):
+    """
+    Move one item at its station; the order follows once its items do.
+
+    Like update_order_status, expected_status guards against stale screens.
+    """
+    
+    if not request.user.is_kitchen_staff() and not request.user.is_admin():
+        if _wants_json(request):
+            return JsonResponse({'ok': False, 'error': 'Access denied.'}, status=403)
+        messages.error(request, 'Access denied.')
+        return redirect('main:index')
+    
+    item = get_object_or_404(OrderItem.objects.select_related('menu_item'), id=item_id)
+    station = item.menu_item.station
+    
+    if request.method == 'POST':
+        new_status = request.POST.get('status')
+        expected_status = request.POST.get('expected_status') or item.status
+        
+        try:
+            item = transition_item(item.id, expected_status, new_status, request.user)
+        except InvalidTransition as e:
+            if _wants_json(request):
+                return JsonResponse({'ok': False, 'error': str(e)}, status=400)
+            messages.error(request, str(e))
+        except StatusConflict as e:
+            if _wants_json(request):
+                return JsonResponse({'ok': False, 'error': str(e), 'status': e.current_status}, status=409)
+            messages.error(request, f'{item}: {e}')
+        else:
+            if _wants_json(request):
+                return JsonResponse({
+                    'ok': True,
+                    'item_id': item.id,
+                    'status': item.status,
+                    'order_id': item.order_id,
+                    'order_status': item.order.status,
+                })
+            messages.success(request, f'{item} marked {item.get_status_display()}')
+    
+    return redirect('dashboard:station_queue', station=station)
+
+
+@login_required
+@require_http_methods(["POST"])
+def claim_order_view(request):
+    """Give the calling cook the oldest waiting ticket and start preparing it"""
+    
+    if not request.user.is_kitchen_staff():
+        if _wants_json(request):
+            return JsonResponse({'ok': False, 'error': 'Access denied.'}, status=403)
+        messages.error(request, 'Access denied. Kitchen staff privileges required.')
+        return redirect('main:index')
+    
+    order = claim_next_order(request.user)
+    
+    if _wants_json(request):
+        if order is None:
+            return JsonResponse({'ok': True, 'order_id': None})
+        return JsonResponse({'ok': True, 'order_id': order.id, 'status': order.status})
+    
+    if order is None:
+        messages.info(request, 'No tickets are waiting.')
+    else:
+        messages.success(request, f'Order #{order.id} is yours.')
+    return redirect('dashboard:kitchen_dashboard')
+
+
+@login_required
+@require_http_methods(["POST"])
+def claim_station_item_view(request, station):
+    """Give the calling cook the oldest queued item of a station and start it"""
+    
+    if not request.user.is_kitchen_staff():
+        if _wants_json(request):
+            return JsonResponse({'ok': False, 'error': 'Access denied.'}, status=403)
+        messages.error(request, 'Access denied. Kitchen staff privileges required.')
+        return redirect('main:index')
+    
+    station = _get_station(station)
+    item = claim_next_station_item(station, request.user)
+    
+    if _wants_json(request):
+        if item is None:
+            return JsonResponse({'ok': True, 'item_id': None})
+        return JsonResponse({'ok': True, 'item_id': item.id, 'order_id': item.order_id, 'status': item.status})
+    
+    if item is None:
+        messages.info(request, 'Nothing is queued at this station.')
+    else:
+        messages.success(request, f'{item} is yours.')
+    return redirect('dashboard:station_queue', station=station)
+
+
 @login_required
 def clear_recent_orders(request):
     """Clear all recent orders from the system"""
@@ -169,9 +476,7 @@ def clear_recent_orders(request):
     
     if request.method == 'POST':
         # Delete all orders except pending ones
-        deleted_count = Order.objects.exclude(
-            status=Order.OrderStatus.PENDING
-        ).delete()[0]
+        deleted_count = delete_orders(Order.objects.exclude(status=Order.OrderStatus.PENDING))
         
         messages.success(request, f'Successfully cleared {deleted_count} recent orders from the system.')
     
@@ -179,7 +484,6 @@ def clear_recent_orders(request):
 
 
 from django.http import JsonResponse
-from django.core.cache import cache
 
 
 @login_required
@@ -190,41 +494,81 @@ def admin_stats_api(request):
     if not request.user.is_admin():
         return JsonResponse({'error': 'Access denied'}, status=403)
     
-    # Get current stats
-    total_orders = Order.objects.exclude(status=Order.OrderStatus.PENDING).count()
-    pending_orders = Order.objects.filter(status=Order.OrderStatus.CONFIRMED).count()
-    active_orders = Order.objects.filter(
-        status__in=[Order.OrderStatus.PREPARING, Order.OrderStatus.READY]
-    ).count()
-    
-    # Calculate today's revenue
-    today = timezone.now().date()
-    today_revenue = Order.objects.filter(
-        created_at__date=today,
-        status__in=[Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING, 
-                   Order.OrderStatus.READY, Order.OrderStatus.COMPLETED]
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    # Get previous stats from cache to detect new orders
-    cache_key = f'admin_stats_{request.user.id}'
-    previous_stats = cache.get(cache_key, {})
-    
-    # Calculate new orders since last check
-    new_orders = max(0, total_orders - previous_stats.get('total_orders', 0))
-    
-    # Update cache
-    current_stats = {
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'active_orders': active_orders,
-        'today_revenue': today_revenue
-    }
-    cache.set(cache_key, current_stats, 300)  # Cache for 5 minutes
+    # Shared snapshot maintained by the dashboard counters
+    stats = dashboard_stats()
+    
+    return JsonResponse({
+        'total_orders': stats['total_orders'],
+        'pending_orders': stats['pending_orders'],
+        'active_orders': stats['active_orders'],
+        'today_revenue': stats['today_revenue'],
+    })
+
+
+@login_required
+def admin_order_changes_api(request):
+    """
+    Orders created, updated or deleted since a cursor, for in-place
+    dashboard updates.
+
+    Pass the cursor from the previous response (or the page) as ?cursor=;
+    keep fetching while has_more is true. When the changes can no longer
+    be replayed the answer has reset set and the page should reload.
+    """
+    
+    if not request.user.is_admin():
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    try:
+        orders, removed, cursor, has_more = order_changes(request.GET.get('cursor', ''))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except EventsExpired:
+        return JsonResponse({'reset': True, 'orders': [], 'removed': [], 'cursor': latest_cursor(), 'has_more': False})
+    
+    return JsonResponse({
+        'orders': [
+            {
+                'id': order.id,
+                'status': order.status,
+                'updated_at': order.updated_at.isoformat(),
+                'html': render_to_string('dashboard/admin-order-row.html', {'order': order}, request=request),
+            }
+            for order in orders
+        ],
+        'removed': removed,
+        'cursor': cursor,
+        'has_more': has_more,
+    })
+
+
+@login_required
+def admin_sales_series_api(request):
+    """
+    API endpoint for sales charts, read from the hourly rollups.
+
+    ?interval=day|hour (default day) and ?days=N, the number of days up to
+    and including today (default 7, at most 366).
+    """
+    
+    if not request.user.is_admin():
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    interval = request.GET.get('interval', 'day')
+    if interval not in SERIES_INTERVALS:
+        return JsonResponse({'error': 'interval must be hour or day'}, status=400)
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        return JsonResponse({'error': 'days must be a number'}, status=400)
+    days = min(max(days, 1), 366)
+    
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
     
     return JsonResponse({
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'active_orders': active_orders,
-        'today_revenue': today_revenue,
-        'new_orders': new_orders
+        'interval': interval,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': sales_series(start, end, interval),
     })
@@ -0,0 +1,64 @@
+"""
+Benchmark utilities for DineAt
+
+The benchmark_* management commands fill the configured database with
+generated rows, so they refuse to run outside development unless they are
+told the database is not production, and everything they write is rolled
+back when they finish.
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import transaction
+
+NOT_PROD_FLAG = '--i-know-this-is-not-prod'
+
+
+def add_not_prod_argument(parser):
+    """Add the flag that lets a benchmark run with DEBUG off"""
+    parser.add_argument(
+        NOT_PROD_FLAG,
+        action='store_true',
+        dest='not_prod',
+        help='Run even though DEBUG is off; never use this against production',
+    )
+
+
+def check_not_prod(options):
+    """
+    Refuse to run a benchmark unless DEBUG is on or the flag was given.
+
+    Raises:
+        CommandError: If neither is set
+    """
+    if not (settings.DEBUG or options.get('not_prod')):
+        raise CommandError(
+            'Benchmarks write generated rows to the configured database. '
+            f'Run them with DEBUG on, or pass {NOT_PROD_FLAG} if this database is not production.'
+        )
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back at the end"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def time_calls(rounds, func):
+    """
+    Call func rounds times.
+
+    Returns:
+        list: Wall time of each call in milliseconds
+    """
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
@@ -0,0 +1,274 @@
+import difflib
+import json
+import re
+import uuid
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.accounts.history_utils import order_history
+from apps.accounts.models import CustomUser
+from apps.orders.cart_utils import SessionCart
+from apps.orders.catalog_utils import get_catalog
+from apps.orders.models import MenuItem, Order, OrderItem, Table
+
+# Most queries each view may issue, whatever the amount of data. Every
+# named URL in apps/*/urls.py needs an entry.
+QUERY_BUDGETS = {
+    'accounts:login': 0,
+    'accounts:admin_login': 9,
+    'accounts:kitchen_login': 9,
+    'accounts:customer_login': 9,
+    'accounts:customer_signup': 13,
+    'accounts:logout': 4,
+    'accounts:profile': 5,
+    'accounts:edit_profile': 6,
+    'accounts:order_history': 3,
+    'accounts:order_history_more': 3,
+    'chatbot:chat': 0,
+    'chatbot:status': 0,
+    'dashboard:admin_dashboard': 11,
+    'dashboard:kitchen_dashboard': 5,
+    'dashboard:kitchen_stream': 4,
+    'dashboard:station_queue': 3,
+    'dashboard:station_items': 3,
+    'dashboard:claim_order': 12,
+    'dashboard:claim_station_item': 18,
+    'dashboard:update_item_status': 17,
+    'dashboard:admin_order_detail': 5,
+    'dashboard:admin_order_invoice': 5,
+    'dashboard:update_order_status': 11,
+    'dashboard:bulk_update_order_status': 13,
+    'dashboard:clear_recent_orders': 27,
+    'dashboard:admin_stats_api': 4,
+    'dashboard:admin_order_changes': 3,
+    'dashboard:admin_sales_series': 3,
+    'main:index': 0,
+    'main:about': 0,
+    'main:contact': 0,
+    'main:help': 0,
+    'main:payment': 3,
+    'main:save_preferences': 0,
+    'main:toggle_theme': 0,
+    'main:cookie_info': 0,
+    'main:chatbot_query': 0,
+    'main:chatbot_status': 0,
+    'orders:menu': 3,
+    'orders:menu_autocomplete': 3,
+    'orders:cart': 3,
+    'orders:cart_operations': 6,
+    'orders:add_to_cart': 6,
+    'orders:remove_from_cart': 5,
+    'orders:update_cart_item': 5,
+    'orders:payment': 3,
+    'orders:upi_mark_paid': 0,
+    'orders:payment_status': 0,
+    'orders:process_payment': 34,
+    'orders:table_selection': 3,
+    'orders:order_confirmation': 34,
+    'orders:upi_payment': 3,
+}
+
+# Data volumes every view is measured at
+SEED_VOLUMES = (2, 12)
+
+# Stands in for the Gemini model so chatbot views make no network calls
+FAKE_GEMINI = mock.Mock(**{'generate_content.return_value.text': 'DineAt is a restaurant system.'})
+
+KITCHEN_STATUSES = [Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING, Order.OrderStatus.READY]
+HISTORY_STATUSES = [Order.OrderStatus.COMPLETED, Order.OrderStatus.CANCELLED, *KITCHEN_STATUSES]
+
+
+def project_url_names():
+    """Every named URL of the project apps, as 'namespace:name'"""
+    names = set()
+    for config in apps.get_app_configs():
+        if not config.name.startswith('apps.'):
+            continue
+        try:
+            urls = import_module(f'{config.name}.urls')
+        except ModuleNotFoundError:
+            continue
+        names.update(f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns if pattern.name)
+    return names
+
+
+def normalize_sql(sql):
+    """SQL with literals and IN lists folded, so repeated queries line up"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'"s\d+_x\d+"', '?', sql)
+    sql = re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+    sql = re.sub(r'(\([?, ]+\))(, \([?, ]+\))+', r'\1, ...', sql)
+    sql = re.sub(r'(WHEN \(\S+ = \?\) THEN \? )+', 'WHEN ... ', sql)
+    return re.sub(r'IN \([^)]*\)', 'IN (...)', sql)
+
+
+@mock.patch('apps.main.views_chatbot.gemini_model', FAKE_GEMINI)
+@mock.patch('apps.chatbot.views.model', FAKE_GEMINI)
+class QueryBudgetTests(TestCase):
+    """Every view stays within its query budget at any data volume"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='admin', password='secret123', role=CustomUser.UserRole.ADMIN)
+        cls.cook = CustomUser.objects.create_user(username='cook', password='secret123', role=CustomUser.UserRole.KITCHEN)
+        cls.customer = CustomUser.objects.create_user(username='diner', password='secret123')
+        cls.seeded = 0
+        cls.payment_token = uuid.uuid4()
+
+    def seed(self, volume):
+        """Grow every listing the views read to volume rows"""
+        start = self.seeded
+        self.seeded = volume
+        categories = MenuItem.DishType.values
+        MenuItem.objects.bulk_create([
+            MenuItem(name=f'Dish {i}', description=f'Dish {i}', price=Decimal('100.00') + i,
+                     category=categories[i % len(categories)])
+            for i in range(start, volume)
+        ])
+        Table.objects.bulk_create([Table(table_number=i + 1, capacity=4) for i in range(start, volume)])
+        dishes = list(MenuItem.objects.order_by('id'))
+        tables = list(Table.objects.order_by('id'))
+
+        for i in range(start, volume):
+            guest = CustomUser.objects.create_user(username=f'guest{i}')
+            for customer, statuses in ((self.customer, HISTORY_STATUSES), (guest, KITCHEN_STATUSES)):
+                order = Order.objects.create(customer=customer, table=tables[i], status=Order.OrderStatus.PENDING)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, menu_item=dish, quantity=2, price=dish.price)
+                    for dish in dishes[i % len(dishes):][:3]
+                ])
+                order.status = statuses[i % len(statuses)]
+                order.save()
+        get_catalog(refresh=True)
+
+    def view_requests(self):
+        """(url name, user, method, path, data, extra) for every view, against the current data"""
+        dishes = list(MenuItem.objects.order_by('id'))
+        order = Order.objects.filter(status=Order.OrderStatus.CONFIRMED).latest('id')
+        item = order.items.order_by('id').first()
+        cart_data = json.dumps({'v': get_catalog().version, 'items': [[dish.id, 2] for dish in dishes]})
+        as_json = {'HTTP_ACCEPT': 'application/json'}
+        _, history_cursor, _ = order_history(self.customer, limit=1)
+        token = self.payment_token
+
+        return [
+            ('accounts:login', None, 'get', reverse('accounts:login'), None, {}),
+            ('accounts:admin_login', None, 'post', reverse('accounts:admin_login'), {'username': 'admin', 'password': 'secret123'}, {}),
+            ('accounts:kitchen_login', None, 'post', reverse('accounts:kitchen_login'), {'username': 'cook', 'password': 'secret123'}, {}),
+            ('accounts:customer_login', None, 'post', reverse('accounts:customer_login'), {'username': 'diner', 'password': 'secret123'}, {}),
+            ('accounts:customer_signup', None, 'post', reverse('accounts:customer_signup'), {
+                'username': 'newdiner', 'email': 'new@example.com', 'password': 'secret123', 'confirm_password': 'secret123',
+            }, {}),
+            ('accounts:logout', self.customer, 'get', reverse('accounts:logout'), None, {}),
+            ('accounts:profile', self.customer, 'get', reverse('accounts:profile'), None, {}),
+            ('accounts:edit_profile', self.customer, 'get', reverse('accounts:edit_profile'), None, {}),
+            ('accounts:order_history', self.customer, 'get', reverse('accounts:order_history'), None, {}),
+            ('accounts:order_history_more', self.customer, 'get', reverse('accounts:order_history_more'), {'cursor': history_cursor}, {}),
+            ('chatbot:chat', None, 'post', reverse('chatbot:chat'), json.dumps({'message': 'hello'}), {'content_type': 'application/json'}),
+            ('chatbot:status', None, 'get', reverse('chatbot:status'), None, {}),
+            ('dashboard:admin_dashboard', self.admin, 'get', reverse('dashboard:admin_dashboard'), None, {}),
+            ('dashboard:kitchen_dashboard', self.cook, 'get', reverse('dashboard:kitchen_dashboard'), None, {}),
+            ('dashboard:kitchen_stream', self.cook, 'get', reverse('dashboard:kitchen_stream'), None, {}),
+            ('dashboard:station_queue', self.cook, 'get', reverse('dashboard:station_queue', args=['MAINS']), None, {}),
+            ('dashboard:station_items', self.cook, 'get', reverse('dashboard:station_items', args=['MAINS']), None, {}),
+            ('dashboard:claim_order', self.cook, 'post', reverse('dashboard:claim_order'), {}, as_json),
+            ('dashboard:claim_station_item', self.cook, 'post', reverse('dashboard:claim_station_item', args=['MAINS']), {}, as_json),
+            ('dashboard:update_item_status', self.cook, 'post', reverse('dashboard:update_item_status', args=[item.id]), {
+                'status': OrderItem.ItemStatus.PREPARING, 'expected_status': OrderItem.ItemStatus.QUEUED,
+            }, as_json),
+            ('dashboard:admin_order_detail', self.admin, 'get', reverse('dashboard:admin_order_detail', args=[order.id]), None, {}),
+            ('dashboard:admin_order_invoice', self.admin, 'get', reverse('dashboard:admin_order_invoice', args=[order.id]), None, {}),
+            ('dashboard:update_order_status', self.cook, 'post', reverse('dashboard:update_order_status', args=[order.id]), {
+                'status': Order.OrderStatus.PREPARING, 'expected_status': Order.OrderStatus.CONFIRMED,
+            }, as_json),
+            ('dashboard:bulk_update_order_status', self.cook, 'post', reverse('dashboard:bulk_update_order_status'), json.dumps({
+                'from_status': Order.OrderStatus.READY, 'to_status': Order.OrderStatus.SERVED,
+            }), {'content_type': 'application/json', **as_json}),
+            ('dashboard:clear_recent_orders', self.admin, 'post', reverse('dashboard:clear_recent_orders'), {}, {}),
+            ('dashboard:admin_stats_api', self.admin, 'get', reverse('dashboard:admin_stats_api'), None, {}),
+            ('dashboard:admin_order_changes', self.admin, 'get', reverse('dashboard:admin_order_changes'), None, {}),
+            ('dashboard:admin_sales_series', self.admin, 'get', reverse('dashboard:admin_sales_series'), {'days': 30}, {}),
+            ('main:index', None, 'get', reverse('main:index'), None, {}),
+            ('main:about', None, 'get', reverse('main:about'), None, {}),
+            ('main:contact', None, 'get', reverse('main:contact'), None, {}),
+            ('main:help', None, 'get', reverse('main:help'), None, {}),
+            ('main:payment', self.customer, 'get', reverse('main:payment'), None, {}),
+            ('main:save_preferences', None, 'post', reverse('main:save_preferences'), json.dumps({'language': 'en'}), {'content_type': 'application/json'}),
+            ('main:toggle_theme', None, 'post', reverse('main:toggle_theme'), {}, {}),
+            ('main:cookie_info', None, 'get', reverse('main:cookie_info'), None, {}),
+            ('main:chatbot_query', None, 'post', reverse('main:chatbot_query'), json.dumps({'message': 'hello'}), {'content_type': 'application/json'}),
+            ('main:chatbot_status', None, 'get', reverse('main:chatbot_status'), None, {}),
+            ('orders:menu', self.customer, 'get', reverse('orders:menu'), None, {}),
+            ('orders:menu_autocomplete', self.customer, 'get', reverse('orders:menu_autocomplete'), {'q': 'Dis'}, {}),
+            ('orders:cart', self.customer, 'get', reverse('orders:cart'), None, {}),
+            ('orders:cart_operations', self.customer, 'post', reverse('orders:cart_operations'), json.dumps({
+                'ops': [{'op': 'add', 'id': dishes[0].id, 'quantity': 1}],
+            }), {'content_type': 'application/json'}),
+            ('orders:add_to_cart', self.customer, 'get', reverse('orders:add_to_cart', args=[dishes[0].id]), None, {}),
+            ('orders:remove_from_cart', self.customer, 'get', reverse('orders:remove_from_cart', args=[dishes[0].id]), None, {}),
+            ('orders:update_cart_item', self.customer, 'post', reverse('orders:update_cart_item', args=[dishes[0].id]), {'quantity': 3}, {}),
+            ('orders:payment', self.customer, 'post', reverse('orders:payment'), {'cart_data': cart_data}, {}),
+            ('orders:upi_mark_paid', None, 'get', reverse('orders:upi_mark_paid', args=[token]), None, {}),
+            ('orders:payment_status', None, 'get', reverse('orders:payment_status', args=[token]), None, {}),
+            ('orders:process_payment', self.customer, 'post', reverse('orders:process_payment'), {'payment_method': 'cod'}, {}),
+            ('orders:table_selection', self.customer, 'get', reverse('orders:table_selection'), None, {}),
+            ('orders:order_confirmation', self.customer, 'post', reverse('orders:order_confirmation'), {'cart_data': cart_data}, {}),
+            ('orders:upi_payment', self.customer, 'post', reverse('orders:upi_payment'), {'cart_data': cart_data}, {}),
+        ]
+
+    def measure(self, user, method, path, data, extra):
+        """Queries issued by one request, which is rolled back afterwards"""
+        with transaction.atomic():
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+                session = client.session
+                cart = SessionCart(session)
+                for dish in MenuItem.objects.all():
+                    cart.add(dish.id, 2)
+                session.save()
+            with CaptureQueriesContext(connection) as ctx:
+                response = getattr(client, method)(path, data, **extra)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 500, path)
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def budget_report(self, name, budget, queries, baseline):
+        """What went over budget: a diff against the smallest volume, or the queries past the budget"""
+        lines = [f'{name} issued {len(queries)} queries, budget is {budget}']
+        if baseline is not None:
+            lines.extend(difflib.unified_diff(
+                [normalize_sql(sql) for sql in baseline],
+                [normalize_sql(sql) for sql in queries],
+                'smallest volume', 'this volume', lineterm='', n=0,
+            ))
+        else:
+            lines.extend(f'{number}. {sql}' for number, sql in enumerate(queries[budget:], budget + 1))
+        return '\n'.join(lines)
+
+    def test_every_view_has_a_budget(self):
+        self.assertEqual(project_url_names() - set(QUERY_BUDGETS), set())
+
+    def test_views_stay_within_budget(self):
+        baselines = {}
+        for volume in SEED_VOLUMES:
+            self.seed(volume)
+            for name, user, method, path, data, extra in self.view_requests():
+                with self.subTest(view=name, volume=volume):
+                    cache.clear()
+                    cache.set(f'pay:{self.payment_token}', {'status': 'pending'}, timeout=60)
+                    budget = QUERY_BUDGETS[name]
+                    queries = self.measure(user, method, path, data, extra)
+                    baseline = baselines.setdefault(name, queries)
+                    self.assertLessEqual(
+                        len(queries), budget,
+                        self.budget_report(name, budget, queries, None if baseline is queries else baseline),
+                    )
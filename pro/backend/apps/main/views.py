@@ -1,7 +1,8 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
-from apps.orders.models import MenuItem, Order
+from apps.orders.cart_utils import SessionCart
+from apps.orders.models import MenuItem
 from .cookie_utils import set_user_preferences, get_user_preferences, set_theme_cookie, get_theme_cookie
 import json
 
@@ -73,33 +74,15 @@ def help_view(request):
 def payment_view(request):
     """Payment page with real-time order data and cookie support"""
     
-    # Get real-time order data from database
-    # Get or create pending order for current user
-    cart_order, created = Order.objects.get_or_create(
-        customer=request.user,
-        status=Order.OrderStatus.PENDING
-    )
-    
-    # Get order items
-    order_items = []
-    total_amount = 0
-    
-    for item in cart_order.items.all():
-        order_items.append({
-            'name': item.menu_item.name,
-            'price': item.menu_item.price,
-            'quantity': item.quantity
-        })
-        total_amount += item.menu_item.price * item.quantity
+    # The cart lives in the session until checkout
+    summary = SessionCart(request.session).summary()
     
     # Get user preferences
     user_prefs = get_user_preferences(request)
     theme = get_theme_cookie(request)
     
     context = {
-        'order_items': order_items,
-        'total_amount': total_amount,
-        'cart_order': cart_order,
+        'summary': summary,
         'user_preferences': user_prefs,
         'theme': theme
     }
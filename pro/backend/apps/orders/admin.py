@@ -1,5 +1,29 @@
+from django import forms
 from django.contrib import admin
-from .models import MenuItem, Table, Order, OrderItem
+from .models import MenuItem, Table, Order, OrderItem, OrderStatusEvent
+
+
+class OrderAdminForm(forms.ModelForm):
+    """Order form whose status choices follow Order.TRANSITIONS"""
+    
+    class Meta:
+        model = Order
+        fields = '__all__'
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk and 'status' in self.fields:
+            # Only the current status and the ones it may move to
+            self.fields['status'].choices = self.instance.status_choices
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        # Existing orders can never move back to PENDING; new ones must not clash with the customer's cart
+        customer = cleaned_data.get('customer')
+        if self.instance._state.adding and customer and cleaned_data.get('status') == Order.OrderStatus.PENDING:
+            if Order.objects.filter(customer=customer, status=Order.OrderStatus.PENDING).exists():
+                self.add_error('status', 'This customer already has a pending order.')
+        return cleaned_data
 
 
 class OrderItemInline(admin.TabularInline):
@@ -9,10 +33,25 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ['subtotal']
     
     def subtotal(self, obj):
+        if obj.price is None or obj.quantity is None:
+            # The blank row of the add page
+            return '-'
         return f"₹{obj.subtotal}"
     subtotal.short_description = 'Subtotal'
 
 
+class OrderStatusEventInline(admin.TabularInline):
+    """Read-only status history within order admin"""
+    model = OrderStatusEvent
+    extra = 0
+    can_delete = False
+    fields = ['created_at', 'from_status', 'to_status', 'actor']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
     """Admin interface for menu items"""
@@ -35,17 +74,32 @@ class TableAdmin(admin.ModelAdmin):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     """Admin interface for orders"""
+    form = OrderAdminForm
     list_display = ['id', 'customer', 'table', 'status', 'total_amount', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['customer__username', 'id']
-    readonly_fields = ['created_at', 'updated_at', 'total_amount']
-    inlines = [OrderItemInline]
+    readonly_fields = ['created_at', 'updated_at', 'total_amount', 'line_summary']
+    inlines = [OrderItemInline, OrderStatusEventInline]
     list_editable = ['status']
     ordering = ['-created_at']
     
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', OrderAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+    
+    def save_model(self, request, obj, form, change):
+        # Also used by the list_editable status column
+        obj._changed_by = request.user
+        super().save_model(request, obj, form, change)
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Inline item edits change the lines behind the stored total and line summary
+        form.instance.calculate_total()
+    
     fieldsets = (
         ('Order Information', {
-            'fields': ('customer', 'table', 'status')
+            'fields': ('customer', 'table', 'status', 'line_summary')
         }),
         ('Financial', {
             'fields': ('total_amount',)
@@ -0,0 +1,242 @@
+"""
+Cart storage for DineAt
+
+While a customer browses, the cart lives in their session (SessionCart)
+and costs no database writes beyond the session itself. Its total is
+summed from the catalog snapshot, so cart changes never touch the order
+tables. The cart becomes a PENDING order only at checkout, where
+checkout_utils writes its lines and total in a fixed number of queries.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Sum, Window
+
+from .catalog_utils import get_catalog
+from .models import LINE_TOTAL, Order, OrderItem
+
+SESSION_CART_KEY = 'cart'
+MAX_LINE_QUANTITY = 99
+
+
+class CartOperationError(ValueError):
+    """A batched cart operation could not be applied"""
+
+
+class CartSummary:
+    """
+    Line items and totals of a cart or an order.
+
+    The payment page, the order confirmation and the cart_operations API
+    render from this, whether the lines came from the session cart or from
+    a stored order. Each line is a dict with id
+    (menu item id), name, price, quantity and subtotal.
+    """
+
+    def __init__(self, lines, total=None, version=None):
+        self.lines = lines
+        self.count = sum(line['quantity'] for line in lines)
+        if total is None:
+            total = sum((line['subtotal'] for line in lines), Decimal('0.00'))
+        self.total = total
+        self.version = version
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def as_dict(self):
+        """JSON-ready form for API clients"""
+        return {
+            'version': self.version,
+            'count': self.count,
+            'total': self.total,
+            'items': self.lines,
+        }
+
+
+class SessionCart:
+    """
+    Cart kept in the session as {menu_item_id: quantity}.
+
+    Prices are read from the catalog snapshot, so building the cart needs
+    no menu queries. Every mutation bumps a version counter that clients
+    can use to detect concurrent changes.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        data = session.get(SESSION_CART_KEY) or {}
+        self.quantities = {int(item_id): quantity for item_id, quantity in data.get('items', {}).items()}
+        self.version = data.get('version', 0)
+
+    def __len__(self):
+        return sum(self.quantities.values())
+
+    def __contains__(self, item_id):
+        return item_id in self.quantities
+
+    def _save(self):
+        self.version += 1
+        self.session[SESSION_CART_KEY] = {
+            'items': {str(item_id): quantity for item_id, quantity in self.quantities.items()},
+            'version': self.version,
+        }
+
+    def add(self, item_id, quantity=1):
+        """Add quantity of a menu item"""
+        self.quantities[item_id] = self.quantities.get(item_id, 0) + quantity
+        if self.quantities[item_id] <= 0:
+            del self.quantities[item_id]
+        self._save()
+
+    def update(self, item_id, quantity):
+        """Set the quantity of a menu item, removing it at zero"""
+        if quantity > 0:
+            self.quantities[item_id] = quantity
+        else:
+            self.quantities.pop(item_id, None)
+        self._save()
+
+    def remove(self, item_id):
+        """Remove a menu item from the cart"""
+        self.quantities.pop(item_id, None)
+        self._save()
+
+    def clear(self):
+        """Empty the cart"""
+        self.quantities = {}
+        self._save()
+
+    def apply(self, operations):
+        """
+        Apply a batch of cart operations all or nothing.
+
+        Each operation is a dict such as {"op": "add", "id": 3, "quantity": 2};
+        supported ops are add, set, remove and clear. The batch is validated
+        against the catalog before anything changes, and the version is
+        bumped once for the whole batch.
+
+        Raises:
+            CartOperationError: if any operation is invalid
+        """
+        if not isinstance(operations, list):
+            raise CartOperationError('Operations must be a list.')
+
+        catalog = get_catalog()
+        quantities = dict(self.quantities)
+        for operation in operations:
+            if not isinstance(operation, dict):
+                raise CartOperationError('Operation is malformed.')
+
+            op = operation.get('op')
+            if op == 'clear':
+                quantities = {}
+                continue
+            if op not in ('add', 'set', 'remove'):
+                raise CartOperationError(f'Unknown cart operation: {op}.')
+
+            try:
+                item_id = int(operation['id'])
+                quantity = int(operation.get('quantity', 1))
+            except (TypeError, ValueError, KeyError):
+                raise CartOperationError('Operation is malformed.')
+
+            if op == 'remove':
+                quantities.pop(item_id, None)
+                continue
+            if item_id not in catalog:
+                raise CartOperationError('A dish in the cart is no longer available.')
+
+            if op == 'add':
+                quantity += quantities.get(item_id, 0)
+            if quantity > 0:
+                quantities[item_id] = min(quantity, MAX_LINE_QUANTITY)
+            else:
+                quantities.pop(item_id, None)
+
+        self.quantities = quantities
+        self._save()
+
+    def lines(self, refresh=False):
+        """
+        (menu_item_id, quantity, price) for items still on the menu.
+
+        Args:
+            refresh (bool): Check the menu table for changes first, as
+                checkout does before charging these prices
+        """
+        catalog = get_catalog(refresh=refresh)
+        return [
+            (item_id, quantity, catalog.prices[item_id])
+            for item_id, quantity in self.quantities.items()
+            if item_id in catalog
+        ]
+
+    def items(self):
+        """Cart lines with menu details, ready for templates"""
+        catalog = get_catalog()
+        return [
+            {
+                'id': item_id,
+                'name': catalog.by_id[item_id]['name'],
+                'price': price,
+                'quantity': quantity,
+                'subtotal': price * quantity,
+            }
+            for item_id, quantity, price in self.lines()
+        ]
+
+    def summary(self):
+        """CartSummary of the cart, built from the catalog without queries"""
+        return CartSummary(self.items(), version=self.version)
+
+
+def order_summary(order):
+    """
+    CartSummary of a stored order from a single query.
+
+    Menu item names are joined in and the order total is computed by a
+    window aggregate over the same rows, so rendering an order costs one
+    query whatever its size.
+    """
+    rows = list(
+        OrderItem.objects.filter(order=order)
+        .order_by('id')
+        .values_list('menu_item_id', 'menu_item__name', 'price', 'quantity')
+        .annotate(subtotal=LINE_TOTAL, order_total=Window(Sum(LINE_TOTAL)))
+    )
+    lines = [
+        {'id': item_id, 'name': name, 'price': price, 'quantity': quantity, 'subtotal': subtotal}
+        for item_id, name, price, quantity, subtotal, _ in rows
+    ]
+    total = rows[0][-1] if rows else Decimal('0.00')
+    return CartSummary(lines, total=total)
+
+
+def get_cart_order(user):
+    """
+    Return the customer's PENDING order, creating it on first use.
+
+    The unique_pending_order_per_customer constraint makes concurrent
+    creation safe: the losing insert fails and re-reads the winner. MySQL
+    has no partial indexes, so there the customer row is locked instead.
+    """
+    if connection.features.supports_partial_indexes:
+        cart_order, created = Order.objects.get_or_create(
+            customer=user,
+            status=Order.OrderStatus.PENDING
+        )
+        return cart_order
+
+    with transaction.atomic():
+        get_user_model().objects.select_for_update().filter(pk=user.pk).exists()
+        cart_order, created = Order.objects.get_or_create(
+            customer=user,
+            status=Order.OrderStatus.PENDING
+        )
+    return cart_order
+
@@ -0,0 +1,113 @@
+"""
+Menu catalog snapshot for DineAt
+
+The snapshot holds the available menu, ready to render, together with an
+id -> price map. It is built once per worker and tagged with a catalog
+version derived from the menu table, so menu pages never need to query
+menu items while the menu is unchanged.
+
+The version is cached for CATALOG_VERSION_TTL only: saving a menu item
+drops it in this process, and other workers (each with their own
+snapshot and, on the default LocMemCache, their own cache) recompute it
+within a few seconds. Checkout always reads it from the table, so an
+order is never priced from a stale snapshot.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from .models import MenuItem
+
+CATALOG_VERSION_CACHE_KEY = 'menu:catalog_version'
+# How long a worker may serve the menu before checking the table again
+CATALOG_VERSION_TTL = 5
+
+CATEGORY_ICONS = {
+    MenuItem.DishType.APPETIZER: 'fa-cookie-bite',
+    MenuItem.DishType.MAIN_COURSE: 'fa-bowl-food',
+    MenuItem.DishType.DESSERT: 'fa-ice-cream',
+    MenuItem.DishType.BEVERAGE: 'fa-mug-hot',
+    MenuItem.DishType.SPECIAL: 'fa-star',
+}
+
+_snapshot = None
+
+
+class CatalogSnapshot:
+    """Immutable view of the available menu at one catalog version"""
+
+    def __init__(self, version, menu_items, last_modified=None):
+        self.version = version
+        self.last_modified = last_modified
+        self.items = [
+            {
+                'id': item.id,
+                'name': item.name,
+                'description': item.description,
+                'price': item.price,
+                'category': item.category,
+                'category_label': item.get_category_display(),
+                'icon': CATEGORY_ICONS.get(item.category, 'fa-utensils'),
+                'is_vegetarian': item.is_vegetarian,
+                'is_vegan': item.is_vegan,
+                'preparation_time': item.preparation_time,
+            }
+            for item in menu_items
+        ]
+        self.by_id = {item['id']: item for item in self.items}
+        self.prices = {item['id']: item['price'] for item in self.items}
+        self.client_catalog = {
+            'version': version,
+            'items': {item['name']: {'id': item['id'], 'price': float(item['price'])} for item in self.items},
+        }
+
+    def __contains__(self, item_id):
+        return item_id in self.prices
+
+    def filter(self, category=''):
+        """Available items, optionally restricted to one category"""
+        if not category:
+            return self.items
+        return [item for item in self.items if item['category'] == category]
+
+
+def _menu_stats():
+    return MenuItem.objects.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+
+
+def _version_from_stats(stats):
+    last_modified = stats['last_modified']
+    stamp = last_modified.strftime('%Y%m%d%H%M%S%f') if last_modified else '0'
+    return f"{stats['count']}-{stamp}"
+
+
+def compute_catalog_version():
+    """Derive the catalog version from the menu table"""
+    return _version_from_stats(_menu_stats())
+
+
+def get_catalog_version(refresh=False):
+    """Return the current catalog version, cached for CATALOG_VERSION_TTL"""
+    version = None if refresh else cache.get(CATALOG_VERSION_CACHE_KEY)
+    if version is None:
+        version = compute_catalog_version()
+        cache.set(CATALOG_VERSION_CACHE_KEY, version, CATALOG_VERSION_TTL)
+    return version
+
+
+def get_catalog(refresh=False):
+    """Return the catalog snapshot, rebuilding it when the version changes"""
+    global _snapshot
+
+    version = get_catalog_version(refresh=refresh)
+    if _snapshot is None or _snapshot.version != version:
+        stats = _menu_stats()
+        menu_items = MenuItem.objects.filter(is_available=True)
+        _snapshot = CatalogSnapshot(_version_from_stats(stats), menu_items, stats['last_modified'])
+        # Heal a cached version that lags behind the table
+        cache.set(CATALOG_VERSION_CACHE_KEY, _snapshot.version, CATALOG_VERSION_TTL)
+    return _snapshot
+
+
+def invalidate_catalog():
+    """Drop the cached catalog version so the next reader rebuilds"""
+    cache.delete(CATALOG_VERSION_CACHE_KEY)
@@ -0,0 +1,136 @@
+"""
+Checkout reconciliation for DineAt orders
+
+Carts arrive as a compact versioned payload of menu item ids and quantities:
+
+    {"v": "<catalog version>", "items": [[menu_item_id, quantity], ...]}
+
+Prices always come from the server-side catalog snapshot.
+"""
+import json
+from decimal import Decimal
+
+from django.db import transaction
+
+from .cart_utils import MAX_LINE_QUANTITY, get_cart_order
+from .catalog_utils import get_catalog
+from .models import Order, OrderItem, line_summary
+
+
+class InvalidCartError(ValueError):
+    """The posted cart could not be understood"""
+
+
+class StaleCatalogError(InvalidCartError):
+    """The cart was built against an outdated menu"""
+
+
+def parse_cart_data(cart_data_raw):
+    """
+    Validate a versioned cart payload against the catalog snapshot.
+
+    Lines for the same dish are merged so every dish maps to a single
+    order item.
+
+    Returns:
+        list: (menu_item_id, quantity, price) tuples
+
+    Raises:
+        InvalidCartError: if the payload is malformed
+        StaleCatalogError: if the payload was built for another catalog version
+    """
+    try:
+        cart_data = json.loads(cart_data_raw)
+    except (TypeError, ValueError):
+        raise InvalidCartError('Cart data is not valid JSON.')
+
+    if not isinstance(cart_data, dict) or not isinstance(cart_data.get('items'), list):
+        raise InvalidCartError('Cart data has an unknown format.')
+
+    # Prices are charged, so check the menu table rather than a cached version
+    catalog = get_catalog(refresh=True)
+    if cart_data.get('v') != catalog.version:
+        raise StaleCatalogError('The menu has changed since this cart was built.')
+
+    quantities = {}
+    for line in cart_data['items']:
+        try:
+            item_id, quantity = int(line[0]), int(line[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            raise InvalidCartError('Cart line is malformed.')
+
+        if item_id not in catalog:
+            raise StaleCatalogError('A dish in the cart is no longer available.')
+        if quantity < 1:
+            continue
+
+        quantities[item_id] = min(quantities.get(item_id, 0) + quantity, MAX_LINE_QUANTITY)
+
+    return [(item_id, quantity, catalog.prices[item_id]) for item_id, quantity in quantities.items()]
+
+
+def cart_total(lines):
+    """Total of parsed cart lines at catalog prices"""
+    return sum((price * quantity for _, quantity, price in lines), Decimal('0.00'))
+
+
+def reconcile_cart(order, lines):
+    """
+    Replace the items of an order with the given checkout lines.
+
+    Order items are bulk created from catalog ids, then read back with their
+    menu item names in one query to set the total and the line summary, so
+    the number of queries does not depend on the size of the cart.
+
+    Returns:
+        Decimal: the new order total
+    """
+    with transaction.atomic():
+        order.items.all().delete()
+
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item_id=item_id, quantity=quantity, price=price)
+            for item_id, quantity, price in lines
+        ])
+
+        rows = list(order.items.order_by('id').values_list('menu_item__name', 'quantity', 'price'))
+        total = sum((quantity * price for _, quantity, price in rows), Decimal('0.00'))
+        order.total_amount = total
+        order.line_summary = line_summary((name, quantity) for name, quantity, _ in rows)
+
+    return total
+
+
+def checkout_order(user, lines, payment_method='cod', special_instructions='', table=None):
+    """
+    Materialise cart lines into a confirmed order in one transaction.
+
+    Until this point the cart only lives in the session or the browser, so
+    this is the first time the order touches the database.
+
+    Args:
+        user (CustomUser): The ordering customer
+        lines (list): (menu_item_id, quantity, price) tuples
+        payment_method (str): Selected payment method
+        special_instructions (str): Notes for the kitchen
+        table (Table): Selected table, if any
+
+    Returns:
+        Order: The confirmed order
+    """
+    with transaction.atomic():
+        order = get_cart_order(user)
+        reconcile_cart(order, lines)
+
+        update_fields = ['total_amount', 'line_summary', 'payment_method', 'special_instructions', 'status', 'updated_at']
+        if table is not None:
+            order.table = table
+            update_fields.append('table')
+
+        order.payment_method = payment_method
+        order.special_instructions = special_instructions
+        order.status = Order.OrderStatus.CONFIRMED
+        order._changed_by = user
+        order.save(update_fields=update_fields)
+
+    return order
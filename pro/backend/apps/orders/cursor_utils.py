@@ -0,0 +1,28 @@
+"""
+Keyset cursors for DineAt order listings
+
+A cursor names the last row a client has seen by its (timestamp, id) key,
+so the next page is a range read that starts strictly after it. The
+encoding is opaque to clients: microseconds since the epoch and the id,
+joined by an underscore.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not issued by this listing"""
+
+
+def encode_cursor(moment, row_id):
+    micros = (moment - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}_{row_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        micros, row_id = (int(part) for part in cursor.split('_'))
+    except (AttributeError, ValueError):
+        raise InvalidCursor('Malformed cursor.')
+    return EPOCH + timedelta(microseconds=micros), row_id
@@ -0,0 +1,201 @@
+"""
+Order event log for DineAt live dashboards
+
+Kitchen screens follow order changes through a numbered event log kept
+in the OrderEvent table, so every worker and every process sees the same
+log. Events are appended right after their change commits, in one
+insert per transaction, so event ids follow commit order. Readers ask for the
+ids after the last one they saw and get a contiguous run of events. A
+hole in the ids is an insert still in flight; one that stays open for
+EVENT_HOLE_SECONDS is an event lost for good, and the reader has to
+resynchronise instead of skipping past it.
+
+Open screens do not read the log themselves: each process keeps one
+EventWindow over the newest events and refreshes it at most once every
+EVENT_WINDOW_REFRESH_SECONDS, so the log is read as often as it changes
+and not once per screen.
+"""
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OrderEvent
+
+EVENT_TTL = 60 * 60
+EVENT_REPLAY_LIMIT = 500
+EVENT_HOLE_SECONDS = 5
+# Expired events are deleted once every this many events
+EVENT_PRUNE_EVERY = 1000
+EVENT_WINDOW_REFRESH_SECONDS = 1
+
+ORDER_CREATED = OrderEvent.Kind.ORDER_CREATED
+STATUS_CHANGED = OrderEvent.Kind.STATUS_CHANGED
+ORDER_UPDATED = OrderEvent.Kind.ORDER_UPDATED
+ORDER_REMOVED = OrderEvent.Kind.ORDER_REMOVED
+
+
+class EventsExpired(Exception):
+    """Some events after the cursor are no longer available"""
+
+
+def publish_order_event(kind, order, previous_status=None):
+    """
+    Append an event about an order once the current transaction commits.
+
+    Args:
+        kind (str): ORDER_CREATED, STATUS_CHANGED, ORDER_UPDATED or ORDER_REMOVED
+        order (Order): The order concerned
+        previous_status (str): Status before the change, if any
+    """
+    publish_order_events(kind, [(order, previous_status)])
+
+
+def publish_order_events(kind, changes):
+    """
+    Append one event per order once the current transaction commits, in
+    a single insert.
+
+    Args:
+        kind (str): ORDER_CREATED, STATUS_CHANGED, ORDER_UPDATED or ORDER_REMOVED
+        changes (list): (order, status before the change) pairs
+    """
+    events = [
+        OrderEvent(
+            kind=kind,
+            order_id=order.id,
+            status=order.status,
+            previous_status=previous_status or '',
+            table_id=order.table_id,
+            total=order.total_amount,
+        )
+        for order, previous_status in changes
+    ]
+    if events:
+        transaction.on_commit(lambda: _append(events))
+
+
+def _append(events):
+    now = timezone.now()
+    for event in events:
+        event.created_at = now
+    OrderEvent.objects.bulk_create(events)
+
+    newest = events[-1].id or latest_event_id()
+    if newest // EVENT_PRUNE_EVERY != (newest - len(events)) // EVENT_PRUNE_EVERY:
+        OrderEvent.objects.filter(created_at__lt=now - timedelta(seconds=EVENT_TTL)).delete()
+    return newest
+
+
+def latest_event_id():
+    """Id of the most recent event, 0 when there is none"""
+    return OrderEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def events_since(cursor):
+    """
+    Events published after cursor, oldest first.
+
+    Stops before the first missing id while it may still be on its way in.
+
+    Returns:
+        tuple: (events, latest event id)
+
+    Raises:
+        EventsExpired: if the reader fell too far behind to replay, or an
+            event after the cursor was lost
+    """
+    latest = latest_event_id()
+    if cursor == latest:
+        return [], latest
+    if cursor > latest or latest - cursor > EVENT_REPLAY_LIMIT:
+        raise EventsExpired()
+
+    events = []
+    for row in OrderEvent.objects.filter(id__gt=cursor, id__lte=latest).order_by('id'):
+        if row.id != cursor + len(events) + 1:
+            if timezone.now() - row.created_at > timedelta(seconds=EVENT_HOLE_SECONDS):
+                # Pruned, or its insert failed: the reader resynchronises
+                raise EventsExpired()
+            break
+        events.append(row.as_event())
+    return events, latest
+
+
+class EventWindow:
+    """
+    The newest order events, shared by every reader in the process.
+
+    Readers that have caught up with the window are served from memory.
+    Readers behind it, such as a screen reconnecting after a long gap,
+    fall back to events_since.
+    """
+
+    def __init__(self, size=EVENT_REPLAY_LIMIT):
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=size)
+        # Id of the newest event in the window, and the newest id in the log
+        self.cursor = None
+        self.latest = 0
+        self.refreshed_at = None
+
+    def refresh(self):
+        """Read the events published since the last refresh, at most once per interval"""
+        with self.lock:
+            now = time.monotonic()
+            if self.refreshed_at is not None and now - self.refreshed_at < EVENT_WINDOW_REFRESH_SECONDS:
+                return
+            self.refreshed_at = now
+
+            if self.cursor is not None:
+                try:
+                    events, self.latest = events_since(self.cursor)
+                except EventsExpired:
+                    self.cursor = None
+                else:
+                    self.events.extend(events)
+                    if events:
+                        self.cursor = events[-1]['id']
+                    return
+
+            # Start from the newest event
+            self.events.clear()
+            self.cursor = self.latest = latest_event_id()
+
+    def current(self):
+        """Cursor for a reader that starts now"""
+        self.refresh()
+        return self.cursor
+
+    def read(self, cursor):
+        """
+        Events published after cursor, oldest first, like events_since.
+
+        Raises:
+            EventsExpired: if the events after cursor can no longer be replayed
+        """
+        self.refresh()
+        with self.lock:
+            start = self.events[0]['id'] - 1 if self.events else self.cursor
+            if start <= cursor <= self.cursor:
+                return [event for event in self.events if event['id'] > cursor]
+            if self.cursor < cursor <= self.latest:
+                # Ahead of a hole the window is waiting on
+                return []
+        return events_since(cursor)[0]
+
+
+_window = EventWindow()
+
+
+def current_event_id():
+    """Id of the newest event this process has seen"""
+    return _window.current()
+
+
+def read_events(cursor):
+    """Events after cursor, served from the process-wide event window when possible"""
+    return _window.read(cursor)
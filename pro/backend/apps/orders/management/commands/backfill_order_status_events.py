@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.models import Order, OrderStatusEvent
+
+
+class Command(BaseCommand):
+    help = 'Record the current status of orders placed before the status log existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Events inserted per statement')
+
+    def handle(self, *args, **options):
+        # Only the last status of these orders is known, so each gets a single
+        # event stamped with its last update; carts have nothing to record
+        orders = (
+            Order.objects.exclude(status=Order.OrderStatus.PENDING)
+            .filter(status_events__isnull=True)
+            .order_by('pk')
+            .values_list('pk', 'status', 'updated_at')
+        )
+
+        created = 0
+        batch_size = options['batch_size']
+        batch = []
+        for order_id, status, updated_at in orders.iterator(chunk_size=batch_size):
+            batch.append(OrderStatusEvent(order_id=order_id, to_status=status, created_at=updated_at))
+            if len(batch) == batch_size:
+                created += len(OrderStatusEvent.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(OrderStatusEvent.objects.bulk_create(batch))
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {created} order status event(s).'))
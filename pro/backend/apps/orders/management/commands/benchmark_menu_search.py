@@ -0,0 +1,68 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.main.benchmark_utils import add_not_prod_argument, check_not_prod, rolled_back, time_calls
+from apps.orders.catalog_utils import CatalogSnapshot
+from apps.orders.models import MenuItem
+from apps.orders.search_utils import MenuSearchIndex
+
+WORDS = [
+    'paneer', 'butter', 'masala', 'chicken', 'tikka', 'biryani', 'dal', 'makhani',
+    'naan', 'garlic', 'tandoori', 'spicy', 'creamy', 'mango', 'lassi', 'kulfi',
+    'samosa', 'vegetable', 'mutton', 'rogan', 'josh', 'fish', 'curry', 'fried',
+    'rice', 'jeera', 'palak', 'aloo', 'gobi', 'chole', 'bhature', 'dosa',
+]
+
+QUERIES = ['paneer', 'chick', 'butter masala', 'mango lassi', 'spi', 'veg biryani', 'dosa', 'zzz']
+
+
+class Command(BaseCommand):
+    help = 'Compare menu search through the ORM with the in-memory index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10000, help='Number of menu items to generate')
+        parser.add_argument('--rounds', type=int, default=20, help='Timed runs per query')
+        add_not_prod_argument(parser)
+
+    def handle(self, *args, **options):
+        check_not_prod(options)
+        rng = random.Random(42)
+
+        with rolled_back():
+            MenuItem.objects.bulk_create([
+                MenuItem(
+                    name=' '.join(rng.sample(WORDS, 3)).title(),
+                    description=' '.join(rng.sample(WORDS, 8)),
+                    price=Decimal(rng.randint(50, 500)),
+                    category=rng.choice(MenuItem.DishType.values),
+                    is_vegetarian=rng.random() < 0.5,
+                )
+                for _ in range(options['items'])
+            ], batch_size=1000)
+
+            started = time.perf_counter()
+            snapshot = CatalogSnapshot('benchmark', MenuItem.objects.filter(is_available=True))
+            index = MenuSearchIndex()
+            index.sync(snapshot.version, snapshot.items)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            self.stdout.write(f"Indexed {len(index)} items in {build_ms:.1f} ms\n")
+            self.stdout.write(f"{'query':<16}{'orm ms':>12}{'index ms':>12}{'speedup':>10}")
+
+            for query in QUERIES:
+                orm_times = time_calls(options['rounds'], lambda: list(
+                    MenuItem.objects.filter(is_available=True).filter(
+                        Q(name__icontains=query) | Q(description__icontains=query)
+                    )
+                ))
+                index_times = time_calls(options['rounds'], lambda: index.search(query))
+
+                orm_ms = statistics.median(orm_times)
+                index_ms = statistics.median(index_times)
+                speedup = orm_ms / index_ms if index_ms else float('inf')
+                self.stdout.write(f"{query:<16}{orm_ms:>12.3f}{index_ms:>12.3f}{speedup:>9.1f}x")
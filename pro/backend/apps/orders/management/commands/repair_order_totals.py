@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.orders.models import LINE_TOTAL, Order, OrderItem
+
+
+def computed_total():
+    """Order total summed from its items in SQL, 0 for an empty order"""
+    items_total = (
+        OrderItem.objects.filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total=Sum(LINE_TOTAL))
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(items_total),
+        Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare stored order totals with the sum of their items and optionally fix them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite totals that drifted')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders updated per statement')
+
+    def handle(self, *args, **options):
+        drifted = list(
+            Order.objects.alias(computed=computed_total())
+            .exclude(total_amount=F('computed'))
+            .values_list('pk', flat=True)
+        )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All order totals match their items.'))
+            return
+
+        self.stdout.write(f"{len(drifted)} order(s) with a drifted total: {', '.join(map(str, drifted[:20]))}"
+                          f"{' ...' if len(drifted) > 20 else ''}")
+        if not options['fix']:
+            self.stdout.write('Run again with --fix to repair them.')
+            return
+
+        # Ids are materialised first: MySQL cannot update a table it selects from
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted), batch_size):
+            Order.objects.filter(pk__in=drifted[start:start + batch_size]).update(total_amount=computed_total())
+
+        self.stdout.write(self.style.SUCCESS(f'Repaired {len(drifted)} order total(s).'))
@@ -0,0 +1,64 @@
+# Generated by Django 5.0 on 2026-10-17 19:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """Fold duplicate PENDING orders and repeated order lines together"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+
+    duplicated_customers = list(
+        Order.objects.filter(status='PENDING')
+        .values('customer_id')
+        .annotate(carts=Count('id'))
+        .filter(carts__gt=1)
+        .values_list('customer_id', flat=True)
+    )
+    for customer_id in duplicated_customers:
+        carts = list(Order.objects.filter(customer_id=customer_id, status='PENDING').order_by('-created_at', '-id'))
+        keep = carts[0]
+        OrderItem.objects.filter(order__in=carts[1:]).update(order=keep)
+        Order.objects.filter(id__in=[cart.id for cart in carts[1:]]).delete()
+
+    duplicated_lines = list(
+        OrderItem.objects.values('order_id', 'menu_item_id')
+        .annotate(lines=Count('id'))
+        .filter(lines__gt=1)
+    )
+    for line in duplicated_lines:
+        items = list(OrderItem.objects.filter(order_id=line['order_id'], menu_item_id=line['menu_item_id']).order_by('id'))
+        keep = items[0]
+        keep.quantity = sum(item.quantity for item in items)
+        keep.save(update_fields=['quantity'])
+        OrderItem.objects.filter(id__in=[item.id for item in items[1:]]).delete()
+
+    touched_orders = {line['order_id'] for line in duplicated_lines}
+    touched_orders.update(
+        Order.objects.filter(status='PENDING', customer_id__in=duplicated_customers).values_list('id', flat=True)
+    )
+    for order in Order.objects.filter(id__in=touched_orders):
+        order.total_amount = sum(item.quantity * item.price for item in OrderItem.objects.filter(order=order))
+        order.save(update_fields=['total_amount'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_payment_method'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'PENDING')), fields=('customer',), name='unique_pending_order_per_customer'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'menu_item'), name='unique_order_menu_item'),
+        ),
+    ]
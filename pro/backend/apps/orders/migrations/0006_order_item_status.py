@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-17 19:41
+
+from django.db import migrations, models
+
+
+def mark_finished_items_ready(apps, schema_editor):
+    """Items of orders the kitchen already finished are ready"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    finished = Order.objects.filter(status__in=['READY', 'SERVED', 'COMPLETED']).values_list('pk', flat=True)
+    OrderItem.objects.filter(order_id__in=finished).update(status='READY')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_status_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='status',
+            field=models.CharField(choices=[('QUEUED', 'Queued'), ('PREPARING', 'Preparing'), ('READY', 'Ready')], default='QUEUED', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['status', 'order'], name='order_item_status_idx'),
+        ),
+        migrations.RunPython(mark_finished_items_ready, migrations.RunPython.noop),
+    ]
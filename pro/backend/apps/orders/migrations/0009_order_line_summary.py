@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def fill_line_summaries(apps, schema_editor):
+    """Write the line summary of every existing order, in primary key chunks"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    last_pk = 0
+    while True:
+        order_ids = list(
+            Order.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BACKFILL_CHUNK_SIZE]
+        )
+        if not order_ids:
+            return
+        last_pk = order_ids[-1]
+
+        lines = {}
+        for order_id, name, quantity in (
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .order_by('order_id', 'id')
+            .values_list('order_id', 'menu_item__name', 'quantity')
+        ):
+            lines.setdefault(order_id, []).append(f'{quantity}× {name}')
+
+        orders = [Order(pk=order_id, line_summary=', '.join(parts)) for order_id, parts in lines.items()]
+        Order.objects.bulk_update(orders, ['line_summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='line_summary',
+            field=models.TextField(blank=True, default=''),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at', 'id'], name='order_customer_created_idx'),
+        ),
+        migrations.RunPython(fill_line_summaries, migrations.RunPython.noop),
+    ]
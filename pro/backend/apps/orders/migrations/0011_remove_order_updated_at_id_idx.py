@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-17 20:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_event'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_updated_at_id_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_remove_order_updated_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderevent',
+            name='kind',
+            field=models.CharField(choices=[('order_created', 'Order created'), ('status_changed', 'Status changed'), ('order_updated', 'Order updated'), ('order_removed', 'Order removed')], max_length=20),
+        ),
+    ]
@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
 
@@ -14,6 +16,21 @@ class MenuItem(models.Model):
         BEVERAGE = 'BEVERAGE', 'Beverage'
         SPECIAL = 'SPECIAL', 'Special'
     
+    class Station(models.TextChoices):
+        STARTERS = 'STARTERS', 'Starters'
+        MAINS = 'MAINS', 'Mains'
+        DESSERTS = 'DESSERTS', 'Desserts'
+        BAR = 'BAR', 'Bar'
+    
+    # Kitchen station that prepares each category
+    STATIONS = {
+        DishType.APPETIZER: Station.STARTERS,
+        DishType.MAIN_COURSE: Station.MAINS,
+        DishType.SPECIAL: Station.MAINS,
+        DishType.DESSERT: Station.DESSERTS,
+        DishType.BEVERAGE: Station.BAR,
+    }
+    
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(
@@ -41,6 +58,16 @@ class MenuItem(models.Model):
     
     def __str__(self):
         return f"{self.name} - ₹{self.price}"
+    
+    @property
+    def station(self):
+        """Kitchen station that prepares this item"""
+        return self.STATIONS[self.category]
+    
+    @classmethod
+    def station_categories(cls, station):
+        """Categories prepared at a station"""
+        return [category for category, item_station in cls.STATIONS.items() if item_station == station]
 
 
 class Table(models.Model):
@@ -59,6 +86,15 @@ class Table(models.Model):
         return f"Table {self.table_number} (Capacity: {self.capacity})"
 
 
+# quantity * price of an order item, usable in SQL aggregates
+LINE_TOTAL = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def line_summary(lines):
+    """Compact text of an order's lines, e.g. '2× Naan, 1× Lassi', from (name, quantity) pairs"""
+    return ', '.join(f'{quantity}× {name}' for name, quantity in lines)
+
+
 class Order(models.Model):
     """Customer orders"""
     
@@ -71,6 +107,20 @@ class Order(models.Model):
         COMPLETED = 'COMPLETED', 'Completed'
         CANCELLED = 'CANCELLED', 'Cancelled'
     
+    # Statuses shown on the kitchen board
+    KITCHEN_STATUSES = (OrderStatus.CONFIRMED, OrderStatus.PREPARING, OrderStatus.READY)
+    
+    # Allowed status changes: current status -> statuses it may move to
+    TRANSITIONS = {
+        OrderStatus.PENDING: (OrderStatus.CONFIRMED, OrderStatus.CANCELLED),
+        OrderStatus.CONFIRMED: (OrderStatus.PREPARING, OrderStatus.CANCELLED),
+        OrderStatus.PREPARING: (OrderStatus.READY, OrderStatus.CANCELLED),
+        OrderStatus.READY: (OrderStatus.SERVED,),
+        OrderStatus.SERVED: (OrderStatus.COMPLETED,),
+        OrderStatus.COMPLETED: (),
+        OrderStatus.CANCELLED: (),
+    }
+    
     customer = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -104,6 +154,17 @@ class Order(models.Model):
         default='cod'
     )
     special_instructions = models.TextField(blank=True)
+    # What was ordered, written at checkout so listings need no item queries
+    line_summary = models.TextField(blank=True)
+    # Kitchen staff member who took the ticket
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_orders'
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -111,21 +172,81 @@ class Order(models.Model):
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        constraints = [
+            # A customer has at most one cart (PENDING order) at a time
+            models.UniqueConstraint(
+                fields=['customer'],
+                condition=Q(status='PENDING'),
+                name='unique_pending_order_per_customer',
+            ),
+        ]
+        indexes = [
+            # A customer's cart and orders by status
+            models.Index(fields=['customer', 'status'], name='order_customer_status_idx'),
+            # Kitchen board and dashboard filters by status, newest first
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Keyset pages of a customer's order history
+            models.Index(fields=['customer', 'created_at', 'id'], name='order_customer_created_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.customer.username} - ₹{self.total_amount}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so post_save receivers can tell what changed
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_total = instance.__dict__.get('total_amount')
+        return instance
+    
+    def can_transition_to(self, status):
+        """Whether the order may move from its current status to status"""
+        return status in self.TRANSITIONS.get(self.status, ())
+    
+    @property
+    def status_choices(self):
+        """The current status followed by the statuses it may move to"""
+        allowed = {self.status, *self.TRANSITIONS.get(self.status, ())}
+        return [(value, label) for value, label in self.OrderStatus.choices if value in allowed]
+    
+    def save(self, *args, **kwargs):
+        # post_save receivers maintain derived data; keep them in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_status = self.status
+        self._loaded_total = self.total_amount
+    
     def calculate_total(self):
-        """Calculate total amount from order items"""
-        total = sum(item.subtotal for item in self.items.all())
+        """
+        Recalculate total amount and line summary from order items.
+
+        Checkout writes the total along with the items, so this is only
+        needed after editing items behind its back (e.g. in the admin). The
+        sum runs in SQL and only the derived fields are written.
+        """
+        total = self.items.aggregate(total=Sum(LINE_TOTAL))['total'] or Decimal('0.00')
         self.total_amount = total
-        self.save()
+        self.line_summary = line_summary(self.items.order_by('id').values_list('menu_item__name', 'quantity'))
+        self.save(update_fields=['total_amount', 'line_summary', 'updated_at'])
         return total
 
 
 class OrderItem(models.Model):
     """Individual items in an order"""
     
+    class ItemStatus(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        PREPARING = 'PREPARING', 'Preparing'
+        READY = 'READY', 'Ready'
+    
+    # Allowed status changes: current status -> statuses it may move to
+    TRANSITIONS = {
+        ItemStatus.QUEUED: (ItemStatus.PREPARING, ItemStatus.READY),
+        ItemStatus.PREPARING: (ItemStatus.READY,),
+        ItemStatus.READY: (),
+    }
+    
     order = models.ForeignKey(
         Order,
         on_delete=models.CASCADE,
@@ -138,10 +259,31 @@ class OrderItem(models.Model):
     )
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(
+        max_length=20,
+        choices=ItemStatus.choices,
+        default=ItemStatus.QUEUED
+    )
+    # Cook who took the item at its station
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='claimed_order_items'
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         verbose_name = 'Order Item'
         verbose_name_plural = 'Order Items'
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'menu_item'], name='unique_order_menu_item'),
+        ]
+        indexes = [
+            # Station queues scan the items still to be made
+            models.Index(fields=['status', 'order'], name='order_item_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.quantity}x {self.menu_item.name}"
@@ -150,3 +292,97 @@ class OrderItem(models.Model):
     def subtotal(self):
         """Calculate subtotal for this item"""
         return self.quantity * self.price
+
+
+class OrderStatusEvent(models.Model):
+    """Append-only record of every order status change"""
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='status_events'
+    )
+    from_status = models.CharField(
+        max_length=20,
+        choices=Order.OrderStatus.choices,
+        blank=True
+    )
+    to_status = models.CharField(
+        max_length=20,
+        choices=Order.OrderStatus.choices
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='order_status_events'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Order Status Event'
+        verbose_name_plural = 'Order Status Events'
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Time-range scans for analytics
+            models.Index(fields=['created_at', 'to_status'], name='status_event_created_idx'),
+            # An order's history, oldest first
+            models.Index(fields=['order', 'created_at'], name='status_event_order_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class OrderEvent(models.Model):
+    """
+    Numbered log of order changes that live screens follow by id.
+
+    Rows are appended once the change has committed, so ids follow commit
+    order. The order is kept as a plain id: a removal stays in the log
+    after the order itself is gone.
+    """
+    
+    class Kind(models.TextChoices):
+        ORDER_CREATED = 'order_created', 'Order created'
+        STATUS_CHANGED = 'status_changed', 'Status changed'
+        ORDER_UPDATED = 'order_updated', 'Order updated'
+        ORDER_REMOVED = 'order_removed', 'Order removed'
+    
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    order_id = models.BigIntegerField()
+    status = models.CharField(max_length=20, choices=Order.OrderStatus.choices)
+    previous_status = models.CharField(
+        max_length=20,
+        choices=Order.OrderStatus.choices,
+        blank=True
+    )
+    table_id = models.BigIntegerField(null=True, blank=True)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Order Event'
+        verbose_name_plural = 'Order Events'
+        ordering = ['id']
+        indexes = [
+            # Pruning expired events
+            models.Index(fields=['created_at'], name='order_event_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} {self.kind}: order #{self.order_id}"
+    
+    def as_event(self):
+        """JSON-ready form sent to live screens"""
+        return {
+            'id': self.id,
+            'type': self.kind,
+            'order_id': self.order_id,
+            'status': self.status,
+            'previous_status': self.previous_status or None,
+            'table_id': self.table_id,
+            'total': str(self.total),
+            'at': self.created_at.isoformat(),
+        }
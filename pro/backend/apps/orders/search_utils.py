@@ -0,0 +1,247 @@
+"""
+In-memory menu search for DineAt
+
+An inverted index over menu item name, category and description. Queries
+are tokenized, every token may match as a prefix, and results are ranked
+by where the match happened. A sorted array of dish names backs the
+type-ahead suggestions. The index follows the catalog snapshot and only
+re-tokenizes the items that changed between catalog versions.
+
+A published index is never modified: a catalog change is applied to a
+copy, which then replaces the shared index in one assignment. Readers
+need no lock, and a search that is already running keeps the index it
+started with.
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from .catalog_utils import get_catalog
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'category': 2.0,
+    'diet': 1.5,
+    'description': 1.0,
+}
+
+# A prefix hit is worth less than matching the whole word
+PREFIX_FACTOR = 0.6
+
+INDEXED_KEYS = ('name', 'description', 'category', 'category_label', 'is_vegetarian', 'is_vegan')
+
+
+def tokenize(text):
+    """Lowercase word tokens of a piece of text"""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class MenuSearchIndex:
+    """Inverted index of menu items keyed by token"""
+
+    def __init__(self):
+        self.version = None
+        self.items = {}
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.suggestions = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def copy(self):
+        """An independent copy that can be synced while this one is read"""
+        index = MenuSearchIndex()
+        index.version = self.version
+        index.items = dict(self.items)
+        index.postings = defaultdict(dict, {token: dict(posting) for token, posting in self.postings.items()})
+        index.terms = list(self.terms)
+        index.suggestions = list(self.suggestions)
+        return index
+
+    def _fields(self, item):
+        diet = []
+        if item['is_vegetarian']:
+            diet += ['veg', 'vegetarian']
+        if item['is_vegan']:
+            diet.append('vegan')
+        return {
+            'name': tokenize(item['name']),
+            'category': tokenize(item['category_label']) + tokenize(item['category']),
+            'diet': diet,
+            'description': tokenize(item['description']),
+        }
+
+    def _suggestion_keys(self, item):
+        """Sorted-array entries for a dish name, one per word start"""
+        words = tokenize(item['name'])
+        return [(' '.join(words[start:]), start, item['name'], item['id']) for start in range(len(words))]
+
+    def add(self, item):
+        """Index an item, replacing any previous version of it"""
+        self.remove(item['id'])
+        self.items[item['id']] = item
+
+        for key in self._suggestion_keys(item):
+            insort(self.suggestions, key)
+
+        weights = {}
+        for field, tokens in self._fields(item).items():
+            for token in tokens:
+                weights[token] = max(weights.get(token, 0), FIELD_WEIGHTS[field])
+
+        for token, weight in weights.items():
+            if token not in self.postings:
+                insort(self.terms, token)
+            self.postings[token][item['id']] = weight
+
+    def remove(self, item_id):
+        """Drop an item from the index"""
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+
+        for key in self._suggestion_keys(item):
+            position = bisect_left(self.suggestions, key)
+            if position < len(self.suggestions) and self.suggestions[position] == key:
+                del self.suggestions[position]
+
+        for tokens in self._fields(item).values():
+            for token in tokens:
+                posting = self.postings.get(token)
+                if posting is None:
+                    continue
+                posting.pop(item_id, None)
+                if not posting:
+                    del self.postings[token]
+                    del self.terms[bisect_left(self.terms, token)]
+
+    def sync(self, version, items):
+        """Bring the index up to date, re-indexing only changed items"""
+        current = {item['id']: item for item in items}
+
+        for item_id in list(self.items):
+            if item_id not in current:
+                self.remove(item_id)
+
+        for item_id, item in current.items():
+            indexed = self.items.get(item_id)
+            if indexed is None or any(indexed[key] != item[key] for key in INDEXED_KEYS):
+                self.add(item)
+            else:
+                self.items[item_id] = item
+
+        self.version = version
+
+    def _expand(self, token):
+        """Index terms matching a query token, exactly or as a prefix"""
+        position = bisect_left(self.terms, token)
+        while position < len(self.terms) and self.terms[position].startswith(token):
+            term = self.terms[position]
+            yield term, (1.0 if term == token else PREFIX_FACTOR)
+            position += 1
+
+    def search(self, query='', category='', vegetarian=False, vegan=False, limit=None):
+        """
+        Find menu items matching every token of the query.
+
+        Args:
+            query (str): Free text, each word may be a prefix
+            category (str): Restrict to a MenuItem.DishType value
+            vegetarian (bool): Only vegetarian dishes
+            vegan (bool): Only vegan dishes
+            limit (int): Maximum number of results
+
+        Returns:
+            list: item dicts, best match first
+        """
+        tokens = tokenize(query)
+
+        if tokens:
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term, factor in self._expand(token):
+                    for item_id, weight in self.postings[term].items():
+                        score = weight * factor
+                        if score > token_scores.get(item_id, 0):
+                            token_scores[item_id] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {item_id: scores[item_id] + score
+                              for item_id, score in token_scores.items() if item_id in scores}
+                if not scores:
+                    return []
+            candidates = scores
+        else:
+            candidates = dict.fromkeys(self.items, 0)
+
+        results = []
+        for item_id, score in candidates.items():
+            item = self.items[item_id]
+            if category and item['category'] != category:
+                continue
+            if vegetarian and not item['is_vegetarian']:
+                continue
+            if vegan and not item['is_vegan']:
+                continue
+            results.append((score, item))
+
+        if tokens:
+            results.sort(key=lambda result: (-result[0], result[1]['name']))
+        else:
+            results.sort(key=lambda result: (result[1]['category'], result[1]['name']))
+
+        results = [item for _, item in results]
+        return results[:limit] if limit else results
+
+    def suggest(self, prefix, limit=8):
+        """
+        Dish names starting with the prefix, or with a word starting with it.
+
+        Names matching from their first word come first, then alphabetical.
+
+        Returns:
+            list: up to limit item dicts
+        """
+        prefix = ' '.join(tokenize(prefix))
+        if not prefix:
+            return []
+
+        matches = {}
+        position = bisect_left(self.suggestions, (prefix,))
+        while position < len(self.suggestions):
+            key, word_position, name, item_id = self.suggestions[position]
+            if not key.startswith(prefix):
+                break
+            if item_id not in matches or word_position < matches[item_id][0]:
+                matches[item_id] = (word_position, name)
+            position += 1
+
+        ranked = sorted(matches.items(), key=lambda match: match[1])
+        return [self.items[item_id] for item_id, _ in ranked[:limit]]
+
+
+_index = MenuSearchIndex()
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Return the search index, synced with the current catalog"""
+    global _index
+
+    catalog = get_catalog()
+    index = _index
+    if index.version != catalog.version:
+        with _index_lock:
+            if _index.version != catalog.version:
+                updated = _index.copy()
+                updated.sync(catalog.version, catalog.items)
+                _index = updated
+            index = _index
+    return index
@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .catalog_utils import invalidate_catalog
+from .event_utils import (
+    ORDER_CREATED, ORDER_REMOVED, ORDER_UPDATED, STATUS_CHANGED, publish_order_event, publish_order_events,
+)
+from .models import MenuItem, Order, OrderStatusEvent
+
+# Sent once per batch by status_utils in place of the per-order signals,
+# so receivers can keep their derived data in step with bulk writes:
+# orders_moved after transition_orders moved orders (orders, from_status,
+# to_status, actor), orders_deleting before delete_orders deletes them
+# (orders, while their items still exist).
+orders_moved = Signal()
+orders_deleting = Signal()
+
+
+def announced(origin):
+    """Whether a deletion was already announced with orders_deleting"""
+    return getattr(origin, 'announced', False)
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def menu_item_changed(sender, instance, **kwargs):
+    """Invalidate the catalog snapshot whenever a menu item changes"""
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    """
+    Publish kitchen events when an order leaves the cart, changes status
+    or is otherwise edited (e.g. its items, total or notes in the admin).
+    """
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if instance.status == Order.OrderStatus.PENDING:
+        return
+    if previous_status in (None, Order.OrderStatus.PENDING):
+        publish_order_event(ORDER_CREATED, instance, previous_status)
+    elif instance.status == previous_status:
+        publish_order_event(ORDER_UPDATED, instance, previous_status)
+    else:
+        publish_order_event(STATUS_CHANGED, instance, previous_status)
+
+
+@receiver(post_save, sender=Order)
+def record_status_event(sender, instance, created, **kwargs):
+    """
+    Log status changes in the same transaction as the order write.
+
+    Whoever changes the status sets order._changed_by to record the actor.
+    New carts are not logged; their history starts when they are placed.
+    """
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    if instance.status == previous_status or (created and instance.status == Order.OrderStatus.PENDING):
+        return
+    OrderStatusEvent.objects.create(
+        order=instance,
+        from_status=previous_status or '',
+        to_status=instance.status,
+        actor=getattr(instance, '_changed_by', None),
+        created_at=instance.updated_at,
+    )
+
+
+@receiver(orders_moved)
+def orders_moved_logged(sender, orders, from_status, to_status, actor=None, **kwargs):
+    """Publish kitchen events and log the status change of a batch of orders"""
+    kind = ORDER_CREATED if from_status == Order.OrderStatus.PENDING else STATUS_CHANGED
+    publish_order_events(kind, [(order, from_status) for order in orders])
+    OrderStatusEvent.objects.bulk_create([
+        OrderStatusEvent(order=order, from_status=from_status, to_status=to_status, actor=actor, created_at=order.updated_at)
+        for order in orders
+    ])
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, origin=None, **kwargs):
+    """Tell the kitchen and the admin dashboard when a placed order disappears"""
+    if instance.status != Order.OrderStatus.PENDING and not announced(origin):
+        publish_order_event(ORDER_REMOVED, instance, instance.status)
+
+
+@receiver(orders_deleting)
+def orders_deleted(sender, orders, **kwargs):
+    """Tell the kitchen and the admin dashboard about a batch of deleted orders"""
+    publish_order_events(ORDER_REMOVED, [
+        (order, order.status) for order in orders if order.status != Order.OrderStatus.PENDING
+    ])
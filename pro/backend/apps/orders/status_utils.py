@@ -0,0 +1,236 @@
+"""
+Order status changes for DineAt
+
+Status moves follow Order.TRANSITIONS and are written as conditional
+updates (UPDATE ... WHERE status = <expected>), so when two members of
+staff act on the same order at once exactly one of them wins and the
+other is told the order had already moved. The moved orders are then
+announced with one orders_moved signal for the batch, and delete_orders
+announces deletions with orders_deleting, so events, counters and
+rollups are kept in step with a fixed number of queries however many
+orders move.
+
+Items carry their own status for the kitchen stations, moved the same
+way; the order follows its items (PREPARING once one is started, READY
+once all are ready).
+
+Cooks take work with claim_next_order / claim_next: the oldest unclaimed
+ticket is locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent
+claims each get a different ticket without waiting on one another.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem
+from .signals import orders_deleting, orders_moved
+
+
+class InvalidTransition(ValueError):
+    """The requested status change is not allowed"""
+
+
+class StatusConflict(Exception):
+    """The order was no longer in the expected status"""
+
+    def __init__(self, message, current_status=None):
+        super().__init__(message)
+        self.current_status = current_status
+
+
+def check_transition(from_status, to_status):
+    """
+    Raises:
+        InvalidTransition: if from_status may not move to to_status
+    """
+    if from_status not in Order.TRANSITIONS or to_status not in Order.OrderStatus.values:
+        raise InvalidTransition('Unknown order status.')
+    if to_status not in Order.TRANSITIONS[from_status]:
+        raise InvalidTransition(
+            f'An order cannot go from {Order.OrderStatus(from_status).label} to {Order.OrderStatus(to_status).label}.'
+        )
+
+
+def transition_orders(orders, from_status, to_status, actor=None):
+    """
+    Move every order of a queryset that is still in from_status to to_status.
+
+    Orders that another request moved in the meantime are left alone.
+
+    Args:
+        orders (QuerySet): Candidate orders
+        from_status (str): Status the orders are expected to be in
+        to_status (str): Target status
+        actor (CustomUser): Who made the change, for the status log
+
+    Returns:
+        list: the orders that were moved
+
+    Raises:
+        InvalidTransition: if the change is not allowed
+    """
+    check_transition(from_status, to_status)
+
+    order_ids = list(orders.filter(status=from_status).values_list('id', flat=True))
+    if not order_ids:
+        return []
+
+    # The stamp tells our rows apart from ones moved concurrently
+    stamp = timezone.now()
+    with transaction.atomic():
+        Order.objects.filter(pk__in=order_ids, status=from_status).update(status=to_status, updated_at=stamp)
+        moved = list(Order.objects.filter(pk__in=order_ids, status=to_status, updated_at=stamp))
+        if moved:
+            orders_moved.send(sender=Order, orders=moved, from_status=from_status, to_status=to_status, actor=actor)
+
+    return moved
+
+
+def delete_orders(orders):
+    """
+    Delete every order of a queryset.
+
+    Receivers of orders_deleting take the whole batch out of their derived
+    data while the items still exist; the per-order delete signals that
+    follow skip orders announced that way.
+
+    Returns:
+        int: number of orders deleted
+    """
+    with transaction.atomic():
+        doomed = list(orders)
+        if not doomed:
+            return 0
+        orders_deleting.send(sender=Order, orders=doomed)
+
+        batch = Order.objects.filter(pk__in=[order.pk for order in doomed])
+        batch.announced = True
+        return batch.delete()[1].get(Order._meta.label, 0)
+
+
+def transition_order(order_id, from_status, to_status, actor=None):
+    """
+    Move one order from from_status to to_status.
+
+    Returns:
+        Order: the moved order
+
+    Raises:
+        InvalidTransition: if the change is not allowed
+        StatusConflict: if the order is not in from_status any more
+    """
+    moved = transition_orders(Order.objects.filter(pk=order_id), from_status, to_status, actor)
+    if not moved:
+        current_status = Order.objects.filter(pk=order_id).values_list('status', flat=True).first()
+        raise StatusConflict('The order was updated by someone else.', current_status)
+    return moved[0]
+
+
+def transition_item(item_id, from_status, to_status, actor=None):
+    """
+    Move one item of an order in the kitchen, then roll its order up.
+
+    Returns:
+        OrderItem: the moved item, with its order's resulting status
+
+    Raises:
+        InvalidTransition: if the change is not allowed
+        StatusConflict: if the item is not in from_status any more, or its
+            order left the kitchen
+    """
+    if from_status not in OrderItem.TRANSITIONS or to_status not in OrderItem.ItemStatus.values:
+        raise InvalidTransition('Unknown item status.')
+    if to_status not in OrderItem.TRANSITIONS[from_status]:
+        raise InvalidTransition(
+            f'An item cannot go from {OrderItem.ItemStatus(from_status).label} '
+            f'to {OrderItem.ItemStatus(to_status).label}.'
+        )
+
+    with transaction.atomic():
+        updated = OrderItem.objects.filter(
+            pk=item_id,
+            status=from_status,
+            order__status__in=(Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING),
+        ).update(status=to_status)
+        item = OrderItem.objects.select_related('order').filter(pk=item_id).first()
+        if not updated:
+            raise StatusConflict(
+                'The item was updated by someone else.',
+                item.status if item else None,
+            )
+        item.order.status = roll_up_order(item.order_id, actor)
+
+    return item
+
+
+def roll_up_order(order_id, actor=None):
+    """
+    Bring an order's status in line with its items.
+
+    Returns:
+        str: the order status afterwards
+    """
+    statuses = set(OrderItem.objects.filter(order_id=order_id).values_list('status', flat=True))
+    orders = Order.objects.filter(pk=order_id)
+
+    if statuses - {OrderItem.ItemStatus.QUEUED}:
+        transition_orders(orders, Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING, actor)
+    if statuses == {OrderItem.ItemStatus.READY}:
+        transition_orders(orders, Order.OrderStatus.PREPARING, Order.OrderStatus.READY, actor)
+
+    return orders.values_list('status', flat=True).first()
+
+
+def claim_next(candidates, user):
+    """
+    Give the first unclaimed row of candidates to user.
+
+    Args:
+        candidates (QuerySet): Orders or order items, in claiming order
+        user (CustomUser): The claiming cook
+
+    Returns:
+        int: primary key of the claimed row, None when nothing is left
+    """
+    model = candidates.model
+    candidates = candidates.filter(claimed_by__isnull=True)
+
+    if connection.features.has_select_for_update_skip_locked:
+        # Rows other cooks are claiming right now are skipped, not waited on
+        with transaction.atomic():
+            locked = candidates.select_for_update(
+                skip_locked=True,
+                of=('self',) if connection.features.has_select_for_update_of else (),
+            )
+            pk = locked.values_list('pk', flat=True).first()
+            if pk is not None:
+                model.objects.filter(pk=pk).update(claimed_by=user, claimed_at=timezone.now())
+            return pk
+
+    # No row locks (SQLite): claim with a compare-and-set, moving on to the
+    # next row when another cook got there first
+    while True:
+        pk = candidates.values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        if model.objects.filter(pk=pk, claimed_by__isnull=True).update(claimed_by=user, claimed_at=timezone.now()):
+            return pk
+
+
+def claim_next_order(user):
+    """
+    Give the oldest waiting ticket to user and start preparing it.
+
+    Returns:
+        Order: the claimed order, None when no ticket is waiting
+    """
+    waiting = Order.objects.filter(status=Order.OrderStatus.CONFIRMED).order_by('id')
+    while True:
+        order_id = claim_next(waiting, user)
+        if order_id is None:
+            return None
+        # An order cancelled since it was claimed is skipped
+        moved = transition_orders(
+            Order.objects.filter(pk=order_id), Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING, user
+        )
+        if moved:
+            return moved[0]
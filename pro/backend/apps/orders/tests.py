@@ -0,0 +1,670 @@
+import json
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import CustomUser
+from .cart_utils import SessionCart, get_cart_order
+from .catalog_utils import CATALOG_VERSION_CACHE_KEY, get_catalog
+from .models import MenuItem, Order, OrderItem, OrderStatusEvent
+from .search_utils import MenuSearchIndex, get_search_index
+from .status_utils import transition_order
+
+
+def cart_payload(menu_items, quantity=2, version=None):
+    return json.dumps({
+        'v': version or get_catalog(refresh=True).version,
+        'items': [[item.id, quantity] for item in menu_items],
+    })
+
+
+def make_customer(client=None, username='diner'):
+    """A customer, logged in on client when one is given"""
+    user = CustomUser.objects.create_user(username=username, password='secret123')
+    if client is not None:
+        client.force_login(user)
+    return user
+
+
+def make_menu_items(count, prefix='Dish'):
+    return MenuItem.objects.bulk_create([
+        MenuItem(name=f'{prefix} {i}', description=f'{prefix} {i}', price=Decimal('100.00') + i)
+        for i in range(count)
+    ])
+
+
+class CheckoutReconciliationTests(TestCase):
+    """Checkout resolves the posted cart with a fixed number of queries"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        self.menu_items = make_menu_items(20)
+
+    def checkout_queries(self, url_name, count):
+        Order.objects.filter(customer=self.user).delete()
+        Order.objects.create(customer=self.user)
+        payload = cart_payload(self.menu_items[:count])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse(url_name), {
+                'cart_data': payload,
+                'payment_method': 'upi',
+            })
+
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        # The first checkout also creates the day's dashboard counter rows
+        self.checkout_queries('orders:process_payment', 1)
+        for url_name in ('orders:process_payment', 'orders:order_confirmation'):
+            small = self.checkout_queries(url_name, 2)
+            large = self.checkout_queries(url_name, 20)
+            self.assertEqual(small, large, url_name)
+
+    def test_checkout_confirms_order_with_sql_total(self):
+        order = Order.objects.create(customer=self.user)
+        self.client.post(reverse('orders:process_payment'), {
+            'cart_data': cart_payload(self.menu_items[:3]),
+            'payment_method': 'card',
+        })
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.CONFIRMED)
+        self.assertEqual(order.payment_method, 'card')
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(order.total_amount, Decimal('606.00'))
+
+    def test_duplicate_lines_merge_into_one_item(self):
+        order = Order.objects.create(customer=self.user)
+        item = self.menu_items[0]
+        payload = json.dumps({
+            'v': get_catalog(refresh=True).version,
+            'items': [[item.id, 1], [item.id, 2]],
+        })
+        self.client.post(reverse('orders:process_payment'), {'cart_data': payload})
+
+        self.assertEqual(list(order.items.values_list('quantity', 'price')), [(3, item.price)])
+
+
+class CartWireProtocolTests(TestCase):
+    """Carts carry menu item ids and are priced by the server"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        self.menu_items = make_menu_items(3)
+        self.order = Order.objects.create(customer=self.user)
+
+    def post_cart(self, payload):
+        return self.client.post(reverse('orders:process_payment'), {'cart_data': payload})
+
+    def test_stale_catalog_version_is_rejected(self):
+        payload = cart_payload(self.menu_items, version='0-stale')
+        response = self.post_cart(payload)
+
+        self.assertRedirects(response, reverse('orders:menu'), fetch_redirect_response=False)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.PENDING)
+
+    def test_menu_change_invalidates_catalog_version(self):
+        payload = cart_payload(self.menu_items)
+        MenuItem.objects.create(name='New Dish', description='New', price=Decimal('50.00'))
+
+        self.post_cart(payload)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.OrderStatus.PENDING)
+
+    def test_unknown_item_is_rejected_without_creating_menu_items(self):
+        payload = json.dumps({'v': get_catalog(refresh=True).version, 'items': [[999999, 1]]})
+        self.post_cart(payload)
+
+        self.assertEqual(MenuItem.objects.count(), 3)
+        self.assertFalse(self.order.items.exists())
+
+    def test_legacy_name_based_cart_is_rejected(self):
+        payload = json.dumps([{'name': 'Free Lunch', 'price': '0.01', 'quantity': 1}])
+        self.post_cart(payload)
+
+        self.assertFalse(MenuItem.objects.filter(name='Free Lunch').exists())
+
+    def test_payment_amount_comes_from_catalog(self):
+        response = self.client.post(reverse('orders:payment'), {
+            'cart_data': cart_payload(self.menu_items[:1], quantity=3),
+            'total_amount': '1.00',
+        })
+
+        self.assertEqual(response.context['total_amount'], '300.00')
+
+
+class MenuCatalogTests(TestCase):
+    """The menu page renders from the cached catalog snapshot"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        self.dish = MenuItem.objects.create(name='Masala Dosa', description='Crisp rice crepe', price=Decimal('120.00'))
+
+    def test_menu_renders_available_items(self):
+        MenuItem.objects.create(name='Sold Out Soup', description='Gone', price=Decimal('90.00'), is_available=False)
+        response = self.client.get(reverse('orders:menu'))
+
+        self.assertContains(response, 'Masala Dosa')
+        self.assertContains(response, f'id: {self.dish.id}')
+        self.assertNotContains(response, 'Sold Out Soup')
+
+    def test_repeat_visit_gets_not_modified(self):
+        response = self.client.get(reverse('orders:menu'))
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(reverse('orders:menu'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_menu_change_produces_new_etag(self):
+        etag = self.client.get(reverse('orders:menu'))['ETag']
+        self.dish.price = Decimal('130.00')
+        self.dish.save()
+
+        response = self.client.get(reverse('orders:menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '130.00')
+
+    def test_menu_changes_from_other_workers_expire_and_never_reach_checkout(self):
+        cart = SessionCart({})
+        cart.add(self.dish.id)
+        self.client.get(reverse('orders:menu'))
+        # Another worker saves the dish: nothing tells this process's cache
+        MenuItem.objects.filter(pk=self.dish.pk).update(price=Decimal('150.00'), updated_at=timezone.now())
+
+        self.assertEqual(cart.lines(), [(self.dish.id, 1, Decimal('120.00'))])
+        self.assertEqual(cart.lines(refresh=True), [(self.dish.id, 1, Decimal('150.00'))])
+
+        MenuItem.objects.filter(pk=self.dish.pk).update(price=Decimal('160.00'), updated_at=timezone.now())
+        # The cached version outlives CATALOG_VERSION_TTL
+        cache.delete(CATALOG_VERSION_CACHE_KEY)
+        self.assertContains(self.client.get(reverse('orders:menu')), '160.00')
+
+    def test_searches_bypass_the_menu_fragment_cache(self):
+        cache.clear()
+        key = make_template_fragment_key('menu_grid', [get_catalog().version, '', False, False])
+
+        response = self.client.get(reverse('orders:menu'), {'search': 'dosa'})
+        self.assertContains(response, 'Masala Dosa')
+        self.assertIsNone(cache.get(key))
+
+        self.client.get(reverse('orders:menu'))
+        self.assertIsNotNone(cache.get(key))
+
+    def test_warm_catalog_needs_no_menu_queries(self):
+        self.client.get(reverse('orders:menu'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('orders:menu'))
+
+        self.assertFalse([q for q in queries if 'orders_menuitem' in q['sql']])
+
+
+class MenuSearchIndexTests(TestCase):
+    """Menu search runs against the in-memory inverted index"""
+
+    def setUp(self):
+        self.paneer = MenuItem.objects.create(
+            name='Paneer Tikka', description='Grilled cottage cheese', price=Decimal('180.00'),
+            category=MenuItem.DishType.APPETIZER, is_vegetarian=True,
+        )
+        self.butter = MenuItem.objects.create(
+            name='Butter Chicken', description='Chicken in a paneer-free tomato gravy', price=Decimal('320.00'),
+        )
+        self.salad = MenuItem.objects.create(
+            name='Green Salad', description='Fresh greens', price=Decimal('90.00'),
+            is_vegetarian=True, is_vegan=True,
+        )
+
+    def search(self, *args, **kwargs):
+        return [item['name'] for item in get_search_index().search(*args, **kwargs)]
+
+    def test_prefix_match_ranks_name_above_description(self):
+        self.assertEqual(self.search('pan'), ['Paneer Tikka', 'Butter Chicken'])
+
+    def test_every_token_must_match(self):
+        self.assertEqual(self.search('butter chick'), ['Butter Chicken'])
+        self.assertEqual(self.search('butter salad'), [])
+
+    def test_category_and_dietary_filters(self):
+        self.assertEqual(self.search('', category=MenuItem.DishType.APPETIZER), ['Paneer Tikka'])
+        self.assertEqual(self.search('', vegetarian=True), ['Paneer Tikka', 'Green Salad'])
+        self.assertEqual(self.search('', vegan=True), ['Green Salad'])
+        self.assertEqual(self.search('appetizer'), ['Paneer Tikka'])
+
+    def test_search_does_not_touch_the_database(self):
+        get_search_index()
+        with self.assertNumQueries(0):
+            get_search_index().search('paneer')
+
+    def test_changes_are_indexed_incrementally(self):
+        get_search_index()
+        self.salad.name = 'Garden Bowl'
+        self.salad.save()
+        self.butter.delete()
+
+        with mock.patch.object(MenuSearchIndex, 'add', autospec=True, side_effect=MenuSearchIndex.add) as add:
+            self.assertEqual(self.search('garden'), ['Garden Bowl'])
+        self.assertEqual(add.call_count, 1)
+        self.assertEqual(self.search('chicken'), [])
+
+    def test_readers_keep_the_index_they_started_with(self):
+        index = get_search_index()
+        self.salad.name = 'Garden Bowl'
+        self.salad.save()
+
+        self.assertIsNot(get_search_index(), index)
+        self.assertEqual([item['name'] for item in index.search('salad')], ['Green Salad'])
+        self.assertEqual(self.search('salad'), [])
+
+    def test_menu_view_uses_index(self):
+        make_customer(self.client)
+        response = self.client.get(reverse('orders:menu'), {'search': 'tikk', 'veg': '1'})
+
+        self.assertEqual([item['name'] for item in response.context['menu_items']], ['Paneer Tikka'])
+
+
+class MenuAutocompleteTests(TestCase):
+    """Type-ahead suggestions come from the sorted name array"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        for name in ('Butter Chicken', 'Butter Naan', 'Chicken Biryani', 'Chilli Paneer'):
+            MenuItem.objects.create(name=name, description=name, price=Decimal('100.00'))
+
+    def suggest(self, query):
+        response = self.client.get(reverse('orders:menu_autocomplete'), {'q': query})
+        return [item['name'] for item in response.json()['suggestions']]
+
+    def test_leading_matches_rank_before_word_matches(self):
+        self.assertEqual(self.suggest('chi'), ['Chicken Biryani', 'Chilli Paneer', 'Butter Chicken'])
+        self.assertEqual(self.suggest('butter n'), ['Butter Naan'])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_suggestions_follow_menu_changes(self):
+        self.suggest('chi')
+        MenuItem.objects.filter(name='Chilli Paneer').get().delete()
+        self.assertEqual(self.suggest('chi'), ['Chicken Biryani', 'Butter Chicken'])
+
+    def test_no_menu_queries_per_request(self):
+        self.suggest('but')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.suggest('but')
+
+        self.assertFalse([q for q in queries if 'orders_menuitem' in q['sql']])
+
+    def test_p99_latency_under_five_ms(self):
+        index = MenuSearchIndex()
+        words = ['paneer', 'butter', 'masala', 'chicken', 'tikka', 'naan', 'dal', 'mango', 'lassi', 'dosa']
+        index.sync('bench', [
+            {
+                'id': i, 'name': f'{words[i % 10]} {words[(i // 10) % 10]} {i}', 'description': '',
+                'category': 'MAIN_COURSE', 'category_label': 'Main Course',
+                'is_vegetarian': False, 'is_vegan': False,
+            }
+            for i in range(5000)
+        ])
+
+        timings = []
+        for prefix in ['p', 'bu', 'chi', 'mas', 'dosa m', 'x'] * 50:
+            started = time.perf_counter()
+            index.suggest(prefix)
+            timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        self.assertLess(timings[int(len(timings) * 0.99)], 0.005)
+
+
+class SessionCartTests(TestCase):
+    """Browsing and editing the cart stays out of the orders tables"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        self.menu_items = make_menu_items(3)
+        get_catalog(refresh=True)
+
+    def test_cart_edits_write_no_orders(self):
+        dish = self.menu_items[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('orders:add_to_cart', args=[dish.id]))
+            self.client.get(reverse('orders:add_to_cart', args=[dish.id]))
+            self.client.post(reverse('orders:update_cart_item', args=[dish.id]), {'quantity': 5})
+            self.client.get(reverse('orders:cart'))
+            self.client.get(reverse('main:payment'))
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse([q for q in queries if 'orders_' in q['sql']])
+        self.assertEqual(self.client.session['cart']['items'], {str(dish.id): 5})
+
+    def test_unavailable_dish_cannot_be_added(self):
+        response = self.client.get(reverse('orders:add_to_cart', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_checkout_materialises_session_cart(self):
+        for dish in self.menu_items[:2]:
+            self.client.get(reverse('orders:add_to_cart', args=[dish.id]))
+        self.client.get(reverse('orders:remove_from_cart', args=[self.menu_items[1].id]))
+
+        self.client.post(reverse('orders:process_payment'), {'payment_method': 'cod'})
+
+        order = Order.objects.get(customer=self.user)
+        self.assertEqual(order.status, Order.OrderStatus.CONFIRMED)
+        self.assertEqual(list(order.items.values_list('menu_item_id', 'quantity')), [(self.menu_items[0].id, 1)])
+        self.assertEqual(order.total_amount, Decimal('100.00'))
+        self.assertEqual(self.client.session['cart']['items'], {})
+
+    def test_empty_cart_checkout_is_refused(self):
+        response = self.client.post(reverse('orders:order_confirmation'), {'payment_method': 'cod'})
+        self.assertRedirects(response, reverse('orders:menu'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderTotalTests(TestCase):
+    """Order totals are summed in SQL and can be repaired in bulk"""
+
+    def setUp(self):
+        self.user = make_customer()
+        self.menu_items = make_menu_items(20)
+        self.order = Order.objects.create(customer=self.user)
+
+    def stored_total(self):
+        return Order.objects.values_list('total_amount', flat=True).get(pk=self.order.pk)
+
+    def add_line(self, dish, quantity=1):
+        OrderItem.objects.create(order=self.order, menu_item=dish, quantity=quantity, price=dish.price)
+
+    def test_calculate_total_sums_lines_in_sql(self):
+        self.add_line(self.menu_items[0], 2)
+        self.add_line(self.menu_items[1])
+
+        self.assertEqual(self.order.calculate_total(), Decimal('301.00'))
+        self.assertEqual(self.stored_total(), Decimal('301.00'))
+
+    def test_repair_command_recomputes_drifted_totals(self):
+        self.add_line(self.menu_items[0], 2)
+        self.order.calculate_total()
+        empty = Order.objects.create(customer=self.user, status=Order.OrderStatus.CANCELLED, total_amount=Decimal('9.00'))
+        Order.objects.filter(pk=self.order.pk).update(total_amount=Decimal('1.00'))
+
+        call_command('repair_order_totals', stdout=StringIO())
+        self.assertEqual(self.stored_total(), Decimal('1.00'))
+
+        out = StringIO()
+        call_command('repair_order_totals', '--fix', stdout=out)
+        self.assertIn('Repaired 2', out.getvalue())
+        self.assertEqual(self.stored_total(), Decimal('200.00'))
+        empty.refresh_from_db()
+        self.assertEqual(empty.total_amount, Decimal('0.00'))
+
+
+class CartOperationsTests(TestCase):
+    """Batched cart operations apply all or nothing in one request"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        self.menu_items = make_menu_items(10)
+        get_catalog(refresh=True)
+
+    def post_ops(self, ops, **extra):
+        return self.client.post(
+            reverse('orders:cart_operations'),
+            json.dumps({'ops': ops, **extra}),
+            content_type='application/json',
+        )
+
+    def test_batch_builds_cart_in_one_request(self):
+        ops = [{'op': 'add', 'id': item.id} for item in self.menu_items]
+        ops += [
+            {'op': 'add', 'id': self.menu_items[0].id, 'quantity': 2},
+            {'op': 'set', 'id': self.menu_items[1].id, 'quantity': 5},
+            {'op': 'remove', 'id': self.menu_items[2].id},
+        ]
+        response = self.post_ops(ops)
+
+        self.assertEqual(response.status_code, 200)
+        cart = response.json()['cart']
+        self.assertEqual(cart['version'], 1)
+        self.assertEqual(cart['count'], 9 + 2 + 4)
+        self.assertEqual(len(cart['items']), 9)
+        self.assertEqual(Decimal(cart['total']), sum(
+            (item.price * quantity for item, quantity in zip(self.menu_items, [3, 5, 0] + [1] * 7)), Decimal('0.00')
+        ))
+        self.assertFalse(Order.objects.exists())
+
+    def test_invalid_operation_rolls_back_whole_batch(self):
+        self.post_ops([{'op': 'add', 'id': self.menu_items[0].id}])
+        response = self.post_ops([
+            {'op': 'add', 'id': self.menu_items[1].id},
+            {'op': 'add', 'id': 999999},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['cart']['version'], 1)
+        self.assertEqual(self.client.session['cart']['items'], {str(self.menu_items[0].id): 1})
+
+    def test_stale_version_is_rejected(self):
+        self.post_ops([{'op': 'add', 'id': self.menu_items[0].id}])
+        response = self.post_ops([{'op': 'clear'}], version=0)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['cart']['count'], 1)
+
+        response = self.post_ops([{'op': 'clear'}], version=1)
+        self.assertEqual(response.json()['cart'], {'version': 2, 'count': 0, 'total': '0.00', 'items': []})
+
+    def test_malformed_body_is_rejected(self):
+        response = self.client.post(reverse('orders:cart_operations'), 'nope', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('orders:cart_operations')).status_code, 405)
+
+
+class CartSummaryQueryTests(TestCase):
+    """Checkout pages render their cart summary with a fixed query budget"""
+
+    def setUp(self):
+        self.user = make_customer(self.client)
+        self.menu_items = make_menu_items(10)
+        get_catalog(refresh=True)
+
+    def fill_cart(self, count):
+        self.client.post(
+            reverse('orders:cart_operations'),
+            json.dumps({'ops': [{'op': 'clear'}] + [
+                {'op': 'set', 'id': item.id, 'quantity': 2} for item in self.menu_items[:count]
+            ]}),
+            content_type='application/json',
+        )
+
+    def test_session_cart_pages(self):
+        for count in (1, 10):
+            self.fill_cart(count)
+            # session + user, and nothing from the orders tables
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('main:payment'))
+            self.assertEqual(response.context['summary'].count, count * 2)
+
+    def test_cart_page_is_drawn_in_the_browser(self):
+        self.fill_cart(10)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('orders:cart'))
+        self.assertNotIn('summary', response.context)
+
+    def test_order_confirmation_page(self):
+        for count in (1, 10):
+            self.fill_cart(count)
+            self.client.post(reverse('orders:order_confirmation'), {'payment_method': 'cod'})
+            # session + user + order + summary
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('orders:order_confirmation'))
+
+            summary = response.context['summary']
+            self.assertEqual(len(summary), count)
+            self.assertEqual(summary.total, response.context['order'].total_amount)
+            self.assertEqual(summary.lines[0]['name'], self.menu_items[0].name)
+
+
+class OrderStatusEventTests(TestCase):
+    """Every status change is logged with its actor in the same transaction"""
+
+    def setUp(self):
+        self.user = make_customer()
+        self.chef = CustomUser.objects.create_user(username='chef', password='secret123', role=CustomUser.UserRole.KITCHEN)
+        self.admin = CustomUser.objects.create_superuser(username='boss', password='secret123', email='boss@example.com')
+        self.menu_items = make_menu_items(3)
+
+    def history(self, order):
+        return list(order.status_events.values_list('from_status', 'to_status', 'actor__username'))
+
+    def place_order(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('orders:process_payment'), {
+            'cart_data': cart_payload(self.menu_items),
+            'payment_method': 'cod',
+        })
+        return Order.objects.get(customer=self.user)
+
+    def test_checkout_and_kitchen_changes_are_logged(self):
+        order = self.place_order()
+        transition_order(order.id, Order.OrderStatus.CONFIRMED, Order.OrderStatus.PREPARING, self.chef)
+
+        self.assertEqual(self.history(order), [
+            ('PENDING', 'CONFIRMED', 'diner'),
+            ('CONFIRMED', 'PREPARING', 'chef'),
+        ])
+        event = order.status_events.last()
+        self.assertEqual(event.created_at, Order.objects.get(pk=order.pk).updated_at)
+
+    def test_carts_and_unchanged_statuses_are_not_logged(self):
+        order = Order.objects.create(customer=self.user)
+        order.special_instructions = 'Less spicy'
+        order.save()
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+    def test_admin_list_editable_change_is_logged(self):
+        order = self.place_order()
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:orders_order_changelist'), {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': order.id,
+            'form-0-status': Order.OrderStatus.CANCELLED,
+            '_save': 'Save',
+        })
+
+        self.assertEqual(self.history(order)[-1], ('CONFIRMED', 'CANCELLED', 'boss'))
+
+    def test_backfill_logs_untracked_orders_once(self):
+        order = self.place_order()
+        OrderStatusEvent.objects.all().delete()
+        Order.objects.create(customer=self.user)
+
+        call_command('backfill_order_status_events', stdout=StringIO())
+        call_command('backfill_order_status_events', stdout=StringIO())
+
+        self.assertEqual(self.history(order), [('', 'CONFIRMED', None)])
+        self.assertEqual(OrderStatusEvent.objects.count(), 1)
+
+
+class OrderAdminStatusTests(TestCase):
+    """Status edits in the admin follow Order.TRANSITIONS"""
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(username='root', password='secret123')
+        self.customer = make_customer()
+        self.order = Order.objects.create(customer=self.customer, status=Order.OrderStatus.CONFIRMED)
+        self.client.force_login(self.admin)
+
+    def edit_status(self, status):
+        return self.client.post(reverse('admin:orders_order_changelist'), {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': str(self.order.pk),
+            'form-0-status': status,
+            '_save': 'Save',
+        })
+
+    def test_list_edit_follows_transitions(self):
+        response = self.edit_status(Order.OrderStatus.PREPARING)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.OrderStatus.PREPARING)
+        self.assertEqual(self.order.status_events.last().actor, self.admin)
+
+    def test_list_edit_rejects_illegal_moves(self):
+        Order.objects.create(customer=self.customer)
+
+        for status in (Order.OrderStatus.PENDING, Order.OrderStatus.COMPLETED):
+            response = self.edit_status(status)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.context['cl'].formset.errors[0]['status'])
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, Order.OrderStatus.CONFIRMED)
+
+    def test_added_order_cannot_clash_with_the_cart(self):
+        Order.objects.create(customer=self.customer)
+
+        response = self.client.post(reverse('admin:orders_order_add'), {
+            'customer': self.customer.pk,
+            'status': Order.OrderStatus.PENDING,
+            'payment_method': 'cod',
+            'items-TOTAL_FORMS': '0',
+            'items-INITIAL_FORMS': '0',
+            'status_events-TOTAL_FORMS': '0',
+            'status_events-INITIAL_FORMS': '0',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('already has a pending order', str(response.context['adminform'].form.errors))
+
+
+class ConcurrentCartTests(TransactionTestCase):
+    """Parallel checkouts from one customer share a single cart row"""
+
+    THREADS = 8
+
+    def setUp(self):
+        self.user = make_customer()
+
+    def fetch_cart(self, barrier, carts, errors):
+        try:
+            barrier.wait()
+            carts.append(get_cart_order(self.user).pk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_parallel_cart_creation(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Threads share an in-memory database through one locked cache
+            self.skipTest('Needs a file-backed or server test database.')
+        barrier = threading.Barrier(self.THREADS)
+        carts, errors = [], []
+        threads = [threading.Thread(target=self.fetch_cart, args=(barrier, carts, errors)) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        cart = Order.objects.get(customer=self.user, status=Order.OrderStatus.PENDING)
+        self.assertEqual(carts, [cart.pk] * self.THREADS)
+
+    def test_constraint_rejects_second_pending_order(self):
+        Order.objects.create(customer=self.user)
+        with self.assertRaises(IntegrityError):
+            Order.objects.create(customer=self.user)
@@ -5,7 +5,9 @@ app_name = 'orders'
 
 urlpatterns = [
     path('menu/', views.menu_view, name='menu'),
+    path('menu/autocomplete/', views.menu_autocomplete_view, name='menu_autocomplete'),
     path('cart/', views.cart_view, name='cart'),
+    path('cart/ops/', views.cart_operations_view, name='cart_operations'),
     path('cart/add/<int:item_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
@@ -1,88 +1,111 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
 from django.core.cache import cache
-import uuid
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
+import hashlib
 import json
-from decimal import Decimal
-from .models import MenuItem, Order, OrderItem, Table
+import logging
+import uuid
+from .models import MenuItem, Order, Table
 from .upi_utils import create_upi_payment_qr, get_upi_payment_info
+from .cart_utils import CartOperationError, SessionCart, order_summary
+from .catalog_utils import get_catalog
+from .search_utils import get_search_index
+from .checkout_utils import InvalidCartError, cart_total, checkout_order, parse_cart_data
+
+logger = logging.getLogger(__name__)
+
+
+def _menu_etag(request):
+    """ETag for the menu page, derived from the catalog version"""
+    # Pending flash messages make the page unique, so never answer 304
+    if len(messages.get_messages(request)):
+        return None
+    key = '|'.join([get_catalog().version, str(request.user.pk), request.GET.urlencode()])
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def _menu_last_modified(request):
+    """Last-Modified for the menu page: when the catalog last changed"""
+    if len(messages.get_messages(request)):
+        return None
+    return get_catalog().last_modified
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_menu_etag, last_modified_func=_menu_last_modified)
 def menu_view(request):
-    """Display menu items with filtering"""
+    """Display menu items with filtering, rendered from the catalog snapshot"""
     category = request.GET.get('category', '')
-    search = request.GET.get('search', '')
-    
-    menu_items = MenuItem.objects.filter(is_available=True)
-    
-    if category:
-        menu_items = menu_items.filter(category=category)
+    search = request.GET.get('search', '').strip()
+    vegetarian = request.GET.get('veg') == '1'
+    vegan = request.GET.get('vegan') == '1'
     
-    if search:
-        menu_items = menu_items.filter(
-            Q(name__icontains=search) | Q(description__icontains=search)
-        )
+    catalog = get_catalog()
+    menu_items = get_search_index().search(search, category=category, vegetarian=vegetarian, vegan=vegan)
     
     categories = MenuItem.DishType.choices
     
     context = {
         'menu_items': menu_items,
+        'catalog': catalog.client_catalog,
+        'catalog_version': catalog.version,
         'categories': categories,
         'selected_category': category,
         'search_query': search,
+        'vegetarian_only': vegetarian,
+        'vegan_only': vegan,
     }
     
     return render(request, 'orders/menu.html', context)
 
 
+@login_required
+@cache_control(private=True, max_age=60)
+def menu_autocomplete_view(request):
+    """Type-ahead dish suggestions served from the in-memory search index"""
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 8)), 20))
+    except ValueError:
+        limit = 8
+
+    suggestions = get_search_index().suggest(query, limit=limit)
+
+    return JsonResponse({
+        'query': query,
+        'suggestions': [
+            {'id': item['id'], 'name': item['name'], 'price': str(item['price'])}
+            for item in suggestions
+        ],
+    })
+
+
 @login_required
 def cart_view(request):
-    """Display and manage shopping cart"""
-    # Get or create pending order for current user
-    cart_order, created = Order.objects.get_or_create(
-        customer=request.user,
-        status=Order.OrderStatus.PENDING
-    )
-    
-    cart_items = cart_order.items.all()
-    
-    context = {
-        'cart_order': cart_order,
-        'cart_items': cart_items,
-    }
-    
-    return render(request, 'orders/cart.html', context)
+    """
+    Display and manage shopping cart.
+
+    The page draws its lines from the browser's cart and keeps the session
+    cart in step through cart_operations, so nothing is read here.
+    """
+    return render(request, 'orders/cart.html')
 
 
 @login_required
 def add_to_cart(request, item_id):
     """Add item to cart"""
-    menu_item = get_object_or_404(MenuItem, id=item_id, is_available=True)
+    menu_item = get_catalog().by_id.get(item_id)
+    if menu_item is None:
+        raise Http404('Menu item is not available.')
     
-    # Get or create pending order
-    cart_order, created = Order.objects.get_or_create(
-        customer=request.user,
-        status=Order.OrderStatus.PENDING
-    )
-    
-    # Check if item already in cart
-    order_item, created = OrderItem.objects.get_or_create(
-        order=cart_order,
-        menu_item=menu_item,
-        defaults={'quantity': 1, 'price': menu_item.price}
-    )
-    
-    if not created:
-        order_item.quantity += 1
-        order_item.save()
-    
-    cart_order.calculate_total()
-    messages.success(request, f'{menu_item.name} added to cart!')
+    SessionCart(request.session).add(item_id)
+    messages.success(request, f"{menu_item['name']} added to cart!")
     
     return redirect('orders:cart')
 
@@ -90,10 +113,7 @@ def add_to_cart(request, item_id):
 @login_required
 def remove_from_cart(request, item_id):
     """Remove item from cart"""
-    order_item = get_object_or_404(OrderItem, id=item_id, order__customer=request.user)
-    order = order_item.order
-    order_item.delete()
-    order.calculate_total()
+    SessionCart(request.session).remove(item_id)
     
     messages.info(request, 'Item removed from cart.')
     return redirect('orders:cart')
@@ -103,22 +123,88 @@ def remove_from_cart(request, item_id):
 def update_cart_item(request, item_id):
     """Update cart item quantity"""
     if request.method == 'POST':
-        order_item = get_object_or_404(OrderItem, id=item_id, order__customer=request.user)
+        cart = SessionCart(request.session)
+        if item_id not in cart:
+            raise Http404('Item is not in the cart.')
         quantity = int(request.POST.get('quantity', 1))
         
+        cart.update(item_id, quantity)
         if quantity > 0:
-            order_item.quantity = quantity
-            order_item.save()
-            order_item.order.calculate_total()
             messages.success(request, 'Cart updated!')
         else:
-            order_item.delete()
-            order_item.order.calculate_total()
             messages.info(request, 'Item removed from cart.')
     
     return redirect('orders:cart')
 
 
+@login_required
+@require_http_methods(["POST"])
+def cart_operations_view(request):
+    """
+    Apply a batch of cart operations in one request.
+
+    Expects {"ops": [...], "version": n}; version is optional and, when
+    given, must match the cart's current version (409 otherwise). Answers
+    with the updated cart summary.
+    """
+    try:
+        payload = json.loads(request.body)
+        operations = payload['ops']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Invalid JSON format.'}, status=400)
+
+    cart = SessionCart(request.session)
+    expected_version = payload.get('version')
+    if expected_version is not None and expected_version != cart.version:
+        return JsonResponse({'error': 'The cart was changed elsewhere.', 'cart': cart.summary().as_dict()}, status=409)
+
+    try:
+        cart.apply(operations)
+    except CartOperationError as e:
+        return JsonResponse({'error': str(e), 'cart': cart.summary().as_dict()}, status=400)
+
+    return JsonResponse({'cart': cart.summary().as_dict()})
+
+
+def _checkout_lines(request):
+    """Cart lines posted by the browser, falling back to the session cart"""
+    cart_data_raw = request.POST.get('cart_data', '')
+    if cart_data_raw:
+        return parse_cart_data(cart_data_raw)
+    return SessionCart(request.session).lines(refresh=True)
+
+
+def _place_order(request):
+    """Materialise the cart into a confirmed order, or None after flashing why not"""
+    try:
+        lines = _checkout_lines(request)
+    except InvalidCartError as e:
+        messages.error(request, f'{e} Please review your cart.')
+        return None
+
+    if not lines:
+        messages.error(request, 'Your cart is empty!')
+        return None
+
+    # Get selected table
+    table = None
+    table_id = request.session.get('selected_table_id')
+    if table_id:
+        table = get_object_or_404(Table, id=table_id)
+
+    cart_order = checkout_order(
+        request.user,
+        lines,
+        payment_method=request.POST.get('payment_method', 'cod'),
+        special_instructions=request.POST.get('special_instructions', ''),
+        table=table,
+    )
+
+    SessionCart(request.session).clear()
+    request.session['last_confirmed_order_id'] = cart_order.id
+    return cart_order
+
+
 @login_required
 def table_selection_view(request):
     """Select table for dining"""
@@ -143,88 +229,10 @@ def table_selection_view(request):
 @login_required
 def order_confirmation_view(request):
     """Confirm and place order"""
-    # Try to load the current pending order first
-    cart_order = None
-    try:
-        cart_order = Order.objects.get(
-            customer=request.user,
-            status=Order.OrderStatus.PENDING
-        )
-    except Order.DoesNotExist:
-        cart_order = None
-
     if request.method == 'POST':
-        if not cart_order:
-            messages.error(request, 'Your cart is empty!')
+        cart_order = _place_order(request)
+        if cart_order is None:
             return redirect('orders:menu')
-
-        cart_data_raw = request.POST.get('cart_data', '')
-        if cart_data_raw:
-            try:
-                cart_data = json.loads(cart_data_raw)
-            except json.JSONDecodeError:
-                cart_data = None
-
-            if isinstance(cart_data, list):
-                cart_order.items.all().delete()
-                for cart_item in cart_data:
-                    if not isinstance(cart_item, dict):
-                        continue
-
-                    name = (cart_item.get('name') or '').strip()
-                    if not name:
-                        continue
-
-                    try:
-                        quantity = int(cart_item.get('quantity', 1))
-                    except (TypeError, ValueError):
-                        quantity = 1
-
-                    if quantity < 1:
-                        continue
-
-                    try:
-                        price = Decimal(str(cart_item.get('price', '0')))
-                    except Exception:
-                        price = Decimal('0.00')
-
-                    menu_item = MenuItem.objects.filter(name=name).first()
-                    if not menu_item:
-                        menu_item = MenuItem.objects.create(
-                            name=name,
-                            description=name,
-                            price=price if price > 0 else Decimal('0.01'),
-                            is_available=True,
-                            is_vegetarian=(cart_item.get('category') == 'veg'),
-                        )
-
-                    OrderItem.objects.create(
-                        order=cart_order,
-                        menu_item=menu_item,
-                        quantity=quantity,
-                        price=price if price > 0 else menu_item.price,
-                    )
-
-                cart_order.calculate_total()
-
-        # Get selected table
-        table_id = request.session.get('selected_table_id')
-        if table_id:
-            table = get_object_or_404(Table, id=table_id)
-            cart_order.table = table
-        
-        # Get payment method from form
-        payment_method = request.POST.get('payment_method', 'cod')
-        cart_order.payment_method = payment_method
-        
-        # Get special instructions
-        cart_order.special_instructions = request.POST.get('special_instructions', '')
-        
-        # Confirm order
-        cart_order.status = Order.OrderStatus.CONFIRMED
-        cart_order.save()
-
-        request.session['last_confirmed_order_id'] = cart_order.id
         
         # Clear session
         if 'selected_table_id' in request.session:
@@ -233,17 +241,19 @@ def order_confirmation_view(request):
         messages.success(request, f'Order #{cart_order.id} placed successfully!')
         return redirect('orders:order_confirmation')
 
-    if not cart_order:
-        last_confirmed_order_id = request.session.get('last_confirmed_order_id')
-        if last_confirmed_order_id:
-            cart_order = get_object_or_404(Order, id=last_confirmed_order_id, customer=request.user)
-        else:
-            messages.error(request, 'Your cart is empty!')
-            return redirect('orders:menu')
+    last_confirmed_order_id = request.session.get('last_confirmed_order_id')
+    if not last_confirmed_order_id:
+        messages.error(request, 'Your cart is empty!')
+        return redirect('orders:menu')
+    cart_order = get_object_or_404(
+        Order.objects.select_related('table'),
+        id=last_confirmed_order_id,
+        customer=request.user
+    )
     
     context = {
         'order': cart_order,
-        'cart_items': cart_order.items.all(),
+        'summary': order_summary(cart_order),
     }
     
     return render(request, 'orders/order-confirmation.html', context)
@@ -258,13 +268,14 @@ def payment_view(request):
         return redirect('orders:cart')
 
     cart_data = request.POST.get('cart_data', '')
-    total_amount = request.POST.get('total_amount', '')
 
-    # Convert total_amount to decimal for UPI payment
+    # Price the cart from the catalog rather than trusting the client total
     try:
-        amount = Decimal(total_amount)
-    except (ValueError, TypeError):
-        amount = Decimal('0.00')
+        amount = cart_total(parse_cart_data(cart_data))
+    except InvalidCartError as e:
+        messages.error(request, f'{e} Please review your cart.')
+        return redirect('orders:menu')
+    total_amount = str(amount)
 
     token = uuid.uuid4()
     cache.set(
@@ -317,13 +328,14 @@ def upi_payment_view(request):
         return redirect('orders:cart')
 
     cart_data = request.POST.get('cart_data', '')
-    total_amount = request.POST.get('total_amount', '')
 
-    # Convert total_amount to decimal for UPI payment
+    # Price the cart from the catalog rather than trusting the client total
     try:
-        amount = Decimal(total_amount)
-    except (ValueError, TypeError):
-        amount = Decimal('0.00')
+        amount = cart_total(parse_cart_data(cart_data))
+    except InvalidCartError as e:
+        messages.error(request, f'{e} Please review your cart.')
+        return redirect('orders:menu')
+    total_amount = str(amount)
 
     if amount <= 0:
         messages.error(request, 'Invalid amount for UPI payment.')
@@ -395,96 +407,15 @@ def payment_status_view(request, token):
 @login_required
 def process_payment_view(request):
     """Process payment and redirect to confirmation"""
-    print(f"Processing payment for user: {request.user.username}")
-    print(f"Payment method: {request.POST.get('payment_method')}")
-    print(f"Cart data: {request.POST.get('cart_data')}")
-    
-    # Get pending order
-    try:
-        cart_order = Order.objects.get(
-            customer=request.user,
-            status=Order.OrderStatus.PENDING
-        )
-    except Order.DoesNotExist:
-        messages.error(request, 'Your cart is empty!')
+    cart_order = _place_order(request)
+    if cart_order is None:
         return redirect('orders:menu')
-    
-    # Get payment method from POST or localStorage simulation
-    payment_method = request.POST.get('payment_method', 'cod')
-    print(f"Payment method received: {payment_method}")
-
-    cart_data_raw = request.POST.get('cart_data', '')
-    print(f"Raw cart data: {cart_data_raw}")
-    
-    if cart_data_raw:
-        try:
-            cart_data = json.loads(cart_data_raw)
-            print(f"Parsed cart data: {cart_data}")
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            cart_data = None
-
-        if isinstance(cart_data, list):
-            cart_order.items.all().delete()
-            for cart_item in cart_data:
-                if not isinstance(cart_item, dict):
-                    continue
-
-                name = (cart_item.get('name') or '').strip()
-                if not name:
-                    continue
-
-                try:
-                    quantity = int(cart_item.get('quantity', 1))
-                except (TypeError, ValueError):
-                    quantity = 1
-
-                if quantity < 1:
-                    continue
-
-                try:
-                    price = Decimal(str(cart_item.get('price', '0')))
-                except Exception:
-                    price = Decimal('0.00')
-
-                menu_item = MenuItem.objects.filter(name=name).first()
-                if not menu_item:
-                    menu_item = MenuItem.objects.create(
-                        name=name,
-                        description=name,
-                        price=price if price > 0 else Decimal('0.01'),
-                        is_available=True,
-                        is_vegetarian=(cart_item.get('category') == 'veg'),
-                    )
-
-                OrderItem.objects.create(
-                    order=cart_order,
-                    menu_item=menu_item,
-                    quantity=quantity,
-                    price=price if price > 0 else menu_item.price,
-                )
-
-            cart_order.calculate_total()
-    
-    # Get selected table
-    table_id = request.session.get('selected_table_id')
-    if table_id:
-        table = get_object_or_404(Table, id=table_id)
-        cart_order.table = table
-    
-    # Update order with payment info
-    cart_order.payment_method = payment_method
-    cart_order.special_instructions = request.POST.get('special_instructions', '')
-    
-    # Confirm order
-    cart_order.status = Order.OrderStatus.CONFIRMED
-    cart_order.save()
-    print(f"Order {cart_order.id} confirmed with status: {cart_order.status}")
-    
-    request.session['last_confirmed_order_id'] = cart_order.id
+    logger.info(
+        'Order %s placed by %s (payment: %s)',
+        cart_order.id, request.user.username, request.POST.get('payment_method'),
+    )
     
     # Clear cart from localStorage (will be handled by frontend)
     messages.success(request, f'Order #{cart_order.id} placed successfully!')
-    print(f"Redirecting to order confirmation for order {cart_order.id}")
     
     return redirect('orders:order_confirmation')
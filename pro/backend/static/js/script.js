@@ -108,7 +108,8 @@ document.addEventListener('DOMContentLoaded', function () {
         // Check user access and redirect if needed
         checkUserAccess();
 
-        // Update cart on page load
+        // Reprice the saved cart against the current menu, then update it
+        syncCartWithCatalog();
         updateCart();
 
         // Add smooth scroll behavior
@@ -130,6 +131,18 @@ function addToCart(item) {
             throw new Error('Invalid item data');
         }
 
+        // The server is the price authority: carry catalog ids and prices
+        const catalog = getMenuCatalog();
+        if (catalog) {
+            const entry = catalog.items[item.name];
+            if (!entry) {
+                showNotification(`${item.name} is currently unavailable`, 'error');
+                return;
+            }
+            item = { ...item, id: entry.id, price: entry.price };
+            localStorage.setItem('cartCatalogVersion', catalog.version);
+        }
+
         const existingItem = cart.find(cartItem => cartItem.id === item.id);
 
         if (existingItem) {
@@ -140,6 +153,7 @@ function addToCart(item) {
             showNotification(`${item.name} added to cart!`, 'success');
         }
 
+        queueCartSync(item.id, existingItem ? existingItem.quantity : 1);
         saveCart();
         updateCart();
     } catch (error) {
@@ -153,6 +167,7 @@ function removeFromCart(itemId) {
         const item = cart.find(item => item.id === itemId);
         cart = cart.filter(item => item.id !== itemId);
 
+        queueCartSync(itemId, 0);
         saveCart();
         updateCart();
 
@@ -179,6 +194,7 @@ function updateCartQuantity(itemId, newQuantity) {
         }
 
         item.quantity = parseInt(newQuantity);
+        queueCartSync(itemId, item.quantity);
         saveCart();
         updateCart();
 
@@ -217,9 +233,9 @@ function updateCart() {
                             <p class="cart-item-price">₹${item.price.toFixed(2)}</p>
                         </div>
                         <div class="cart-item-controls">
-                            <button class="btn-quantity" onclick="updateCartQuantity('${item.id}', ${item.quantity - 1})">-</button>
+                            <button class="btn-quantity" onclick="updateCartQuantity(${item.id}, ${item.quantity - 1})">-</button>
                             <span class="quantity">${item.quantity}</span>
-                            <button class="btn-quantity" onclick="updateCartQuantity('${item.id}', ${item.quantity + 1})">+</button>
+                            <button class="btn-quantity" onclick="updateCartQuantity(${item.id}, ${item.quantity + 1})">+</button>
                         </div>
                     `;
                     cartItems.appendChild(cartItem);
@@ -249,11 +265,180 @@ function saveCart() {
 
 function clearCart() {
     cart = [];
+    pendingCartSync.clear = true;
+    pendingCartSync.quantities.clear();
+    scheduleCartSync();
     saveCart();
     updateCart();
     showNotification('Cart cleared!', 'success');
 }
 
+// ===================================
+// SERVER CART SYNC
+// ===================================
+// Clicks are coalesced into one batched request per burst: only the final
+// quantity of each dish is sent once the customer pauses.
+const CART_SYNC_DELAY = 400;
+const pendingCartSync = { clear: false, quantities: new Map() };
+let cartSyncTimer = null;
+
+function queueCartSync(itemId, quantity) {
+    pendingCartSync.quantities.set(itemId, quantity);
+    scheduleCartSync();
+}
+
+function scheduleCartSync() {
+    clearTimeout(cartSyncTimer);
+    cartSyncTimer = setTimeout(flushCartSync, CART_SYNC_DELAY);
+}
+
+async function flushCartSync() {
+    const url = document.body && document.body.dataset.cartOpsUrl;
+    clearTimeout(cartSyncTimer);
+    if (!url || (!pendingCartSync.clear && pendingCartSync.quantities.size === 0)) {
+        return;
+    }
+
+    const ops = pendingCartSync.clear ? [{ op: 'clear' }] : [];
+    pendingCartSync.quantities.forEach((quantity, id) => ops.push({ op: 'set', id: id, quantity: quantity }));
+    pendingCartSync.clear = false;
+    pendingCartSync.quantities.clear();
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            keepalive: true,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ ops: ops })
+        });
+        const data = await response.json();
+        if (data.cart) {
+            localStorage.setItem('cartVersion', data.cart.version);
+        }
+        if (!response.ok) {
+            console.error('Cart sync error:', data.error);
+        }
+    } catch (error) {
+        console.error('Cart sync error:', error);
+    }
+}
+
+// Send the last burst before leaving the page
+window.addEventListener('pagehide', flushCartSync);
+
+// ===================================
+// MENU CATALOG
+// ===================================
+function getMenuCatalog() {
+    const catalogElement = document.getElementById('menu-catalog');
+    return catalogElement ? JSON.parse(catalogElement.textContent) : null;
+}
+
+function syncCartWithCatalog() {
+    try {
+        const catalog = getMenuCatalog();
+        if (!catalog || localStorage.getItem('cartCatalogVersion') === catalog.version) {
+            return;
+        }
+
+        // Drop dishes that left the menu and take the current prices
+        cart = cart
+            .filter(item => catalog.items[item.name])
+            .map(item => ({
+                ...item,
+                id: catalog.items[item.name].id,
+                price: catalog.items[item.name].price
+            }));
+
+        localStorage.setItem('cartCatalogVersion', catalog.version);
+        saveCart();
+    } catch (error) {
+        console.error('Catalog sync error:', error);
+    }
+}
+
+function buildCartPayload(items) {
+    return JSON.stringify({
+        v: localStorage.getItem('cartCatalogVersion'),
+        items: items.map(item => [item.id, item.quantity])
+    });
+}
+
+// ===================================
+// MENU SEARCH AUTOCOMPLETE
+// ===================================
+function initMenuAutocomplete() {
+    const input = document.getElementById('menu-search');
+    const list = document.getElementById('menu-suggestions');
+    if (!input || !list) {
+        return;
+    }
+
+    let debounceTimer = null;
+    let latestQuery = '';
+
+    const hideSuggestions = () => {
+        list.hidden = true;
+        list.innerHTML = '';
+    };
+
+    input.addEventListener('input', function () {
+        clearTimeout(debounceTimer);
+        const query = input.value.trim();
+        if (!query) {
+            hideSuggestions();
+            return;
+        }
+
+        debounceTimer = setTimeout(async () => {
+            latestQuery = query;
+            try {
+                const url = `${input.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+                const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+                const data = await response.json();
+
+                // Ignore answers to queries the user has already typed past
+                if (query !== latestQuery) {
+                    return;
+                }
+                if (!data.suggestions.length) {
+                    hideSuggestions();
+                    return;
+                }
+
+                list.innerHTML = data.suggestions.map(item => `
+                    <li data-name="${escapeHtml(item.name)}">
+                        <span>${escapeHtml(item.name)}</span>
+                        <span>₹${item.price}</span>
+                    </li>
+                `).join('');
+                list.hidden = false;
+            } catch (error) {
+                console.error('Autocomplete error:', error);
+            }
+        }, 150);
+    });
+
+    list.addEventListener('click', function (event) {
+        const option = event.target.closest('li');
+        if (option) {
+            input.value = option.dataset.name;
+            input.form.submit();
+        }
+    });
+
+    document.addEventListener('click', function (event) {
+        if (!input.form.contains(event.target)) {
+            hideSuggestions();
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', initMenuAutocomplete);
+
 // ===================================
 // MENU FILTERING
 // ===================================